@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+مجموعة رسائل عربية وإنجليزية مصطنعة وقابلة للتكرار
+Reproducible synthetic Arabic and English message corpus
+"""
+
+import random
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Sequence, Tuple
+from telegram import Update
+from config.settings import BADWORDS_FILE
+
+ARABIC_WORDS = (
+    "السلام", "عليكم", "كيف", "حالك", "اليوم", "الاجتماع", "غداً", "الساعة", "الخامسة",
+    "شكراً", "جزيلاً", "على", "المساعدة", "هل", "يوجد", "تحديث", "جديد", "للتطبيق",
+    "المجموعة", "القوانين", "الرجاء", "قراءة", "الرابط", "المثبت", "في", "الأعلى",
+    "مبروك", "النجاح", "الامتحان", "صباح", "الخير", "مساء", "النور", "أين", "الملف",
+    "أرسلت", "الصور", "البارحة", "سأكون", "متأخراً", "قليلاً", "الطريق", "مزدحم",
+)
+
+ENGLISH_WORDS = (
+    "hello", "everyone", "the", "meeting", "is", "moved", "to", "tomorrow", "please",
+    "check", "pinned", "message", "thanks", "for", "help", "did", "anyone", "see",
+    "new", "update", "release", "notes", "link", "group", "rules", "welcome", "back",
+    "good", "morning", "evening", "where", "file", "sent", "photos", "yesterday",
+    "running", "late", "traffic", "lunch", "break", "deploy", "server", "done",
+)
+
+SPAM_TEMPLATES = (
+    "🔥 اربح 1000 دولار يومياً من البيت! راسلني الآن {n}",
+    "FREE crypto giveaway!!! click the link in my bio now {n}",
+    "عرض خاص لفترة محدودة، خصم 90% على جميع المنتجات {n}",
+)
+
+# علامات التشكيل والتطويل لاختبار التوحيد
+# Diacritics and tatweel to exercise normalization
+_DIACRITICS = ("َ", "ُ", "ِ", "ّ", "ـ")
+
+class CorpusMessage(NamedTuple):
+    chat_id: int
+    user_id: int
+    text: str
+    kind: str
+
+def load_badwords(path: str = BADWORDS_FILE) -> List[str]:
+    """
+    قراءة الكلمات من ملف القائمة دون التعليقات
+    Read the words from the list file without comments
+    """
+    lines = Path(path).read_text(encoding='utf-8').splitlines()
+    return [line.strip() for line in lines if line.strip() and not line.startswith('#')]
+
+def _sentence(rng: random.Random, words: Sequence[str], low: int, high: int) -> str:
+    return " ".join(rng.choice(words) for _ in range(rng.randint(low, high)))
+
+def _decorate(rng: random.Random, word: str) -> str:
+    # إدخال تشكيل أو تطويل بين الحروف كما يفعل المستخدمون للتحايل على الفلتر
+    # Insert diacritics or tatweel between letters as users do to dodge the filter
+    letters = list(word)
+    position = rng.randrange(1, len(letters)) if len(letters) > 1 else 1
+    letters.insert(position, rng.choice(_DIACRITICS))
+    return "".join(letters)
+
+def build_corpus(size: int, seed: int = 42, chats: int = 50, users: int = 2000,
+                 badwords: Sequence[str] = ()) -> List[CorpusMessage]:
+    """
+    بناء مجموعة رسائل بمزيج ثابت: نظيفة، بكلمات محظورة، سبام متكرر، ورسائل طويلة
+    Build a message corpus with a fixed mix: clean, bad words, repeated spam and long messages
+    """
+    rng = random.Random(seed)
+    badwords = list(badwords) or load_badwords()
+    messages: List[CorpusMessage] = []
+    
+    while len(messages) < size:
+        chat_id = -1000000000000 - rng.randrange(chats)
+        user_id = 100000 + rng.randrange(users)
+        roll = rng.random()
+        
+        if roll < 0.38:
+            messages.append(CorpusMessage(chat_id, user_id, _sentence(rng, ARABIC_WORDS, 3, 15), "arabic"))
+        elif roll < 0.63:
+            messages.append(CorpusMessage(chat_id, user_id, _sentence(rng, ENGLISH_WORDS, 3, 15), "english"))
+        elif roll < 0.78:
+            text = f"{_sentence(rng, ARABIC_WORDS, 2, 6)} {_sentence(rng, ENGLISH_WORDS, 2, 6)}"
+            messages.append(CorpusMessage(chat_id, user_id, text, "mixed"))
+        elif roll < 0.88:
+            word = rng.choice(badwords)
+            if rng.random() < 0.5:
+                word = _decorate(rng, word)
+            text = f"{_sentence(rng, ARABIC_WORDS, 1, 6)} {word} {_sentence(rng, ARABIC_WORDS, 0, 4)}"
+            messages.append(CorpusMessage(chat_id, user_id, text.strip(), "badword"))
+        elif roll < 0.93:
+            # دفعة سبام: نفس المستخدم يكرر رسالة شبه متطابقة
+            # Spam burst: the same user repeats a near-identical message
+            template = rng.choice(SPAM_TEMPLATES)
+            for n in range(rng.randint(3, 8)):
+                messages.append(CorpusMessage(chat_id, user_id, template.format(n=n % 2), "spam"))
+        else:
+            text = _sentence(rng, ARABIC_WORDS + ENGLISH_WORDS, 80, 200)
+            messages.append(CorpusMessage(chat_id, user_id, text, "long"))
+    
+    return messages[:size]
+
+def corpus_mix(messages: Sequence[CorpusMessage]) -> Dict[str, int]:
+    """
+    عدد الرسائل من كل نوع
+    Number of messages of each kind
+    """
+    mix: Dict[str, int] = {}
+    for message in messages:
+        mix[message.kind] = mix.get(message.kind, 0) + 1
+    return mix
+
+def update_payload(message: CorpusMessage, update_id: int) -> Dict[str, Any]:
+    """
+    تحديث رسالة نصية بصيغة JSON كما ترسله تيليجرام
+    A text message update as the JSON Telegram sends
+    """
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': 1700000000 + update_id,
+            'chat': {'id': message.chat_id, 'type': 'supergroup', 'title': 'Benchmark'},
+            'from': {'id': message.user_id, 'is_bot': False, 'first_name': f"User {message.user_id}"},
+            'text': message.text,
+        },
+    }
+
+def make_update(message: CorpusMessage, update_id: int, bot) -> Update:
+    """
+    بناء تحديث رسالة نصية من تيليجرام لرسالة من المجموعة
+    Build a Telegram text message update for a corpus message
+    """
+    return Update.de_json(update_payload(message, update_id), bot)
+
+def join_payload(chat_id: int, user_id: int, update_id: int) -> Dict[str, Any]:
+    """
+    تحديث chat_member لانضمام عضو جديد
+    A chat_member update for a new member joining
+    """
+    user = {'id': user_id, 'is_bot': False, 'first_name': f"User {user_id}"}
+    return {
+        'update_id': update_id,
+        'chat_member': {
+            'chat': {'id': chat_id, 'type': 'supergroup', 'title': 'Benchmark'},
+            'from': user,
+            'date': 1700000000 + update_id,
+            'old_chat_member': {'status': 'left', 'user': user},
+            'new_chat_member': {'status': 'member', 'user': user},
+        },
+    }
+
+def build_raid_scenario(seed: int = 42, duration: float = 60.0, background_rate: float = 20.0,
+                        raiders: int = 40, raid_start: float = 20.0,
+                        raid_spread: float = 5.0) -> List[Tuple[float, Dict[str, Any]]]:
+    """
+    سيناريو غارة: حركة عادية في عدة مجموعات ثم موجة حسابات جديدة تنضم لمجموعة واحدة
+    وترسل نفس الرسالة
+    Raid scenario: normal traffic in several chats, then a wave of new accounts
+    joining one chat and sending the same message
+    
+    يعيد أزواج (الثانية منذ البداية، التحديث) مرتبة بالوقت.
+    Returns (seconds since start, update) pairs ordered by time.
+    """
+    rng = random.Random(seed)
+    background = build_corpus(max(1, int(duration * background_rate)), seed=seed, users=500)
+    events: List[Tuple[float, Dict[str, Any]]] = [
+        (rng.uniform(0, duration), update_payload(message, 0)) for message in background
+    ]
+    
+    target_chat = -1000000000000
+    raid_text = rng.choice(SPAM_TEMPLATES).format(n=0)
+    for i in range(raiders):
+        user_id = 900000 + i
+        joined = raid_start + rng.uniform(0, raid_spread)
+        events.append((joined, join_payload(target_chat, user_id, 0)))
+        events.append((joined + rng.uniform(0.5, 3.0),
+                       update_payload(CorpusMessage(target_chat, user_id, raid_text, "raid"), 0)))
+    
+    # ترقيم التحديثات حسب الوقت كما تفعل تيليجرام
+    # Number the updates in time order as Telegram does
+    events.sort(key=lambda event: event[0])
+    for update_id, (_, payload) in enumerate(events, start=1):
+        payload['update_id'] = update_id
+        if 'message' in payload:
+            payload['message']['message_id'] = update_id
+            payload['message']['date'] = 1700000000 + update_id
+        else:
+            payload['chat_member']['date'] = 1700000000 + update_id
+    return events
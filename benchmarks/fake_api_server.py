@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+خادم محلي بديل لواجهة تيليجرام يسجل الاستدعاءات ويرد بنتائج بسيطة
+Local stand-in for the Telegram Bot API that records calls and answers with simple results
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import Counter
+from typing import Any, Dict, List, NamedTuple, Optional
+from urllib.parse import parse_qsl
+
+logger = logging.getLogger(__name__)
+
+# صلاحيات المجموعة التي يعيدها getChat
+# Chat permissions returned by getChat
+_DEFAULT_PERMISSIONS = {
+    'can_send_messages': True, 'can_send_audios': True, 'can_send_documents': True,
+    'can_send_photos': True, 'can_send_videos': True, 'can_send_video_notes': True,
+    'can_send_voice_notes': True, 'can_send_polls': True, 'can_send_other_messages': True,
+    'can_add_web_page_previews': True, 'can_change_info': False, 'can_invite_users': True,
+    'can_pin_messages': False, 'can_manage_topics': False,
+}
+
+# أول معرف لرسائل البوت، بعيداً عن معرفات الرسائل المعاد تشغيلها
+# First id of the bot's messages, well away from the replayed message ids
+BOT_MESSAGE_ID_BASE = 1000000000
+
+# صلاحيات المشرفين والبوت في كل مجموعة
+# Administrator and bot rights in every chat
+_BOT_ADMIN_RIGHTS = {
+    'can_be_edited': False, 'is_anonymous': False, 'can_manage_chat': True,
+    'can_delete_messages': True, 'can_manage_video_chats': False, 'can_restrict_members': True,
+    'can_promote_members': False, 'can_change_info': False, 'can_invite_users': True,
+}
+
+class ApiCall(NamedTuple):
+    at: float
+    method: str
+    params: Dict[str, Any]
+
+class FakeApiServer:
+    """
+    خادم HTTP/1.1 يفهم الطرق التي يستخدمها البوت
+    HTTP/1.1 server understanding the methods the bot uses
+    
+    الاتصالات تبقى مفتوحة كما يفعل httpx، ويمكن إضافة تأخير ثابت لمحاكاة الشبكة.
+    Connections are kept alive as httpx expects, and a fixed delay can be added
+    to simulate the network.
+    """
+    
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, bot_id: int = 1,
+                 admins: Optional[Dict[int, List[int]]] = None, latency: float = 0.0):
+        self.host = host
+        self.port = port
+        self.bot_id = bot_id
+        self.admins = admins or {}
+        self.latency = latency
+        self.calls: List[ApiCall] = []
+        self._message_id = BOT_MESSAGE_ID_BASE
+        self._server: Optional[asyncio.AbstractServer] = None
+    
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/bot"
+    
+    async def start(self):
+        """
+        بدء الاستماع، والمنفذ 0 يختار منفذاً حراً
+        Start listening, port 0 picks a free port
+        """
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+    
+    async def stop(self):
+        """
+        إيقاف الخادم
+        Stop the server
+        """
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+    
+    def summary(self) -> Dict[str, int]:
+        """
+        عدد الاستدعاءات لكل طريقة
+        Number of calls per method
+        """
+        return dict(Counter(call.method for call in self.calls))
+    
+    def _user(self, user_id: int) -> Dict[str, Any]:
+        return {'id': user_id, 'is_bot': user_id == self.bot_id, 'first_name': f"User {user_id}"}
+    
+    def _message(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        self._message_id += 1
+        return {
+            'message_id': params.get('message_id') or self._message_id,
+            'date': int(time.time()),
+            'chat': {'id': int(params['chat_id']), 'type': 'supergroup', 'title': "Replay"},
+            'from': self._user(self.bot_id),
+            'text': params.get('text', ""),
+        }
+    
+    def _member(self, chat_id: int, user_id: int) -> Dict[str, Any]:
+        if user_id == self.bot_id or user_id in self.admins.get(chat_id, ()):
+            return {'status': 'administrator', 'user': self._user(user_id), **_BOT_ADMIN_RIGHTS}
+        return {'status': 'member', 'user': self._user(user_id)}
+    
+    def answer(self, method: str, params: Dict[str, Any]) -> Any:
+        """
+        نتيجة الطريقة كما ترجعها واجهة تيليجرام
+        The method result as the Telegram API would return it
+        """
+        if method == 'getMe':
+            return {**self._user(self.bot_id), 'username': "replay_bot", 'can_join_groups': True}
+        if method in ('sendMessage', 'editMessageText'):
+            return self._message(params)
+        if method == 'getChat':
+            chat_id = int(params['chat_id'])
+            return {'id': chat_id, 'type': 'supergroup', 'title': "Replay", 'permissions': _DEFAULT_PERMISSIONS}
+        if method == 'getChatAdministrators':
+            chat_id = int(params['chat_id'])
+            return [self._member(chat_id, user_id) for user_id in self.admins.get(chat_id, ())]
+        if method == 'getChatMember':
+            return self._member(int(params['chat_id']), int(params['user_id']))
+        if method == 'getChatMemberCount':
+            return 1000
+        return True
+    
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request = await reader.readline()
+                if not request:
+                    break
+                
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"", b"\r\n", b"\n"):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+                
+                method = request.decode('latin-1').split()[1].rpartition('/')[2]
+                params = self._parse(body, headers.get('content-type', ""))
+                self.calls.append(ApiCall(time.monotonic(), method, params))
+                
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                
+                payload = json.dumps({'ok': True, 'result': self.answer(method, params)}).encode('utf-8')
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    + f"Content-Length: {len(payload)}\r\n\r\n".encode('latin-1') + payload
+                )
+                await writer.drain()
+        
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except Exception as e:
+            logger.error(f"خطأ في خادم الواجهة البديل: {e}")
+        finally:
+            writer.close()
+    
+    @staticmethod
+    def _parse(body: bytes, content_type: str) -> Dict[str, Any]:
+        """
+        قراءة المعاملات من نموذج أو JSON، وقيم النموذج المركبة مرمزة بـ JSON
+        Read the parameters from a form or JSON, compound form values are JSON encoded
+        """
+        if not body:
+            return {}
+        text = body.decode('utf-8')
+        if content_type.startswith('application/json'):
+            return json.loads(text)
+        
+        params: Dict[str, Any] = {}
+        for key, value in parse_qsl(text, keep_blank_values=True):
+            try:
+                params[key] = json.loads(value)
+            except ValueError:
+                params[key] = value
+        return params
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+بوت وهمي يسجل استدعاءات الواجهة بدلاً من إرسالها عبر الشبكة
+Fake bot that records API calls instead of sending them over the network
+"""
+
+from collections import Counter
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, List, Tuple
+
+class FakeBot:
+    """
+    يقبل أي طريقة من طرق Bot ويعيد نتيجة بسيطة فوراً
+    Accepts any Bot method and returns a simple result right away
+    """
+    
+    # تحتاجها دوال de_json في تيليجرام
+    # Needed by the telegram de_json functions
+    defaults = None
+    
+    def __init__(self, admins: Iterable[int] = (), bot_id: int = 1):
+        self.id = bot_id
+        self.admins = tuple(admins)
+        self.calls: List[Tuple[str, Dict[str, Any]]] = []
+        self._message_id = 0
+    
+    async def get_chat_administrators(self, chat_id: int, **kwargs):
+        self.calls.append(('get_chat_administrators', {'chat_id': chat_id}))
+        return [SimpleNamespace(user=SimpleNamespace(id=admin)) for admin in self.admins]
+    
+    def __getattr__(self, name: str):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        
+        async def call(*args, **kwargs):
+            self.calls.append((name, kwargs))
+            if name.startswith('send_'):
+                self._message_id += 1
+                return SimpleNamespace(message_id=self._message_id, chat_id=kwargs.get('chat_id'))
+            return True
+        
+        return call
+    
+    def summary(self) -> Dict[str, int]:
+        """
+        عدد الاستدعاءات لكل طريقة
+        Number of calls per method
+        """
+        return dict(Counter(name for name, _ in self.calls))
+
+class FakeContext:
+    """
+    الحد الأدنى من CallbackContext الذي تحتاجه المعالجات
+    The minimum of CallbackContext the handlers need
+    """
+    
+    def __init__(self, bot: FakeBot, bot_data: Dict):
+        self.bot = bot
+        self.bot_data = bot_data
+        self.args: List[str] = []
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+اختبار أداء مسار الإشراف مع المقارنة بخط أساس
+Moderation hot path benchmark with a baseline comparison
+
+الاستخدام / Usage:
+    python -m benchmarks.hot_path_benchmark [--messages 20000] [--repeats 3] [--save-baseline]
+                                           [--baseline benchmarks/baseline.json] [--tolerance 0.35]
+
+يعيد رمز الخروج 1 إذا تراجع أي قياس عن خط الأساس بأكثر من النسبة المسموحة.
+Exits with status 1 if any case regressed past the tolerance against the baseline.
+"""
+
+import argparse
+import asyncio
+import gc
+import itertools
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Sequence
+from bot.handlers.moderation import handle_message
+from bot.services.badwords_service import BadWordsService
+from bot.services.container import ServiceContainer, SERVICES_KEY
+from bot.services.moderation_service import ModerationService
+from bot.utils.action_dispatcher import ActionDispatcher
+from bot.utils.database import Database
+from benchmarks.corpus import CorpusMessage, build_corpus, corpus_mix, make_update
+from benchmarks.fake_bot import FakeBot, FakeContext
+
+BASELINE_FILE = Path(__file__).with_name("baseline.json")
+
+def _percentile(ordered: Sequence[int], fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def _summarize(latencies: List[int], elapsed: float) -> Dict[str, float]:
+    """
+    الإنتاجية وزمن الاستجابة p50 و p99 بالميكروثانية
+    Throughput and p50/p99 latency in microseconds
+    """
+    ordered = sorted(latencies)
+    return {
+        'ops': len(ordered),
+        'throughput': round(len(ordered) / elapsed, 1),
+        'p50_us': round(_percentile(ordered, 0.50) / 1000, 2),
+        'p99_us': round(_percentile(ordered, 0.99) / 1000, 2),
+    }
+
+async def _measure(operation: Callable[[int], Awaitable], count: int) -> Dict[str, float]:
+    """
+    قياس كل استدعاء على حدة مع استبعاد جمع المهملات
+    Time every call individually with garbage collection kept out
+    """
+    latencies: List[int] = []
+    gc.collect()
+    gc.disable()
+    try:
+        started = time.perf_counter()
+        for i in range(count):
+            call_started = time.perf_counter_ns()
+            await operation(i)
+            latencies.append(time.perf_counter_ns() - call_started)
+        elapsed = time.perf_counter() - started
+    finally:
+        gc.enable()
+    return _summarize(latencies, elapsed)
+
+async def _median_of(run_once: Callable[[], Awaitable[Dict]], repeats: int) -> Dict:
+    """
+    تكرار القياس وإرجاع التشغيل ذي الإنتاجية الوسطى
+    Repeat the measurement and return the run with the median throughput
+    """
+    runs = [await run_once() for _ in range(repeats)]
+    runs.sort(key=lambda run: run['throughput'])
+    return runs[len(runs) // 2]
+
+async def bench_badwords(corpus: Sequence[CorpusMessage], db: Database, repeats: int) -> Dict[str, Dict]:
+    """
+    فحص وفلترة الكلمات المحظورة
+    Bad word detection and filtering
+    """
+    service = BadWordsService(db=db, reload_interval=0, artifact=None)
+    return {
+        'badwords.contains_badword': await _median_of(lambda: _measure(
+            lambda i: service.contains_badword(corpus[i].text, chat_id=corpus[i].chat_id), len(corpus)), repeats),
+        'badwords.filter_text': await _median_of(lambda: _measure(
+            lambda i: service.filter_text(corpus[i].text, chat_id=corpus[i].chat_id), len(corpus)), repeats),
+    }
+
+async def bench_spam(corpus: Sequence[CorpusMessage], db: Database, repeats: int) -> Dict[str, Dict]:
+    """
+    فحص السبام مع البصمة
+    Spam detection including the fingerprint
+    """
+    async def run_once() -> Dict:
+        # متتبع جديد في كل تكرار حتى تبدأ النوافذ فارغة
+        # A fresh tracker on every repeat so the windows start empty
+        service = ModerationService(db=db)
+        return await _measure(
+            lambda i: service.check_spam(corpus[i].chat_id, corpus[i].user_id, corpus[i].text), len(corpus))
+    
+    return {'moderation.check_spam': await _median_of(run_once, repeats)}
+
+async def bench_database(corpus: Sequence[CorpusMessage], db: Database, writes: int,
+                         repeats: int) -> Dict[str, Dict]:
+    """
+    دوال الكتابة في قاعدة البيانات
+    Database write methods
+    """
+    batch = [(m.chat_id, m.user_id, m.text, "2024-01-01T00:00:00") for m in corpus[:500]]
+    settings = {'verification': True, 'badwords': None, 'spam': None, 'antiraid': None,
+                'spam_threshold': 8, 'warn_limit': None, 'mute_duration': None}
+    
+    def pick(i: int) -> CorpusMessage:
+        return corpus[i % len(corpus)]
+    
+    return {
+        'db.save_warning': await _median_of(lambda: _measure(
+            lambda i: db.save_warning(pick(i).chat_id, pick(i).user_id, "benchmark", 1), writes), repeats),
+        'db.save_mute': await _median_of(lambda: _measure(
+            lambda i: db.save_mute(pick(i).chat_id, pick(i).user_id, 300, "benchmark"), writes), repeats),
+        'db.save_chat_settings': await _median_of(lambda: _measure(
+            lambda i: db.save_chat_settings(pick(i).chat_id, settings), writes), repeats),
+        'db.log_batch_500': await _median_of(lambda: _measure(
+            lambda i: db.log_batch(messages=batch), max(1, writes // 50)), repeats),
+    }
+
+async def bench_handle_message(corpus: Sequence[CorpusMessage], directory: str,
+                               repeats: int) -> Dict[str, Dict]:
+    """
+    معالج الرسائل كاملاً مع الخدمات الحقيقية وبوت وهمي
+    The full message handler with real services and a fake bot
+    """
+    runs = itertools.count()
+    
+    async def run_once() -> Dict:
+        # حاوية وقاعدة بيانات جديدة في كل تكرار حتى لا يبقى كتم من التشغيل السابق
+        # A fresh container and database on every repeat so no mute survives the previous run
+        bot = FakeBot()
+        services = ServiceContainer(db_path=os.path.join(directory, f"handler_{next(runs)}.db"))
+        # بدون حدود معدل حتى يقيس المعالج وليس انتظار الطابور
+        # No rate limits so the handler is measured rather than queue waits
+        services.dispatcher = ActionDispatcher(global_rate=1e9, chat_messages_per_minute=1e9,
+                                               max_in_flight=1000)
+        services.open()
+        await services.log_buffer.start()
+        await services.dispatcher.start(bot)
+        
+        context = FakeContext(bot, {SERVICES_KEY: services})
+        updates = [make_update(message, i + 1, bot) for i, message in enumerate(corpus)]
+        try:
+            result = await _measure(lambda i: handle_message(updates[i], context), len(updates))
+        finally:
+            await services.dispatcher.stop()
+            await services.log_buffer.stop()
+            services.close()
+        
+        result['bot_calls'] = bot.summary()
+        return result
+    
+    return {'handlers.handle_message': await _median_of(run_once, repeats)}
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float) -> List[str]:
+    """
+    طباعة الفرق عن خط الأساس وإرجاع أسماء القياسات المتراجعة
+    Print the difference from the baseline and return the names of regressed cases
+    
+    التراجع يحسب من الإنتاجية و p50، أما p99 فيعرض فقط لأنه يتأثر بضجيج الجهاز.
+    Regressions are judged on throughput and p50, while p99 is only shown since
+    it is dominated by machine noise.
+    """
+    regressions = []
+    print(f"\n{'case':<28} {'ops/s':>10} {'Δ':>7} {'p50 µs':>10} {'Δ':>7} {'p99 µs':>10} {'Δ':>7}")
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            print(f"{name:<28} {result['throughput']:>10.0f} {'new':>7}")
+            continue
+        
+        throughput_change = result['throughput'] / reference['throughput'] - 1
+        p50_change = result['p50_us'] / reference['p50_us'] - 1
+        p99_change = result['p99_us'] / reference['p99_us'] - 1
+        regressed = throughput_change < -tolerance or p50_change > tolerance
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<28} {result['throughput']:>10.0f} {throughput_change:>+7.0%} "
+              f"{result['p50_us']:>10.1f} {p50_change:>+7.0%} "
+              f"{result['p99_us']:>10.1f} {p99_change:>+7.0%}{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+async def run(messages: int, writes: int, seed: int, repeats: int) -> Dict[str, Dict]:
+    corpus = build_corpus(messages, seed=seed)
+    print(f"corpus: {len(corpus)} messages {corpus_mix(corpus)}")
+    
+    results: Dict[str, Dict] = {}
+    with tempfile.TemporaryDirectory() as directory:
+        db = Database(os.path.join(directory, "bench.db"))
+        try:
+            results.update(await bench_badwords(corpus, db, repeats))
+            results.update(await bench_spam(corpus, db, repeats))
+            results.update(await bench_database(corpus, db, writes, repeats))
+        finally:
+            db.close()
+        results.update(await bench_handle_message(corpus, directory, repeats))
+    
+    print(f"\n{'case':<28} {'ops':>8} {'ops/s':>12} {'p50 µs':>10} {'p99 µs':>10}")
+    for name, result in results.items():
+        print(f"{name:<28} {result['ops']:>8} {result['throughput']:>12.0f} "
+              f"{result['p50_us']:>10.1f} {result['p99_us']:>10.1f}")
+        if 'bot_calls' in result:
+            print(f"{'':<28} bot calls: {result['bot_calls']}")
+    return results
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=20000, help="corpus size")
+    parser.add_argument("--writes", type=int, default=2000, help="calls per database write case")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeats", type=int, default=3, help="runs per case, the median is reported")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true", help="overwrite the baseline with this run")
+    parser.add_argument("--tolerance", type=float, default=0.35, help="allowed relative regression")
+    args = parser.parse_args()
+    
+    # سجلات المعالجات تقيس كلفة الإخراج وليس الفحص
+    # Handler logs would measure output cost rather than the checks
+    logging.disable(logging.INFO)
+    
+    results = asyncio.run(run(args.messages, args.writes, args.seed, args.repeats))
+    
+    if args.save_baseline:
+        payload = {
+            'environment': {
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'system': platform.system(),
+                'messages': args.messages,
+                'writes': args.writes,
+                'seed': args.seed,
+                'repeats': args.repeats,
+            },
+            'results': {name: {key: value for key, value in result.items() if key != 'bot_calls'}
+                        for name, result in results.items()},
+        }
+        args.baseline.write_text(json.dumps(payload, indent=2, ensure_ascii=False) + "\n", encoding='utf-8')
+        print(f"\nsaved baseline to {args.baseline}")
+        return 0
+    
+    if not args.baseline.exists():
+        print(f"\nno baseline at {args.baseline}, run with --save-baseline to create one")
+        return 0
+    
+    baseline = json.loads(args.baseline.read_text(encoding='utf-8'))
+    regressions = compare(results, baseline['results'], args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} case(s) regressed by more than {args.tolerance:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
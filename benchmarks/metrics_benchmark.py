@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+كلفة المقاييس على المسار الساخن
+Hot path cost of the metrics
+
+الاستخدام / Usage:
+    python -m benchmarks.metrics_benchmark [--iterations 1000000]
+"""
+
+import argparse
+import asyncio
+import time
+from bot.utils.metrics import Counter, Histogram, Registry, timed
+
+def _per_call(label: str, elapsed: float, iterations: int):
+    print(f"{label:<40} {elapsed / iterations * 1e9:10.0f} ns/call")
+
+def bench_counter(iterations: int):
+    """
+    زيادة عداد بدون تسميات وعداد بتسمية محفوظة
+    Increment an unlabelled counter and a counter with a resolved label
+    """
+    registry = Registry()
+    plain = Counter("plain", "plain", registry=registry)
+    labelled = Counter("labelled", "labelled", ["method"], registry=registry).labels("sendMessage")
+    
+    started = time.perf_counter()
+    for _ in range(iterations):
+        plain.inc()
+    _per_call("Counter.inc", time.perf_counter() - started, iterations)
+    
+    started = time.perf_counter()
+    for _ in range(iterations):
+        labelled.inc()
+    _per_call("Counter.labels(...).inc (resolved)", time.perf_counter() - started, iterations)
+
+def bench_histogram(iterations: int):
+    """
+    تسجيل قيم في مدرج زمن الاستجابة
+    Observe values in a latency histogram
+    """
+    histogram = Histogram("latency", "latency", registry=Registry())
+    values = [i % 1000 / 10000 for i in range(1000)]
+    
+    started = time.perf_counter()
+    for i in range(iterations):
+        histogram.observe(values[i % 1000])
+    _per_call("Histogram.observe", time.perf_counter() - started, iterations)
+
+async def bench_timed(iterations: int):
+    """
+    مقارنة معالج فارغ مع نفس المعالج داخل timed
+    Compare an empty handler against the same handler wrapped in timed
+    """
+    async def handler():
+        pass
+    
+    wrapped = timed(Histogram("handler", "handler", registry=Registry()).labels())(handler)
+    
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await handler()
+    baseline = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await wrapped()
+    _per_call("timed handler overhead", time.perf_counter() - started - baseline, iterations)
+
+def bench_render(series: int):
+    """
+    زمن إنشاء صفحة /metrics
+    Time to render the /metrics page
+    """
+    registry = Registry()
+    histogram = Histogram("db", "db", ["operation"], registry=registry)
+    for i in range(series):
+        histogram.labels(f"operation_{i}").observe(0.001)
+    
+    started = time.perf_counter()
+    text = registry.render()
+    elapsed = time.perf_counter() - started
+    print(f"{f'render {series} histogram series':<40} {elapsed * 1000:10.2f} ms {len(text) / 1024:8.0f} KiB")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=1_000_000)
+    args = parser.parse_args()
+    
+    bench_counter(args.iterations)
+    bench_histogram(args.iterations)
+    asyncio.run(bench_timed(args.iterations))
+    bench_render(50)
+
+if __name__ == '__main__':
+    main()
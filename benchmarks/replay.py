@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+إعادة تشغيل تحديثات مسجلة عبر التطبيق الكامل مقابل خادم واجهة محلي
+Replay recorded updates through the full application against a local API server
+
+الاستخدام / Usage:
+    python -m benchmarks.replay capture.jsonl [--speedup 10] [--report report.json]
+    python -m benchmarks.replay capture.jsonl.0 capture.jsonl.1 ...
+    python -m benchmarks.replay --scenario raid [--speedup 5] [--expect report.json]
+
+التسجيل يتم بتشغيل البوت مع REPLAY_CAPTURE_FILE و REPLAY_CAPTURE_SALT.
+--speedup يضغط الفواصل الزمنية بين التحديثات، و 0 يرسلها كلها دفعة واحدة.
+--expect يقارن قرارات الإشراف بتقرير سابق ويعيد رمز الخروج 1 عند أي اختلاف.
+ملفات العمال (SHARD_WORKERS > 1) تدمج حسب وقت الاستلام.
+Captures are made by running the bot with REPLAY_CAPTURE_FILE and REPLAY_CAPTURE_SALT.
+Worker files (SHARD_WORKERS > 1) are merged by receive time.
+--speedup compresses the gaps between updates, 0 sends them all at once.
+--expect compares the moderation decisions with an earlier report and exits
+with status 1 on any difference.
+
+نوافذ السبام والغارات تقاس بوقت التسجيل فلا تتغير القرارات مع --speedup، أما المؤقتات
+(انتهاء الكتم ومهلة التحقق ونهاية الإغلاق) وحدود معدل الإرسال فتعمل بالوقت الحقيقي.
+Spam and raid windows are measured in recorded time so decisions do not change
+with --speedup, while the timers (mute expiry, verification timeouts, lockdown
+end) and the send rate limits run on real time.
+"""
+
+import argparse
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+from telegram import Update
+from telegram.ext import Application, ContextTypes, TypeHandler
+from config.settings import CONCURRENT_UPDATES, UPDATE_MAX_PENDING
+from bot.handlers import register_all_handlers
+from bot.services.container import ServiceContainer, SERVICES_KEY
+from bot.utils.metered_request import MeteredRequest
+from bot.utils.metrics import HANDLER_SECONDS, DB_SECONDS, API_SECONDS
+from bot.utils.update_processor import AdmissionQueue, ChatOrderedUpdateProcessor
+from benchmarks.corpus import build_raid_scenario
+from benchmarks.fake_api_server import ApiCall, FakeApiServer, BOT_MESSAGE_ID_BASE
+
+BOT_ID = 1
+
+# مجموعات معالجات الطوابع الزمنية حول كل معالجات البوت
+# Timestamp handler groups around every bot handler
+FIRST_GROUP = -1000
+LAST_GROUP = 1000
+
+Event = Tuple[float, Dict[str, Any]]
+
+def load_capture(*paths: Path) -> List[Event]:
+    """
+    قراءة ملفات التسجيل كأزواج (الثانية منذ أول تحديث، التحديث) مرتبة حسب الوقت
+    Read capture files as (seconds since the first update, update) pairs ordered by time
+    """
+    entries = [
+        json.loads(line)
+        for path in paths
+        for line in path.read_text(encoding='utf-8').splitlines() if line.strip()
+    ]
+    if not entries:
+        return []
+    # الترتيب ثابت فتبقى تحديثات الملف الواحد بترتيبها عند تساوي الوقت
+    # The sort is stable so one file's updates keep their order on equal times
+    entries.sort(key=lambda entry: entry['t'])
+    first = entries[0]['t']
+    return [(entry['t'] - first, entry['update']) for entry in entries]
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+def _stage(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        'count': len(ordered),
+        'p50_ms': round(_percentile(ordered, 0.50) * 1000, 3),
+        'p99_ms': round(_percentile(ordered, 0.99) * 1000, 3),
+        'max_ms': round(ordered[-1] * 1000, 3) if ordered else 0.0,
+    }
+
+def _histogram_rows(histogram) -> Dict[str, Dict[str, float]]:
+    """
+    العدد والمتوسط وحد الفئة التي تحتوي p99 لكل تسمية في المدرج
+    Count, mean and the bound of the bucket holding p99 for each label of a histogram
+    """
+    rows = {}
+    for values, child in histogram._children.items():
+        if not child.count:
+            continue
+        target, cumulative = 0.99 * child.count, 0
+        p99 = float('inf')
+        for bound, count in zip(histogram.buckets + (float('inf'),), child.counts):
+            cumulative += count
+            if cumulative >= target:
+                p99 = bound
+                break
+        rows[",".join(values)] = {
+            'count': child.count,
+            'mean_ms': round(child.sum / child.count * 1000, 3),
+            'p99_le_ms': p99 * 1000 if p99 != float('inf') else None,
+        }
+    return rows
+
+def moderation_decisions(calls: List[ApiCall]) -> List[str]:
+    """
+    قرارات الإشراف التي وصلت للواجهة، مرتبة حتى لا يؤثر توقيت التنفيذ
+    Moderation decisions that reached the API, sorted so execution timing does not matter
+    
+    حذف رسائل البوت نفسه (التحذيرات ورسائل التحقق) يعتمد على المؤقتات فيستبعد.
+    Deleting the bot's own messages (warnings and challenges) depends on timers and is left out.
+    """
+    decisions = []
+    for call in calls:
+        params = call.params
+        chat_id = params.get('chat_id')
+        if call.method in ('deleteMessage', 'deleteMessages'):
+            message_ids = params.get('message_ids') or [params.get('message_id')]
+            decisions.extend(f"delete {chat_id} {message_id}" for message_id in message_ids
+                             if int(message_id) < BOT_MESSAGE_ID_BASE)
+        elif call.method == 'restrictChatMember':
+            permissions = params.get('permissions') or {}
+            action = "unmute" if permissions.get('can_send_messages') else "mute"
+            decisions.append(f"{action} {chat_id} {params.get('user_id')}")
+        elif call.method == 'banChatMember':
+            decisions.append(f"ban {chat_id} {params.get('user_id')}")
+        elif call.method == 'unbanChatMember':
+            decisions.append(f"unban {chat_id} {params.get('user_id')}")
+        elif call.method == 'setChatPermissions':
+            permissions = params.get('permissions') or {}
+            decisions.append(f"{'unlock' if permissions.get('can_send_messages') else 'lock'} {chat_id}")
+    return sorted(decisions)
+
+async def replay(events: List[Event], speedup: float, api_latency: float,
+                 drain_timeout: float) -> Dict[str, Any]:
+    """
+    تشغيل التحديثات بنفس فواصلها مقسومة على speedup وجمع التوقيتات والقرارات
+    Feed the updates with their gaps divided by speedup and collect timings and decisions
+    """
+    server = FakeApiServer(bot_id=BOT_ID, latency=api_latency)
+    await server.start()
+    
+    with tempfile.TemporaryDirectory() as directory:
+        services = ServiceContainer(db_path=os.path.join(directory, "replay.db"))
+        builder = (
+            Application.builder()
+            .token(f"{BOT_ID}:replay")
+            .base_url(server.base_url)
+            .request(MeteredRequest(connection_pool_size=256))
+            .update_queue(AdmissionQueue(max_pending=UPDATE_MAX_PENDING))
+        )
+        if CONCURRENT_UPDATES > 1:
+            builder = builder.concurrent_updates(ChatOrderedUpdateProcessor(CONCURRENT_UPDATES))
+        app = builder.build()
+        app.bot_data[SERVICES_KEY] = services
+        
+        fed: Dict[int, float] = {}
+        started: Dict[int, float] = {}
+        queue_wait: List[float] = []
+        handling: List[float] = []
+        end_to_end: List[float] = []
+        done = asyncio.Event()
+        
+        # وقت التسجيل للتحديث الجاري معالجته في هذه المهمة
+        # Recorded time of the update being processed in this task
+        recorded_at: Dict[int, float] = {}
+        current = contextvars.ContextVar('replay_time', default=0.0)
+        services.open()
+        services.moderation.spam_tracker.clock = current.get
+        services.raid.detector.clock = current.get
+        
+        async def first(update: Update, context: ContextTypes.DEFAULT_TYPE):
+            now = time.perf_counter()
+            current.set(recorded_at[update.update_id])
+            started[update.update_id] = now
+            queue_wait.append(now - fed[update.update_id])
+        
+        async def last(update: Update, context: ContextTypes.DEFAULT_TYPE):
+            now = time.perf_counter()
+            handling.append(now - started[update.update_id])
+            end_to_end.append(now - fed[update.update_id])
+            if len(end_to_end) == len(events):
+                done.set()
+        
+        app.add_handler(TypeHandler(Update, first), group=FIRST_GROUP)
+        register_all_handlers(app)
+        app.add_handler(TypeHandler(Update, last), group=LAST_GROUP)
+        
+        await app.initialize()
+        await services.start(app)
+        await app.start()
+        
+        lateness: List[float] = []
+        try:
+            begin = time.perf_counter()
+            for offset, payload in events:
+                if speedup > 0:
+                    due = begin + offset / speedup
+                    delay = due - time.perf_counter()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    lateness.append(max(0.0, time.perf_counter() - due))
+                update = Update.de_json(payload, app.bot)
+                recorded_at[update.update_id] = offset
+                fed[update.update_id] = time.perf_counter()
+                await app.update_queue.put(update)
+            feed_seconds = time.perf_counter() - begin
+            
+            try:
+                await asyncio.wait_for(done.wait(), drain_timeout)
+            except asyncio.TimeoutError:
+                print(f"timed out with {len(events) - len(end_to_end)} update(s) still in flight")
+            processed_seconds = time.perf_counter() - begin
+        finally:
+            # إيقاف الخدمات ينفذ الإجراءات المعلقة قبل قراءة القرارات
+            # Stopping the services drains pending actions before the decisions are read
+            await app.stop()
+            await services.drain(app)
+            await app.shutdown()
+            await services.stop(app)
+            await server.stop()
+    
+    return {
+        'updates': len(events),
+        'processed': len(end_to_end),
+        'speedup': speedup,
+        'feed_seconds': round(feed_seconds, 3),
+        'processed_seconds': round(processed_seconds, 3),
+        'throughput': round(len(end_to_end) / processed_seconds, 1) if processed_seconds else 0.0,
+        'stages': {
+            'feed_lateness': _stage(lateness),
+            'queue_wait': _stage(queue_wait),
+            'handlers': _stage(handling),
+            'end_to_end': _stage(end_to_end),
+        },
+        'handlers': _histogram_rows(HANDLER_SECONDS),
+        'database': _histogram_rows(DB_SECONDS),
+        'api': _histogram_rows(API_SECONDS),
+        'api_calls': server.summary(),
+        'decisions': moderation_decisions(server.calls),
+    }
+
+def print_report(report: Dict[str, Any]):
+    print(f"updates: {report['processed']}/{report['updates']} in {report['processed_seconds']}s "
+          f"({report['throughput']} updates/s, fed over {report['feed_seconds']}s at x{report['speedup']})")
+    
+    print(f"\n{'stage':<16} {'count':>8} {'p50 ms':>10} {'p99 ms':>10} {'max ms':>10}")
+    for name, stage in report['stages'].items():
+        print(f"{name:<16} {stage['count']:>8} {stage['p50_ms']:>10.3f} {stage['p99_ms']:>10.3f} "
+              f"{stage['max_ms']:>10.3f}")
+    
+    for section in ('handlers', 'database', 'api'):
+        print(f"\n{section:<40} {'count':>8} {'mean ms':>10} {'p99 ≤ ms':>10}")
+        for name, row in sorted(report[section].items(), key=lambda item: -item[1]['count']):
+            p99 = f"{row['p99_le_ms']:g}" if row['p99_le_ms'] is not None else "inf"
+            print(f"{name:<40} {row['count']:>8} {row['mean_ms']:>10.3f} {p99:>10}")
+    
+    kinds = Counter(decision.split(' ', 1)[0] for decision in report['decisions'])
+    print(f"\ndecisions: {dict(kinds)}")
+
+def compare_decisions(decisions: List[str], expected: List[str]) -> bool:
+    """
+    طباعة القرارات الناقصة والزائدة عن التقرير المتوقع
+    Print decisions missing from or added to the expected report
+    """
+    actual, reference = Counter(decisions), Counter(expected)
+    missing = reference - actual
+    extra = actual - reference
+    for decision in sorted(missing.elements()):
+        print(f"- {decision}")
+    for decision in sorted(extra.elements()):
+        print(f"+ {decision}")
+    if missing or extra:
+        print(f"\ndecisions changed: {sum(missing.values())} missing, {sum(extra.values())} new")
+        return False
+    print(f"\ndecisions unchanged ({len(decisions)})")
+    return True
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("capture", type=Path, nargs='*', help="JSONL files written by the update recorder")
+    parser.add_argument("--scenario", choices=["raid"], help="replay a generated scenario instead of a capture")
+    parser.add_argument("--speedup", type=float, default=1.0, help="time compression factor, 0 = no pacing")
+    parser.add_argument("--seed", type=int, default=42, help="seed for scenarios and verification challenges")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="simulated API latency in seconds")
+    parser.add_argument("--drain-timeout", type=float, default=60.0, help="seconds to wait for in-flight updates")
+    parser.add_argument("--report", type=Path, help="write the report as JSON")
+    parser.add_argument("--expect", type=Path, help="report whose decisions must be reproduced")
+    args = parser.parse_args()
+    
+    # بصمات السبام تستخدم hash() المملح لكل عملية، فتثبيته شرط لتكرار القرارات
+    # Spam fingerprints use the per-process salted hash(), pinning it is required for repeatable decisions
+    if os.environ.get("PYTHONHASHSEED") != str(args.seed):
+        os.environ["PYTHONHASHSEED"] = str(args.seed)
+        os.execv(sys.executable, [sys.executable, "-m", "benchmarks.replay", *sys.argv[1:]])
+    
+    if args.scenario == "raid":
+        events = build_raid_scenario(seed=args.seed)
+    elif args.capture:
+        events = load_capture(*args.capture)
+    else:
+        parser.error("a capture file or --scenario is required")
+    
+    # سجلات المعالجات تقيس كلفة الإخراج وليس المعالجة
+    # Handler logs would measure output cost rather than processing
+    logging.disable(logging.INFO)
+    random.seed(args.seed)
+    
+    report = asyncio.run(replay(events, args.speedup, args.api_latency, args.drain_timeout))
+    print_report(report)
+    
+    if args.report:
+        args.report.write_text(json.dumps(report, indent=2, ensure_ascii=False) + "\n", encoding='utf-8')
+        print(f"saved report to {args.report}")
+    
+    if args.expect:
+        expected = json.loads(args.expect.read_text(encoding='utf-8'))
+        if not compare_decisions(report['decisions'], expected['decisions']):
+            return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
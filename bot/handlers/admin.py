@@ -10,10 +10,10 @@ import logging
 from telegram import Update
 from telegram.ext import ContextTypes, CommandHandler, ChatMemberHandler
 from telegram.constants import ChatMemberStatus
-from config.settings import MESSAGES, AUTHORIZED_ADMINS
+from config.settings import MESSAGES, AUTHORIZED_ADMINS, MUTE_DURATION
 from bot.utils.helpers import is_admin, get_user_mention
-from bot.services.moderation_service import ModerationService
-from bot.services.badwords_service import BadWordsService
+from bot.services.container import get_services
+from bot.services.badwords_service import BADWORD_ACTIONS
 
 logger = logging.getLogger(__name__)
 
@@ -93,7 +93,11 @@ async def mute_user(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     
     user_to_mute = update.message.reply_to_message.from_user
-    duration = 60  # دقيقة واحدة افتراضياً
+    services = get_services(context)
+    
+    # مدة mute_duration في إعدادات المجموعة للكتم التلقائي فقط
+    # The chat's mute_duration setting applies to automatic mutes only
+    duration = MUTE_DURATION // 60
     
     if context.args:
         try:
@@ -102,7 +106,7 @@ async def mute_user(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await update.message.reply_text("❌ مدة الكتم يجب أن تكون رقماً بالدقائق.")
             return
     
-    moderation_service = ModerationService()
+    moderation_service = services.moderation
     success = await moderation_service.mute_user(
         chat_id=update.effective_chat.id,
         user_id=user_to_mute.id,
@@ -132,7 +136,7 @@ async def unmute_user(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     user_to_unmute = update.message.reply_to_message.from_user
     
-    moderation_service = ModerationService()
+    moderation_service = get_services(context).moderation
     success = await moderation_service.unmute_user(
         chat_id=update.effective_chat.id,
         user_id=user_to_unmute.id,
@@ -162,19 +166,27 @@ async def warn_user(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_to_warn = update.message.reply_to_message.from_user
     reason = " ".join(context.args) if context.args else "لا يوجد سبب محدد"
     
-    moderation_service = ModerationService()
-    warn_count = await moderation_service.warn_user(
+    services = get_services(context)
+    warn_count = await services.moderation.warn_user(
         chat_id=update.effective_chat.id,
         user_id=user_to_warn.id,
         reason=reason
     )
+    chat_settings = await services.chat_settings.get(update.effective_chat.id)
     
     if warn_count > 0:
-        await update.message.reply_text(
+        text = (
             f"⚠️ تم تحذير {get_user_mention(user_to_warn)}\n"
-            f"عدد التحذيرات: {warn_count}/3\n"
+            f"عدد التحذيرات: {warn_count}/{chat_settings.warn_limit}\n"
             f"السبب: {reason}"
         )
+        # الكتم عند بلوغ حد التحذيرات
+        # Mute once the warning limit is reached
+        if await services.moderation.enforce_warn_limit(
+            update.effective_chat.id, user_to_warn.id, warn_count, chat_settings, context
+        ):
+            text += "\n" + MESSAGES["user_muted"].format(duration=chat_settings.mute_duration // 60)
+        await update.message.reply_text(text)
     else:
         await update.message.reply_text("❌ حدث خطأ أثناء تحذير العضو.")
 
@@ -200,15 +212,17 @@ async def add_bad_word(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("❌ يرجى إدخال كلمة صحيحة.")
         return
     
-    badwords_service = BadWordsService()
+    badwords_service = get_services(context).badwords
     
     try:
-        success = await badwords_service.add_offensive_word(word_to_add)
+        # الإضافة تخص هذه المجموعة فقط
+        # The addition applies to this chat only
+        success = await badwords_service.add_chat_word(update.effective_chat.id, word_to_add)
         
         if success:
             await update.message.reply_text(
-                f"✅ تم إضافة الكلمة المسيئة بنجاح: `{word_to_add}`\n"
-                f"سيتم حذف أي رسالة تحتوي عليها وكتم المرسل لمدة 5 دقائق.",
+                f"✅ تم إضافة الكلمة المسيئة بنجاح في هذه المجموعة: `{word_to_add}`\n"
+                f"سيتم حذف أي رسالة تحتوي عليها وتطبيق إجراء المجموعة على المرسل.",
                 parse_mode='Markdown'
             )
             logger.info(f"تم إضافة كلمة مسيئة جديدة: {word_to_add} بواسطة المشرف {update.effective_user.id}")
@@ -231,11 +245,11 @@ async def list_bad_words(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("🔐 هذا الأمر متاح للمشرفين فقط.")
         return
     
-    badwords_service = BadWordsService()
+    badwords_service = get_services(context).badwords
     
     try:
-        words_list = await badwords_service.get_badwords_list()
-        words_count = await badwords_service.get_badwords_count()
+        words_list = await badwords_service.get_badwords_list(update.effective_chat.id)
+        words_count = len(words_list)
         
         if words_count == 0:
             await update.message.reply_text("📝 لا توجد كلمات مسيئة في القائمة حالياً.")
@@ -261,6 +275,143 @@ async def list_bad_words(update: Update, context: ContextTypes.DEFAULT_TYPE):
         logger.error(f"خطأ في عرض قائمة الكلمات المسيئة: {e}")
         await update.message.reply_text("❌ حدث خطأ أثناء عرض القائمة.")
 
+async def allow_bad_word(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    استثناء كلمة من القائمة المشتركة في هذه المجموعة
+    Exempt a shared-list word in this chat
+    """
+    if not await is_admin(update.effective_chat.id, update.effective_user.id, context):
+        await update.message.reply_text("🔐 هذا الأمر متاح للمشرفين فقط.")
+        return
+    
+    word = " ".join(context.args).strip() if context.args else ""
+    if not word:
+        await update.message.reply_text("📝 الاستخدام: `/allowbad كلمة`", parse_mode='Markdown')
+        return
+    
+    badwords_service = get_services(context).badwords
+    
+    try:
+        if await badwords_service.allow_chat_word(update.effective_chat.id, word):
+            await update.message.reply_text(
+                f"✅ تم السماح بالكلمة `{word}` في هذه المجموعة.",
+                parse_mode='Markdown'
+            )
+        else:
+            await update.message.reply_text(
+                f"❌ الكلمة `{word}` ليست في القائمة المشتركة أو مسموحة بالفعل.",
+                parse_mode='Markdown'
+            )
+    
+    except Exception as e:
+        logger.error(f"خطأ في استثناء كلمة: {e}")
+        await update.message.reply_text("❌ حدث خطأ أثناء استثناء الكلمة.")
+
+async def remove_bad_word(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    إزالة كلمة من إضافات أو استثناءات هذه المجموعة
+    Remove a word from this chat's additions or exemptions
+    """
+    if not await is_admin(update.effective_chat.id, update.effective_user.id, context):
+        await update.message.reply_text("🔐 هذا الأمر متاح للمشرفين فقط.")
+        return
+    
+    word = " ".join(context.args).strip() if context.args else ""
+    if not word:
+        await update.message.reply_text("📝 الاستخدام: `/delbad كلمة`", parse_mode='Markdown')
+        return
+    
+    badwords_service = get_services(context).badwords
+    
+    try:
+        if await badwords_service.remove_chat_word(update.effective_chat.id, word):
+            await update.message.reply_text(
+                f"✅ تمت إزالة `{word}` من قائمة هذه المجموعة.",
+                parse_mode='Markdown'
+            )
+        else:
+            await update.message.reply_text(
+                f"❌ الكلمة `{word}` غير موجودة في قائمة هذه المجموعة.",
+                parse_mode='Markdown'
+            )
+    
+    except Exception as e:
+        logger.error(f"خطأ في إزالة كلمة من المجموعة: {e}")
+        await update.message.reply_text("❌ حدث خطأ أثناء إزالة الكلمة.")
+
+async def set_bad_word_action(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    تغيير الإجراء المتبع عند اكتشاف كلمة محظورة في هذه المجموعة
+    Change the action taken when a bad word is found in this chat
+    """
+    if not await is_admin(update.effective_chat.id, update.effective_user.id, context):
+        await update.message.reply_text("🔐 هذا الأمر متاح للمشرفين فقط.")
+        return
+    
+    badwords_service = get_services(context).badwords
+    chat_id = update.effective_chat.id
+    
+    if not context.args:
+        action = await badwords_service.get_chat_action(chat_id)
+        await update.message.reply_text(
+            f"⚙️ الإجراء الحالي: `{action}`\n"
+            f"📝 الاستخدام: `/badaction {'|'.join(BADWORD_ACTIONS)}`",
+            parse_mode='Markdown'
+        )
+        return
+    
+    action = context.args[0].lower()
+    if await badwords_service.set_chat_action(chat_id, action):
+        await update.message.reply_text(f"✅ تم تغيير إجراء الكلمات المحظورة إلى `{action}`.", parse_mode='Markdown')
+        logger.info(f"تم تغيير إجراء الكلمات المحظورة في المجموعة {chat_id} إلى {action}")
+    else:
+        await update.message.reply_text(
+            f"❌ إجراء غير صالح. الإجراءات المتاحة: {'، '.join(BADWORD_ACTIONS)}"
+        )
+
+async def reload_bad_words(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    إعادة تحميل قائمة الكلمات المحظورة من الملف
+    Reload the bad words list from its file
+    """
+    if not await is_admin(update.effective_chat.id, update.effective_user.id, context):
+        await update.message.reply_text("🔐 هذا الأمر متاح للمشرفين فقط.")
+        return
+    
+    badwords_service = get_services(context).badwords
+    
+    try:
+        await badwords_service.reload(force=True)
+        snapshot = badwords_service.snapshot
+        await update.message.reply_text(
+            f"🔄 تم تحديث قائمة الكلمات المحظورة\n"
+            f"الإصدار: {snapshot.generation}\n"
+            f"عدد الكلمات: {len(snapshot.words)}\n"
+            f"مدة البناء: {snapshot.build_time * 1000:.1f} مللي ثانية"
+        )
+        logger.info(f"تم تحديث قائمة الكلمات المحظورة بواسطة المشرف {update.effective_user.id}")
+    
+    except Exception as e:
+        logger.error(f"خطأ في تحديث قائمة الكلمات المحظورة: {e}")
+        await update.message.reply_text("❌ حدث خطأ أثناء تحديث القائمة.")
+
+async def track_admin_changes(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    تحديث ذاكرة المشرفين عند ترقية أو تنزيل عضو
+    Update the admin cache when a member is promoted or demoted
+    """
+    chat_member = update.chat_member
+    if not chat_member:
+        return
+    
+    admin_cache = get_services(context).admin_cache
+    if admin_cache is not None:
+        admin_cache.update_member(
+            chat_id=chat_member.chat.id,
+            user_id=chat_member.new_chat_member.user.id,
+            status=chat_member.new_chat_member.status
+        )
+
 def register_admin_handlers(app):
     """
     تسجيل معالجات أوامر المشرفين
@@ -274,4 +425,12 @@ def register_admin_handlers(app):
     app.add_handler(CommandHandler("warn", warn_user))
     app.add_handler(CommandHandler("addbad", add_bad_word))
     app.add_handler(CommandHandler("listbad", list_bad_words))
+    app.add_handler(CommandHandler("allowbad", allow_bad_word))
+    app.add_handler(CommandHandler("delbad", remove_bad_word))
+    app.add_handler(CommandHandler("badaction", set_bad_word_action))
+    app.add_handler(CommandHandler("reloadbad", reload_bad_words))
+    
+    # مجموعة منفصلة حتى لا تمنع معالج الأعضاء الجدد
+    # Separate group so it does not shadow the new member handler
+    app.add_handler(ChatMemberHandler(track_admin_changes, ChatMemberHandler.CHAT_MEMBER), group=-1)
     logger.info("Admin handlers registered successfully")
@@ -10,6 +10,8 @@ import logging
 from telegram import Update
 from telegram.ext import ContextTypes, CommandHandler
 from config.settings import MESSAGES
+from bot.services.container import get_services
+from bot.services.chat_settings_service import LIMITS
 from bot.utils.helpers import is_admin, get_user_mention
 
 logger = logging.getLogger(__name__)
@@ -73,10 +75,15 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "/mute - كتم عضو (رد على رسالته)\n"
             "/unmute - إلغاء كتم عضو (رد على رسالته)\n"
             "/warn - تحذير عضو (رد على رسالته)\n"
-            "/addbad - إضافة كلمة مسيئة (تحذف الرسالة وتكتم المرسل)\n"
+            "/addbad - إضافة كلمة مسيئة في هذه المجموعة\n"
+            "/allowbad - السماح بكلمة من القائمة العامة في هذه المجموعة\n"
+            "/delbad - إزالة كلمة من قائمة هذه المجموعة\n"
+            "/badaction - إجراء الكلمات المسيئة (mute أو delete أو warn)\n"
             "/listbad - عرض قائمة الكلمات المسيئة\n"
+            "/reloadbad - إعادة تحميل قائمة الكلمات من الملف\n"
             "/stats - إحصائيات المجموعة\n"
-            "/settings - إعدادات البوت\n\n"
+            "/settings - إعدادات البوت\n"
+            "/set - ضبط حدود المجموعة\n\n"
         )
     
     help_text += (
@@ -127,6 +134,7 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # Get group information
         chat = await context.bot.get_chat(chat_id)
         member_count = await context.bot.get_chat_member_count(chat_id)
+        chat_settings = await get_services(context).chat_settings.get(chat_id)
         
         stats_text = (
             f"📊 **إحصائيات المجموعة:**\n\n"
@@ -134,10 +142,10 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             f"📝 **اسم المجموعة:** {chat.title}\n"
             f"🆔 **معرف المجموعة:** `{chat_id}`\n\n"
             f"🛡️ **حالة الحماية:**\n"
-            f"{'✅' if True else '❌'} فلترة الكلمات المحظورة\n"
-            f"{'✅' if True else '❌'} منع السبام\n"
-            f"{'✅' if True else '❌'} التحقق من الأعضاء الجدد\n"
-            f"{'✅' if True else '❌'} الحماية من الغارات"
+            f"{'✅' if chat_settings.badwords else '❌'} فلترة الكلمات المحظورة\n"
+            f"{'✅' if chat_settings.spam else '❌'} منع السبام\n"
+            f"{'✅' if chat_settings.verification else '❌'} التحقق من الأعضاء الجدد\n"
+            f"{'✅' if chat_settings.antiraid else '❌'} الحماية من الغارات"
         )
         
         await update.message.reply_text(stats_text, parse_mode='Markdown')
@@ -158,6 +166,8 @@ async def settings_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text(MESSAGES["admin_only"])
         return
     
+    chat_settings = await get_services(context).chat_settings.get(chat_id)
+    
     settings_text = (
         "⚙️ **إعدادات البوت:**\n\n"
         "لتغيير الإعدادات، استخدم الأوامر التالية:\n\n"
@@ -165,16 +175,119 @@ async def settings_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "/toggle_verification - تشغيل/إيقاف التحقق من الأعضاء\n"
         "/toggle_badwords - تشغيل/إيقاف فلترة الكلمات المحظورة\n"
         "/toggle_spam - تشغيل/إيقاف منع السبام\n"
-        "/toggle_antiraid - تشغيل/إيقاف الحماية من الغارات\n\n"
+        "/toggle_antiraid - تشغيل/إيقاف الحماية من الغارات\n"
+        "/set spam\\_threshold|warn\\_limit|mute\\_duration قيمة - ضبط الحدود (مدة الكتم بالدقائق)\n\n"
         "📋 **الإعدادات الحالية:**\n"
-        f"{'✅' if True else '❌'} التحقق من الأعضاء الجدد\n"
-        f"{'✅' if True else '❌'} فلترة الكلمات المحظورة\n"
-        f"{'✅' if True else '❌'} منع السبام\n"
-        f"{'✅' if True else '❌'} الحماية من الغارات"
+        f"{'✅' if chat_settings.verification else '❌'} التحقق من الأعضاء الجدد\n"
+        f"{'✅' if chat_settings.badwords else '❌'} فلترة الكلمات المحظورة\n"
+        f"{'✅' if chat_settings.spam else '❌'} منع السبام\n"
+        f"{'✅' if chat_settings.antiraid else '❌'} الحماية من الغارات\n\n"
+        f"📏 **الحدود:**\n"
+        f"• حد السبام: {chat_settings.spam_threshold} رسائل\n"
+        f"• حد التحذيرات: {chat_settings.warn_limit}\n"
+        f"• مدة الكتم التلقائي: {chat_settings.mute_duration // 60} دقيقة"
     )
     
     await update.message.reply_text(settings_text, parse_mode='Markdown')
 
+async def _toggle_feature(update: Update, context: ContextTypes.DEFAULT_TYPE, name: str, label: str):
+    """
+    تبديل ميزة في إعدادات المجموعة
+    Toggle a feature in the chat's settings
+    """
+    user_id = update.effective_user.id
+    chat_id = update.effective_chat.id
+    
+    if update.effective_chat.type == 'private':
+        await update.message.reply_text(MESSAGES["group_only"])
+        return
+    
+    if not await is_admin(chat_id, user_id, context):
+        await update.message.reply_text(MESSAGES["admin_only"])
+        return
+    
+    enabled = await get_services(context).chat_settings.toggle(chat_id, name)
+    
+    if enabled is None:
+        await update.message.reply_text("❌ حدث خطأ أثناء حفظ الإعدادات.")
+    elif enabled:
+        await update.message.reply_text(f"✅ تم تشغيل {label} في هذه المجموعة.")
+    else:
+        await update.message.reply_text(f"❌ تم إيقاف {label} في هذه المجموعة.")
+
+async def toggle_verification_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    تشغيل/إيقاف التحقق من الأعضاء الجدد
+    Toggle new member verification
+    """
+    await _toggle_feature(update, context, 'verification', "التحقق من الأعضاء الجدد")
+
+async def toggle_badwords_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    تشغيل/إيقاف فلترة الكلمات المحظورة
+    Toggle the bad words filter
+    """
+    await _toggle_feature(update, context, 'badwords', "فلترة الكلمات المحظورة")
+
+async def toggle_spam_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    تشغيل/إيقاف منع السبام
+    Toggle spam detection
+    """
+    await _toggle_feature(update, context, 'spam', "منع السبام")
+
+async def toggle_antiraid_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    تشغيل/إيقاف الحماية من الغارات
+    Toggle raid protection
+    """
+    await _toggle_feature(update, context, 'antiraid', "الحماية من الغارات")
+
+async def set_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    ضبط حد رقمي في إعدادات المجموعة
+    Set a numeric limit in the chat's settings
+    """
+    user_id = update.effective_user.id
+    chat_id = update.effective_chat.id
+    
+    if update.effective_chat.type == 'private':
+        await update.message.reply_text(MESSAGES["group_only"])
+        return
+    
+    if not await is_admin(chat_id, user_id, context):
+        await update.message.reply_text(MESSAGES["admin_only"])
+        return
+    
+    if len(context.args or []) != 2 or context.args[0] not in LIMITS:
+        await update.message.reply_text(
+            "📝 الاستخدام: /set الاسم القيمة\n"
+            f"الأسماء المتاحة: {', '.join(LIMITS)}\n"
+            "مدة الكتم التلقائي mute_duration بالدقائق"
+        )
+        return
+    
+    name = context.args[0]
+    try:
+        value = int(context.args[1])
+    except ValueError:
+        await update.message.reply_text("❌ القيمة يجب أن تكون رقماً.")
+        return
+    
+    # مدة الكتم تدخل بالدقائق مثل أمر /mute وتحفظ بالثواني
+    # The mute duration is entered in minutes like /mute and stored in seconds
+    stored = value * 60 if name == 'mute_duration' else value
+    
+    if await get_services(context).chat_settings.set_limit(chat_id, name, stored):
+        await update.message.reply_text(f"✅ تم ضبط {name} على {value}.")
+    else:
+        _, minimum, maximum = LIMITS[name]
+        if name == 'mute_duration':
+            minimum, maximum = minimum // 60, maximum // 60
+        await update.message.reply_text(
+            f"❌ تعذر ضبط {name}. القيمة يجب أن تكون بين {minimum} و {maximum}."
+        )
+
 def register_command_handlers(app):
     """
     تسجيل معالجات الأوامر
@@ -186,4 +299,9 @@ def register_command_handlers(app):
     app.add_handler(CommandHandler("info", info_command))
     app.add_handler(CommandHandler("stats", stats_command))
     app.add_handler(CommandHandler("settings", settings_command))
+    app.add_handler(CommandHandler("toggle_verification", toggle_verification_command))
+    app.add_handler(CommandHandler("toggle_badwords", toggle_badwords_command))
+    app.add_handler(CommandHandler("toggle_spam", toggle_spam_command))
+    app.add_handler(CommandHandler("toggle_antiraid", toggle_antiraid_command))
+    app.add_handler(CommandHandler("set", set_command))
     logger.info("Command handlers registered successfully")
@@ -6,89 +6,143 @@
 Moderation and control handlers
 """
 
+import asyncio
 import logging
+from typing import Dict, List
 from telegram import Update
-from telegram.ext import ContextTypes, MessageHandler, filters
-from config.settings import ENABLE_BADWORDS_FILTER, ENABLE_SPAM_DETECTION, MESSAGES
-from bot.services.moderation_service import ModerationService
-from bot.services.badwords_service import BadWordsService
-from bot.utils.helpers import is_admin
+from telegram.ext import Application, ContextTypes, MessageHandler, filters
+from config.settings import MESSAGES
+from bot.services.container import get_services, SERVICES_KEY
+from bot.utils.helpers import is_admin, normalize_arabic
+from bot.utils.fingerprint import fingerprint_message
+from bot.utils.timer_wheel import TimerWheel
+from bot.utils.action_dispatcher import PRIORITY_CLEANUP
+from bot.utils.metrics import HANDLER_SECONDS, MESSAGES_SCANNED, BADWORD_HITS, SPAM_HITS, timed
 
 logger = logging.getLogger(__name__)
 
+# نوع مؤقت حذف الرسائل في عجلة المؤقتات
+# Message cleanup kind in the timer wheel
+DELETE_MESSAGE_TIMER = "delete_message"
+
+@timed(HANDLER_SECONDS.labels("handle_message"))
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     معالجة الرسائل للإشراف
     Handle messages for moderation
     """
-    logger.info(f"Received message update: {update}")
-    
     if not update.message or not update.message.text:
-        logger.info("No message or text content, skipping")
         return
     
     user_id = update.effective_user.id
     chat_id = update.effective_chat.id
     message_text = update.message.text
     
-    logger.info(f"Processing message from user {user_id} in chat {chat_id}: {message_text[:50]}...")
+    # التنسيق مؤجل حتى يمر السجل من مستوى التسجيل والعينة، وهو السجل الوحيد المعلم للعينة
+    # لأنه يتكرر مع كل رسالة
+    # Formatting is deferred until the record passes the level and the sampling, it is the only
+    # record marked for sampling since it repeats for every message
+    logger.debug("معالجة رسالة من المستخدم %s في المجموعة %s", user_id, chat_id,
+                 extra={'chat_id': chat_id, 'user_id': user_id, 'sample': True})
     
     # تجاهل رسائل المشرفين
     # Ignore admin messages
     if await is_admin(chat_id, user_id, context):
         return
     
-    moderation_service = ModerationService()
+    MESSAGES_SCANNED.inc()
+    services = get_services(context)
+    moderation_service = services.moderation
+    chat_settings = await services.chat_settings.get(chat_id)
+    
+    # توحيد النص مرة واحدة لجميع الفلاتر
+    # Normalize the text once for every filter
+    normalized_text = normalize_arabic(message_text)
+    fingerprint = fingerprint_message(normalized_text)
+    
+    # فحص رسائل الحسابات الجديدة أثناء الغارات
+    # Check messages from new accounts during raids
+    if chat_settings.antiraid:
+        if await services.raid.check_message(chat_id, user_id, *fingerprint, context):
+            services.dispatcher.delete_message(chat_id, update.message.message_id)
+            return
     
     # فحص الكلمات المحظورة والمسيئة
     # Check for banned and offensive words
-    if ENABLE_BADWORDS_FILTER:
-        badwords_service = BadWordsService()
-        if await badwords_service.contains_offensive_word(message_text):
+    if chat_settings.badwords:
+        badwords_service = services.badwords
+        if await badwords_service.contains_offensive_word(message_text, normalized_text, chat_id):
+            BADWORD_HITS.inc()
             try:
-                # حذف الرسالة فوراً
-                # Delete the message immediately
-                await update.message.delete()
+                # إجراء المجموعة: كتم أو حذف فقط أو تحذير
+                # The chat's action: mute, delete only, or warn
+                action = await badwords_service.get_chat_action(chat_id)
                 
-                # كتم المستخدم لمدة 5 دقائق (300 ثانية)
-                # Mute the user for 5 minutes (300 seconds)
-                mute_duration = 300
-                mute_success = await moderation_service.mute_user(
-                    chat_id=chat_id,
-                    user_id=user_id,
-                    duration=mute_duration,
-                    context=context
-                )
+                # حذف الرسالة فوراً بأعلى أولوية
+                # Delete the message immediately with the highest priority
+                services.dispatcher.delete_message(chat_id, update.message.message_id)
+                
+                mute_success = False
+                warn_count = 0
+                if action == "mute":
+                    # كتم المستخدم حسب مدة الكتم في إعدادات المجموعة
+                    # Mute the user for the duration in the chat's settings
+                    mute_success = await moderation_service.mute_user(
+                        chat_id=chat_id,
+                        user_id=user_id,
+                        duration=chat_settings.mute_duration,
+                        context=context
+                    )
+                elif action == "warn":
+                    warn_count = await moderation_service.warn_user(
+                        chat_id=chat_id,
+                        user_id=user_id,
+                        reason="كلمة مسيئة"
+                    )
+                    # الكتم عند بلوغ حد التحذيرات
+                    # Mute once the warning limit is reached
+                    mute_success = await moderation_service.enforce_warn_limit(
+                        chat_id=chat_id,
+                        user_id=user_id,
+                        warn_count=warn_count,
+                        settings=chat_settings,
+                        context=context
+                    )
                 
                 if mute_success:
                     # إرسال تحذير بالعربية
                     # Send warning in Arabic
-                    warning_message = await context.bot.send_message(
-                        chat_id=chat_id,
-                        text=f"🚫 {update.effective_user.mention_html()}\n"
-                             f"تم حذف رسالتك لاحتوائها على كلمات مسيئة وتم كتمك لمدة 5 دقائق.\n"
-                             f"يُرجى احترام قوانين المجموعة.",
-                        parse_mode='HTML'
+                    warning_text = (
+                        f"🚫 {update.effective_user.mention_html()}\n"
+                        f"تم حذف رسالتك لاحتوائها على كلمات مسيئة وتم كتمك لمدة "
+                        f"{chat_settings.mute_duration // 60} دقيقة.\n"
+                        f"يُرجى احترام قوانين المجموعة."
+                    )
+                elif warn_count:
+                    warning_text = (
+                        f"🚫 {update.effective_user.mention_html()}\n"
+                        f"تم حذف رسالتك لاحتوائها على كلمات مسيئة.\n"
+                        f"{MESSAGES['user_warned'].format(count=warn_count, limit=chat_settings.warn_limit)}"
                     )
                 else:
-                    # إرسال تحذير بدون كتم إذا فشل الكتم
-                    # Send warning without mute if muting failed
-                    warning_message = await context.bot.send_message(
-                        chat_id=chat_id,
-                        text=f"🚫 {update.effective_user.mention_html()}\n"
-                             f"تم حذف رسالتك لاحتوائها على كلمات مسيئة.\n"
-                             f"يُرجى احترام قوانين المجموعة.",
-                        parse_mode='HTML'
+                    # إرسال تحذير بدون كتم إذا فشل الكتم أو كان الإجراء الحذف فقط
+                    # Send warning without mute if muting failed or the action is delete only
+                    warning_text = (
+                        f"🚫 {update.effective_user.mention_html()}\n"
+                        f"تم حذف رسالتك لاحتوائها على كلمات مسيئة.\n"
+                        f"يُرجى احترام قوانين المجموعة."
                     )
                 
-                # حذف رسالة التحذير بعد 15 ثانية
-                # Delete warning message after 15 seconds
-                context.job_queue.run_once(
-                    delete_message,
-                    15,
-                    data={'chat_id': chat_id, 'message_id': warning_message.message_id}
+                warning_message = services.dispatcher.send_message(
+                    chat_id=chat_id,
+                    text=warning_text,
+                    parse_mode='HTML'
                 )
                 
+                # حذف رسالة التحذير بعد 15 ثانية من إرسالها دون انتظار الطابور
+                # Delete warning message 15 seconds after it is sent, without waiting on the queue
+                schedule_notice_deletion(services.timers, chat_id, warning_message, 15)
+                
                 # تسجيل مخالفة
                 # Log violation
                 await moderation_service.log_violation(
@@ -98,7 +152,9 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
                     content=message_text
                 )
                 
-                logger.info(f"تم حذف رسالة تحتوي على كلمات مسيئة وكتم المستخدم {user_id}")
+                logger.info("تم حذف رسالة تحتوي على كلمات مسيئة من المستخدم %s (الإجراء: %s)", user_id, action,
+                            extra={'chat_id': chat_id, 'user_id': user_id, 'action': action,
+                                   'violation': 'offensive_word'})
                 
             except Exception as e:
                 logger.error(f"خطأ في معالجة الكلمة المسيئة: {e}")
@@ -107,46 +163,47 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     # فحص السبام
     # Check for spam
-    if ENABLE_SPAM_DETECTION:
+    if chat_settings.spam:
         is_spam = await moderation_service.check_spam(
             chat_id=chat_id,
             user_id=user_id,
-            message_text=message_text
+            message_text=message_text,
+            fingerprint=fingerprint,
+            threshold=chat_settings.spam_threshold
         )
         
         if is_spam:
+            SPAM_HITS.inc()
             try:
                 # حذف الرسالة
                 # Delete the message
-                await update.message.delete()
+                services.dispatcher.delete_message(chat_id, update.message.message_id)
                 
                 # كتم المستخدم مؤقتاً
                 # Temporarily mute user
                 await moderation_service.mute_user(
                     chat_id=chat_id,
                     user_id=user_id,
-                    duration=300,  # 5 دقائق
+                    duration=chat_settings.mute_duration,
                     context=context
                 )
                 
                 # إرسال تحذير
                 # Send warning
-                spam_message = await context.bot.send_message(
+                spam_message = services.dispatcher.send_message(
                     chat_id=chat_id,
                     text=f"🚨 {update.effective_user.mention_html()}, "
-                         f"تم اكتشاف سبام! تم كتمك لمدة 5 دقائق.",
+                         f"تم اكتشاف سبام! تم كتمك لمدة {chat_settings.mute_duration // 60} دقيقة.",
                     parse_mode='HTML'
                 )
                 
                 # حذف رسالة التحذير بعد 15 ثانية
                 # Delete warning message after 15 seconds
-                context.job_queue.run_once(
-                    delete_message,
-                    15,
-                    data={'chat_id': chat_id, 'message_id': spam_message.message_id}
-                )
+                schedule_notice_deletion(services.timers, chat_id, spam_message, 15)
                 
-                logger.info(f"تم كتم المستخدم {user_id} لإرسال سبام")
+                logger.info("تم كتم المستخدم %s لإرسال سبام", user_id,
+                            extra={'chat_id': chat_id, 'user_id': user_id, 'action': 'mute',
+                                   'violation': 'spam'})
                 
             except Exception as e:
                 logger.error(f"خطأ في معالجة السبام: {e}")
@@ -174,18 +231,16 @@ async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if await is_admin(chat_id, user_id, context):
         return
     
-    moderation_service = ModerationService()
+    services = get_services(context)
     
     # فحص إذا كان العضو مكتوماً
     # Check if user is muted
-    is_muted = await moderation_service.is_user_muted(chat_id, user_id)
+    is_muted = await services.moderation.is_user_muted(chat_id, user_id)
     
     if is_muted:
-        try:
-            await update.message.delete()
-            logger.info(f"تم حذف صورة من مستخدم مكتوم {user_id}")
-        except Exception as e:
-            logger.error(f"خطأ في حذف صورة من مستخدم مكتوم: {e}")
+        services.dispatcher.delete_message(chat_id, update.message.message_id)
+        logger.info("تم حذف صورة من مستخدم مكتوم %s", user_id,
+                    extra={'chat_id': chat_id, 'user_id': user_id, 'action': 'delete'})
 
 async def handle_document(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
@@ -200,32 +255,51 @@ async def handle_document(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if await is_admin(chat_id, user_id, context):
         return
     
-    moderation_service = ModerationService()
+    services = get_services(context)
     
     # فحص إذا كان العضو مكتوماً
     # Check if user is muted
-    is_muted = await moderation_service.is_user_muted(chat_id, user_id)
+    is_muted = await services.moderation.is_user_muted(chat_id, user_id)
     
     if is_muted:
-        try:
-            await update.message.delete()
-            logger.info(f"تم حذف ملف من مستخدم مكتوم {user_id}")
-        except Exception as e:
-            logger.error(f"خطأ في حذف ملف من مستخدم مكتوم: {e}")
+        services.dispatcher.delete_message(chat_id, update.message.message_id)
+        logger.info("تم حذف ملف من مستخدم مكتوم %s", user_id,
+                    extra={'chat_id': chat_id, 'user_id': user_id, 'action': 'delete'})
+
+def schedule_message_deletion(timers: TimerWheel, chat_id: int, message_id: int, delay: float):
+    """
+    جدولة حذف رسالة
+    Schedule a message deletion
+    """
+    timers.schedule(
+        DELETE_MESSAGE_TIMER,
+        f"delete_{chat_id}_{message_id}",
+        delay,
+        {'chat_id': chat_id, 'message_id': message_id}
+    )
+
+def schedule_notice_deletion(timers: TimerWheel, chat_id: int, notice: asyncio.Future, delay: float):
+    """
+    جدولة حذف إشعار عند إرساله، والإشعار قد يسقط عند امتلاء الطابور أو يفشل
+    Schedule a notice's deletion once it is sent, the notice may be shed when the queue is full or fail
+    """
+    def on_sent(future: asyncio.Future):
+        if future.cancelled() or future.exception() is not None:
+            return
+        message = future.result()
+        if message is not None:
+            schedule_message_deletion(timers, chat_id, message.message_id, delay)
+    
+    notice.add_done_callback(on_sent)
 
-async def delete_message(context: ContextTypes.DEFAULT_TYPE):
+async def delete_messages(application: Application, items: List[Dict]):
     """
-    حذف رسالة مجدولة
-    Delete a scheduled message
+    حذف الرسائل المجدولة التي حان موعدها، وتجمع لكل مجموعة في طلب واحد
+    Delete scheduled messages that are due, grouped into one request per chat
     """
-    job_data = context.job.data
-    chat_id = job_data['chat_id']
-    message_id = job_data['message_id']
-    
-    try:
-        await context.bot.delete_message(chat_id=chat_id, message_id=message_id)
-    except Exception as e:
-        logger.error(f"خطأ في حذف الرسالة المجدولة: {e}")
+    dispatcher = application.bot_data[SERVICES_KEY].dispatcher
+    for item in items:
+        dispatcher.delete_message(item['chat_id'], item['message_id'], priority=PRIORITY_CLEANUP)
 
 def register_moderation_handlers(app):
     """
@@ -236,4 +310,5 @@ def register_moderation_handlers(app):
     app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
     app.add_handler(MessageHandler(filters.PHOTO, handle_photo))
     app.add_handler(MessageHandler(filters.Document.ALL, handle_document))
+    app.bot_data[SERVICES_KEY].timers.register(DELETE_MESSAGE_TIMER, delete_messages)
     logger.info("Moderation handlers registered successfully")
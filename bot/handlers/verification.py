@@ -6,24 +6,31 @@
 New member verification handlers
 """
 
+import asyncio
 import logging
+from typing import Dict, List
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import ContextTypes, ChatMemberHandler, CallbackQueryHandler
+from telegram.ext import Application, ContextTypes, ChatMemberHandler, CallbackQueryHandler
 from telegram.constants import ChatMemberStatus
-from config.settings import MESSAGES, ENABLE_VERIFICATION
-from bot.services.verification_service import VerificationService
+from config.settings import MESSAGES, VERIFICATION_TIMEOUT
+from bot.services.container import get_services, SERVICES_KEY
 from bot.utils.helpers import get_user_mention
+from bot.utils.timer_wheel import TimerWheel
+from bot.utils.action_dispatcher import PRIORITY_CLEANUP
+from bot.utils.metrics import HANDLER_SECONDS, PENDING_VERIFICATIONS, timed
 
 logger = logging.getLogger(__name__)
 
+# نوع مؤقت مهلة التحقق في عجلة المؤقتات
+# Verification timeout kind in the timer wheel
+VERIFICATION_TIMER = "verification_timeout"
+
+@timed(HANDLER_SECONDS.labels("handle_new_member"))
 async def handle_new_member(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     معالجة الأعضاء الجدد
     Handle new members joining the group
     """
-    if not ENABLE_VERIFICATION:
-        return
-    
     chat_member = update.chat_member
     
     # التحقق من انضمام عضو جديد
@@ -41,7 +48,18 @@ async def handle_new_member(update: Update, context: ContextTypes.DEFAULT_TYPE):
         
         logger.info(f"عضو جديد انضم للمجموعة: {user.id}")
         
-        verification_service = VerificationService()
+        services = get_services(context)
+        chat_settings = await services.chat_settings.get(chat_id)
+        
+        # تتبع معدل الانضمام للحماية من الغارات
+        # Track the join rate for raid protection
+        if chat_settings.antiraid:
+            await services.raid.record_join(chat_id, user.id, context)
+        
+        if not chat_settings.verification:
+            return
+        
+        verification_service = services.verification
         
         # إنشاء تحدي التحقق
         # Create verification challenge
@@ -84,18 +102,35 @@ async def handle_new_member(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 reply_markup=reply_markup
             )
             
+            await verification_service.set_challenge_message(chat_id, user.id, message.message_id)
+            
             # جدولة حذف الرسالة والعضو في حالة عدم التحقق
             # Schedule message deletion and member removal if verification fails
-            context.job_queue.run_once(
-                verification_timeout,
-                300,  # 5 دقائق
-                data={
-                    'chat_id': chat_id,
-                    'user_id': user.id,
-                    'message_id': message.message_id
-                }
-            )
+            schedule_verification_timeout(get_services(context).timers, chat_id, user.id, VERIFICATION_TIMEOUT)
+
+def _timeout_key(chat_id: int, user_id: int) -> str:
+    return f"verification_{chat_id}_{user_id}"
+
+def schedule_verification_timeout(timers: TimerWheel, chat_id: int, user_id: int, delay: float):
+    """
+    جدولة مهلة التحقق لعضو
+    Schedule the verification timeout of a member
+    """
+    timers.schedule(
+        VERIFICATION_TIMER,
+        _timeout_key(chat_id, user_id),
+        delay,
+        {'chat_id': chat_id, 'user_id': user_id}
+    )
+
+def cancel_verification_timeout(timers: TimerWheel, chat_id: int, user_id: int):
+    """
+    إلغاء مهلة التحقق بعد حل التحدي
+    Cancel the verification timeout once the challenge is resolved
+    """
+    timers.cancel(_timeout_key(chat_id, user_id))
 
+@timed(HANDLER_SECONDS.labels("handle_verification_callback"))
 async def handle_verification_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     معالجة استجابة التحقق
@@ -119,16 +154,18 @@ async def handle_verification_callback(update: Update, context: ContextTypes.DEF
         await query.answer("❌ هذا التحقق ليس لك!", show_alert=True)
         return
     
-    verification_service = VerificationService()
+    verification_service = get_services(context).verification
     
     if answer == "wrong":
         # إجابة خاطئة
         # Wrong answer
-        await verification_service.handle_wrong_answer(
+        still_pending = await verification_service.handle_wrong_answer(
             chat_id=query.message.chat.id,
             user_id=user_id,
             context=context
         )
+        if not still_pending:
+            cancel_verification_timeout(get_services(context).timers, query.message.chat.id, user_id)
         
         await query.edit_message_text(
             "❌ إجابة خاطئة! حاول مرة أخرى.\n"
@@ -143,6 +180,7 @@ async def handle_verification_callback(update: Update, context: ContextTypes.DEF
         )
         
         if success:
+            cancel_verification_timeout(get_services(context).timers, query.message.chat.id, user_id)
             await query.edit_message_text(
                 f"✅ تم التحقق بنجاح!\n"
                 f"مرحباً بك {get_user_mention(query.from_user)} في المجموعة!"
@@ -150,29 +188,41 @@ async def handle_verification_callback(update: Update, context: ContextTypes.DEF
         else:
             await query.edit_message_text("❌ حدث خطأ أثناء التحقق.")
 
-async def verification_timeout(context: ContextTypes.DEFAULT_TYPE):
+async def verification_timeouts(application: Application, items: List[Dict]):
+    """
+    معالج عجلة المؤقتات لجميع مهلات التحقق المنتهية في نفس النبضة
+    Timer wheel handler for every verification timeout expiring in the same tick
+    """
+    await asyncio.gather(*(
+        verification_timeout(application, item['chat_id'], item['user_id']) for item in items
+    ))
+
+async def verification_timeout(application: Application, chat_id: int, user_id: int):
     """
     معالجة انتهاء وقت التحقق
     Handle verification timeout
     """
-    job_data = context.job.data
-    chat_id = job_data['chat_id']
-    user_id = job_data['user_id']
-    message_id = job_data['message_id']
+    # تجاهل المهلة إذا تم حل التحدي مسبقاً
+    # Ignore the timeout if the challenge was already resolved
+    services = application.bot_data[SERVICES_KEY]
+    entry = await services.verification.expire_challenge(chat_id, user_id)
+    if entry is None:
+        return
     
+    dispatcher = services.dispatcher
     try:
         # حذف رسالة التحقق
         # Delete verification message
-        await context.bot.delete_message(chat_id=chat_id, message_id=message_id)
+        if entry['message_id']:
+            dispatcher.delete_message(chat_id, entry['message_id'], priority=PRIORITY_CLEANUP)
         
         # طرد العضو
         # Remove member
-        await context.bot.ban_chat_member(chat_id=chat_id, user_id=user_id)
-        await context.bot.unban_chat_member(chat_id=chat_id, user_id=user_id)
+        await dispatcher.kick(chat_id=chat_id, user_id=user_id)
         
         # إرسال رسالة إشعار
         # Send notification message
-        await context.bot.send_message(
+        dispatcher.send_message(
             chat_id=chat_id,
             text=f"⏰ انتهت مهلة التحقق للعضو {user_id}. تم طرده من المجموعة."
         )
@@ -182,6 +232,37 @@ async def verification_timeout(context: ContextTypes.DEFAULT_TYPE):
     except Exception as e:
         logger.error(f"خطأ في معالجة انتهاء وقت التحقق: {e}")
 
+async def restore_pending_verifications(application: Application):
+    """
+    إعادة جدولة مهلات التحقق المعلقة بعد إعادة التشغيل
+    Reschedule pending verification timeouts after a restart
+    """
+    try:
+        services = application.bot_data[SERVICES_KEY]
+        pending = await services.verification.load_pending(services.owns)
+        
+        # المهلات محفوظة في عجلة المؤقتات، ويعاد فقط جدولة ما ليس له مؤقت
+        # والمهلات المنتهية أثناء التوقف تنفذ في النبضة التالية
+        # Deadlines persist in the timer wheel, only challenges without a timer
+        # are rescheduled, and deadlines that passed while down fire on the next tick
+        restored = 0
+        for item in pending:
+            key = _timeout_key(item['chat_id'], item['user_id'])
+            if key not in services.timers:
+                services.timers.schedule_at(
+                    VERIFICATION_TIMER,
+                    key,
+                    item['deadline'],
+                    {'chat_id': item['chat_id'], 'user_id': item['user_id']}
+                )
+                restored += 1
+        
+        if pending:
+            logger.info(f"تم تحميل {len(pending)} تحقق معلق (أعيدت جدولة {restored})")
+        
+    except Exception as e:
+        logger.error(f"خطأ في استعادة التحققات المعلقة: {e}")
+
 def register_verification_handlers(app):
     """
     تسجيل معالجات التحقق
@@ -189,3 +270,6 @@ def register_verification_handlers(app):
     """
     app.add_handler(ChatMemberHandler(handle_new_member, ChatMemberHandler.CHAT_MEMBER))
     app.add_handler(CallbackQueryHandler(handle_verification_callback, pattern="^verify_"))
+    timers = app.bot_data[SERVICES_KEY].timers
+    timers.register(VERIFICATION_TIMER, verification_timeouts)
+    PENDING_VERIFICATIONS.set_function(lambda: timers.count(VERIFICATION_TIMER))
@@ -9,9 +9,17 @@ Bot services
 from .verification_service import VerificationService
 from .moderation_service import ModerationService
 from .badwords_service import BadWordsService
+from .raid_service import RaidService
+from .chat_settings_service import ChatSettingsService, ChatSettings
+from .container import ServiceContainer, get_services
 
 __all__ = [
     'VerificationService',
     'ModerationService',
-    'BadWordsService'
+    'BadWordsService',
+    'RaidService',
+    'ChatSettingsService',
+    'ChatSettings',
+    'ServiceContainer',
+    'get_services'
 ]
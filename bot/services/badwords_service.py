@@ -6,77 +6,387 @@
 Bad words filtering service
 """
 
+import asyncio
+import hashlib
 import logging
-import re
-from typing import List, Set
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
 from pathlib import Path
+from bot.utils.aho_corasick import AhoCorasick, Match
+from bot.utils.database import Database
+from bot.utils.filter_artifact import load_artifact, save_artifact
+from bot.utils.helpers import normalize_arabic, normalize_arabic_with_offsets
+from config.settings import (
+    BADWORDS_FILE, BADWORDS_ARTIFACT, BADWORDS_RELOAD_INTERVAL, BADWORDS_DEFAULT_ACTION,
+    BADWORDS_MAX_CHAT_OVERLAYS
+)
 
 logger = logging.getLogger(__name__)
 
+class BadWordsSnapshot:
+    """
+    نسخة ثابتة من قائمة الكلمات وآلة المطابقة المبنية منها
+    Immutable copy of the word list and the automaton built from it
+    
+    لا يتم تعديل النسخة بعد بنائها، والتحديث يبني نسخة جديدة ويستبدل المرجع
+    دفعة واحدة، فلا ترى المطابقة قائمة نصف مبنية.
+    A snapshot is never modified once built; an update builds a new one and
+    swaps the reference in one step, so matching never sees a half-built list.
+    """
+    
+    __slots__ = ('generation', 'words', 'normalized', 'matcher', 'build_time', 'mtime', 'cached')
+    
+    def __init__(self, generation: int, words: FrozenSet[str], normalized: Dict[str, str],
+                 matcher: AhoCorasick, build_time: float, mtime: Optional[float], cached: bool = False):
+        self.generation = generation
+        self.words = words
+        self.normalized = normalized
+        self.matcher = matcher
+        self.build_time = build_time
+        self.mtime = mtime
+        # True إذا حملت النسخة من الملف المترجم بدلاً من بنائها
+        # True if the snapshot was loaded from the compiled artifact instead of built
+        self.cached = cached
+    
+    @classmethod
+    def build(cls, words: Iterable[str], generation: int = 0,
+              mtime: Optional[float] = None) -> "BadWordsSnapshot":
+        """
+        بناء نسخة جديدة من قائمة كلمات
+        Build a new snapshot from a word list
+        """
+        started = time.perf_counter()
+        words = frozenset(words)
+        normalized = {}
+        matcher = AhoCorasick()
+        for word in sorted(words):
+            normalized_word = normalize_arabic(word)
+            if matcher.add(normalized_word):
+                normalized[normalized_word] = word
+        matcher.build()
+        
+        return cls(generation, words, normalized, matcher, time.perf_counter() - started, mtime)
+    
+    def to_payload(self) -> Tuple:
+        """
+        بيانات النسخة القابلة للحفظ في الملف المترجم
+        Snapshot data to store in the compiled artifact
+        """
+        return sorted(self.words), self.normalized, self.matcher.to_state()
+    
+    @classmethod
+    def load(cls, path: Path, artifact: Optional[Path], generation: int = 0) -> "BadWordsSnapshot":
+        """
+        تحميل النسخة من الملف المترجم إذا طابق الملف المصدر، وإلا بناؤها وحفظ الملف المترجم
+        Load the snapshot from the compiled artifact if it matches the source, otherwise build it and save the artifact
+        """
+        started = time.perf_counter()
+        mtime = _file_mtime(path)
+        if mtime is None:
+            return cls.build((), generation)
+        
+        with open(path, 'rb') as f:
+            source = f.read()
+        digest = hashlib.sha256(source).digest()
+        
+        if artifact is not None:
+            payload = load_artifact(artifact, digest)
+            if payload is not None:
+                words, normalized, state = payload
+                return cls(generation, frozenset(words), normalized, AhoCorasick.from_state(state),
+                           time.perf_counter() - started, mtime, cached=True)
+        
+        snapshot = cls.build(_parse_words(source.decode('utf-8').splitlines()), generation, mtime)
+        if artifact is not None:
+            try:
+                save_artifact(artifact, digest, snapshot.to_payload())
+            except Exception as e:
+                logger.error(f"خطأ في حفظ ملف الكلمات المترجم: {e}")
+        return snapshot
+
+# الإجراءات الممكنة عند اكتشاف كلمة محظورة
+# Possible actions when a bad word is found
+BADWORD_ACTIONS = ("mute", "delete", "warn")
+
+# أنواع مدخلات قوائم المجموعات
+# Kinds of per-chat list entries
+OVERLAY_ADD = "add"
+OVERLAY_ALLOW = "allow"
+
+class ChatOverlay:
+    """
+    إضافات واستثناءات وإجراء مجموعة واحدة فوق القائمة المشتركة
+    One chat's additions, exemptions and action on top of the shared list
+    
+    آلة المطابقة هنا تحتوي إضافات المجموعة فقط، فالذاكرة تتناسب مع حجم
+    الإضافات وليس مع عدد المجموعات مضروباً في حجم القائمة.
+    The automaton here holds only the chat's additions, so memory grows with
+    the size of the overlays rather than chats times list size.
+    """
+    
+    __slots__ = ('additions', 'exemptions', 'matcher', 'action')
+    
+    def __init__(self, additions: Dict[str, str], exemptions: Dict[str, str],
+                 matcher: Optional[AhoCorasick], action: str):
+        self.additions = additions
+        self.exemptions = exemptions
+        self.matcher = matcher
+        self.action = action
+    
+    @classmethod
+    def build(cls, entries: Iterable[Tuple[str, str]], action: Optional[str]) -> "ChatOverlay":
+        """
+        بناء قائمة مجموعة من مدخلات قاعدة البيانات
+        Build a chat overlay from database entries
+        """
+        additions = {}
+        exemptions = {}
+        matcher = None
+        for word, kind in entries:
+            normalized = normalize_arabic(word)
+            if kind == OVERLAY_ALLOW:
+                exemptions[normalized] = word
+                continue
+            
+            if matcher is None:
+                matcher = AhoCorasick()
+            if matcher.add(normalized):
+                additions[normalized] = word
+        
+        if matcher is not None:
+            matcher.build()
+        return cls(additions, exemptions, matcher, action or BADWORDS_DEFAULT_ACTION)
+    
+    def is_empty(self) -> bool:
+        return not self.additions and not self.exemptions and self.action == BADWORDS_DEFAULT_ACTION
+
+# قائمة مشتركة لجميع المجموعات التي ليس لها تخصيص
+# Shared overlay for every chat without customizations
+EMPTY_OVERLAY = ChatOverlay({}, {}, None, BADWORDS_DEFAULT_ACTION)
+
+def _parse_words(lines: Iterable[str]) -> List[str]:
+    words = []
+    for line in lines:
+        word = line.strip()
+        if word and not word.startswith('#'):
+            words.append(word.lower())
+    return words
+
+def _file_mtime(path: Path) -> Optional[float]:
+    try:
+        return os.stat(path).st_mtime
+    except FileNotFoundError:
+        return None
+
+def _read_words(path: Path) -> Tuple[List[str], Optional[float]]:
+    """
+    قراءة الكلمات ووقت تعديل الملف
+    Read the words and the file modification time
+    """
+    mtime = _file_mtime(path)
+    if mtime is None:
+        return [], None
+    
+    with open(path, 'r', encoding='utf-8') as f:
+        return _parse_words(f), mtime
+
 class BadWordsService:
     """
     خدمة فلترة الكلمات المحظورة
     Bad words filtering service
+    
+    المطابقة تقرأ النسخة الحالية فقط، وإعادة البناء تتم في خيط منفصل عند
+    تعديل الملف أو عند طلب المشرف ثم تستبدل النسخة.
+    Matching only reads the current snapshot; rebuilds run on a worker thread
+    when the file changes or an admin asks, then swap the snapshot in.
     """
     
-    def __init__(self):
-        self.badwords: Set[str] = set()
-        self.badwords_patterns: List[re.Pattern] = []
+    def __init__(self, db: Optional[Database] = None, path: str = BADWORDS_FILE,
+                 reload_interval: float = BADWORDS_RELOAD_INTERVAL,
+                 max_overlays: int = BADWORDS_MAX_CHAT_OVERLAYS,
+                 artifact: Optional[str] = BADWORDS_ARTIFACT):
+        self.db = db or Database()
+        self.path = Path(path)
+        self.artifact = Path(artifact) if artifact else None
+        self.reload_interval = reload_interval
+        self.max_overlays = max_overlays
+        # قوائم المجموعات المحملة من قاعدة البيانات، الأقدم استخداماً يحذف أولاً
+        # Chat overlays loaded from the database, least recently used evicted first
+        self._overlays: "OrderedDict[int, ChatOverlay]" = OrderedDict()
+        # رقم إصدار لكل مجموعة يزيد مع كل تعديل، فالتحميل الذي بدأ قبل التعديل لا يخزن.
+        # المدخلات تنشأ فقط من أوامر المشرفين
+        # Per-chat version bumped on every edit, so a load that started before the edit
+        # is not cached. Entries are only created by admin commands
+        self._overlay_generations: Dict[int, int] = {}
+        self._lock = asyncio.Lock()
+        self._watcher: Optional[asyncio.Task] = None
+        self.snapshot = BadWordsSnapshot.build(())
         self.load_badwords()
     
+    @property
+    def badwords(self) -> FrozenSet[str]:
+        return self.snapshot.words
+    
+    @property
+    def cached_overlays(self) -> int:
+        return len(self._overlays)
+    
     def load_badwords(self):
         """
         تحميل قائمة الكلمات المحظورة
         Load bad words list
         """
         try:
-            badwords_file = Path("data/badwords.txt")
-            
-            if badwords_file.exists():
-                with open(badwords_file, 'r', encoding='utf-8') as f:
-                    for line in f:
-                        word = line.strip()
-                        if word and not word.startswith('#'):
-                            self.badwords.add(word.lower())
-                            
-                            # إنشاء نمط للكلمة مع مراعاة الاختلافات
-                            # Create pattern for word with variations
-                            pattern = self._create_pattern(word)
-                            self.badwords_patterns.append(re.compile(pattern, re.IGNORECASE))
-                
-                logger.info(f"تم تحميل {len(self.badwords)} كلمة محظورة")
+            if self.path.exists():
+                self._swap(BadWordsSnapshot.load(self.path, self.artifact, self.snapshot.generation + 1))
             else:
                 logger.warning("ملف الكلمات المحظورة غير موجود")
                 
         except Exception as e:
             logger.error(f"خطأ في تحميل الكلمات المحظورة: {e}")
     
-    def _create_pattern(self, word: str) -> str:
+    def _swap(self, snapshot: BadWordsSnapshot):
+        self.snapshot = snapshot
+        logger.info(
+            f"تم تحميل {len(snapshot.words)} كلمة محظورة "
+            f"(الإصدار {snapshot.generation}، {len(snapshot.matcher)} نمط، "
+            f"{'تحميل من الملف المترجم' if snapshot.cached else 'بناء'} "
+            f"{snapshot.build_time * 1000:.1f} مللي ثانية)"
+        )
+    
+    async def reload(self, force: bool = False) -> bool:
         """
-        إنشاء نمط للكلمة مع مراعاة الاختلافات
-        Create pattern for word with variations
+        إعادة بناء القائمة في الخلفية إذا تغير الملف، وإرجاع True عند الاستبدال
+        Rebuild the list in the background if the file changed, returning True on swap
         """
-        # استبدال الأحرف المشابهة
-        # Replace similar characters
-        replacements = {
-            'ا': '[اأإآ]',
-            'ة': '[ةه]',
-            'ي': '[يى]',
-            'و': '[وؤ]',
-            'ء': '[ءئ]'
-        }
+        async with self._lock:
+            return await self._reload(force)
+    
+    async def _reload(self, force: bool) -> bool:
+        try:
+            mtime = await asyncio.to_thread(_file_mtime, self.path)
+            if not force and mtime == self.snapshot.mtime:
+                return False
+            
+            generation = self.snapshot.generation + 1
+            
+            self._swap(await asyncio.to_thread(BadWordsSnapshot.load, self.path, self.artifact, generation))
+            return True
+        
+        except Exception as e:
+            logger.error(f"خطأ في إعادة تحميل الكلمات المحظورة: {e}")
+            return False
+    
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            await self.reload()
+    
+    async def start(self):
+        """
+        بدء مراقبة تعديل ملف الكلمات
+        Start watching the word file for changes
+        """
+        if self._watcher is None and self.reload_interval > 0:
+            self._watcher = asyncio.get_running_loop().create_task(self._watch())
+    
+    async def stop(self):
+        """
+        إيقاف مراقبة الملف
+        Stop watching the file
+        """
+        if self._watcher is not None:
+            self._watcher.cancel()
+            try:
+                await self._watcher
+            except asyncio.CancelledError:
+                pass
+            self._watcher = None
+    
+    async def _edit_file(self, edit) -> bool:
+        """
+        تعديل الملف ثم إعادة البناء، مع منع التعديلات المتزامنة
+        Edit the file then rebuild, serializing concurrent edits
+        """
+        async with self._lock:
+            changed = await asyncio.to_thread(edit)
+            if changed:
+                await self._reload(force=True)
+            return changed
+    
+    async def get_overlay(self, chat_id: Optional[int]) -> ChatOverlay:
+        """
+        الحصول على قائمة المجموعة، وتحميلها من قاعدة البيانات عند أول طلب
+        Get a chat's overlay, loading it from the database on first use
+        """
+        if chat_id is None:
+            return EMPTY_OVERLAY
+        
+        overlay = self._overlays.get(chat_id)
+        if overlay is not None:
+            self._overlays.move_to_end(chat_id)
+            return overlay
+        
+        generation = self._overlay_generations.get(chat_id, 0)
+        try:
+            entries, action = await self.db.get_chat_badwords(chat_id)
+        except Exception as e:
+            logger.error(f"خطأ في تحميل كلمات المجموعة {chat_id}: {e}")
+            return EMPTY_OVERLAY
+        
+        overlay = ChatOverlay.build(entries, action)
+        if overlay.is_empty():
+            overlay = EMPTY_OVERLAY
+        
+        # تعديل أثناء التحميل يجعل النتيجة قديمة، فتستخدم لهذا الطلب دون تخزين
+        # An edit during the load makes the result stale, so it serves this call uncached
+        if self._overlay_generations.get(chat_id, 0) != generation:
+            return overlay
+        
+        self._overlays[chat_id] = overlay
+        while len(self._overlays) > self.max_overlays:
+            self._overlays.popitem(last=False)
+        return overlay
+    
+    def _matches(self, snapshot: BadWordsSnapshot, overlay: ChatOverlay, normalized: str) -> Iterator[Match]:
+        """
+        مطابقات القائمة المشتركة دون المستثناة ثم مطابقات إضافات المجموعة
+        Matches of the shared list minus exemptions, then matches of the chat additions
+        """
+        for start, end, pattern in snapshot.matcher.iter_matches(normalized):
+            if pattern not in overlay.exemptions:
+                yield start, end, snapshot.normalized.get(pattern, pattern)
+        
+        if overlay.matcher is not None:
+            for start, end, pattern in overlay.matcher.iter_matches(normalized):
+                yield start, end, overlay.additions.get(pattern, pattern)
+    
+    async def find_badword(self, text: str, normalized: Optional[str] = None,
+                           chat_id: Optional[int] = None) -> Optional[str]:
+        """
+        إرجاع أول كلمة محظورة موجودة في النص
+        Return the first bad word found in the text
         
-        pattern = word
-        for char, replacement in replacements.items():
-            pattern = pattern.replace(char, replacement)
+        يمكن تمرير النص الموحد مسبقاً لتجنب توحيده مرة أخرى
+        The already normalized text may be passed to avoid normalizing twice
+        """
+        if not text:
+            return None
         
-        # إضافة فراغات اختيارية
-        # Add optional spaces
-        pattern = '\\s*'.join(pattern)
+        if normalized is None:
+            normalized = normalize_arabic(text)
         
-        return f'\\b{pattern}\\b'
+        # قراءة النسخة مرة واحدة حتى لا تتغير أثناء المطابقة
+        # Read the snapshot once so it cannot change mid-match
+        snapshot = self.snapshot
+        overlay = await self.get_overlay(chat_id)
+        match = next(self._matches(snapshot, overlay, normalized), None)
+        return match[2] if match else None
     
-    async def contains_badword(self, text: str) -> bool:
+    async def contains_badword(self, text: str, normalized: Optional[str] = None,
+                               chat_id: Optional[int] = None) -> bool:
         """
         فحص إذا كان النص يحتوي على كلمات محظورة
         Check if text contains bad words
@@ -85,21 +395,12 @@ class BadWordsService:
             if not text:
                 return False
             
-            text_lower = text.lower()
-            
-            # فحص الكلمات المباشرة
-            # Check direct words
-            for badword in self.badwords:
-                if badword in text_lower:
-                    logger.info(f"تم اكتشاف كلمة محظورة: {badword}")
-                    return True
-            
-            # فحص الأنماط
-            # Check patterns
-            for pattern in self.badwords_patterns:
-                if pattern.search(text):
-                    logger.info(f"تم اكتشاف كلمة محظورة بواسطة النمط: {pattern.pattern}")
-                    return True
+            # مرور واحد على النص لجميع الكلمات
+            # One pass over the text for all words
+            badword = await self.find_badword(text, normalized, chat_id)
+            if badword:
+                logger.info(f"تم اكتشاف كلمة محظورة: {badword}")
+                return True
             
             return False
             
@@ -107,7 +408,7 @@ class BadWordsService:
             logger.error(f"خطأ في فحص الكلمات المحظورة: {e}")
             return False
     
-    async def filter_text(self, text: str) -> str:
+    async def filter_text(self, text: str, chat_id: Optional[int] = None) -> str:
         """
         فلترة النص وحذف الكلمات المحظورة
         Filter text and remove bad words
@@ -116,41 +417,64 @@ class BadWordsService:
             if not text:
                 return text
             
-            filtered_text = text
+            # المطابقة على النص الموحد ثم إعادة المقاطع إلى مواقعها الأصلية، والنهاية تمتد
+            # فوق الحركات المحذوفة بعد آخر حرف إلا إذا انتهى المقطع داخل حرف مركب
+            # Match on the normalized text then map spans back to original offsets, the end
+            # extends over stripped marks after the last letter unless the span ends inside
+            # a composed character
+            normalized, offsets = normalize_arabic_with_offsets(text)
+            overlay = await self.get_overlay(chat_id)
+            spans = sorted(
+                (offsets[start], max(offsets[end - 1] + 1, offsets[end]))
+                for start, end, _ in self._matches(self.snapshot, overlay, normalized)
+            )
             
-            # استبدال الكلمات المحظورة
-            # Replace bad words
-            for pattern in self.badwords_patterns:
-                filtered_text = pattern.sub('***', filtered_text)
+            # دمج المقاطع المتداخلة ثم استبدالها
+            # Merge overlapping spans then replace them
+            if not spans:
+                return text
+            
+            parts = []
+            position = 0
+            for start, end in spans:
+                if start < position:
+                    position = max(position, end)
+                    continue
+                parts.append(text[position:start])
+                parts.append('***')
+                position = end
+            parts.append(text[position:])
             
-            return filtered_text
+            return ''.join(parts)
             
         except Exception as e:
             logger.error(f"خطأ في فلترة النص: {e}")
             return text
     
-    async def add_badword(self, word: str) -> bool:
+    async def add_badword(self, word: str, comment: Optional[str] = None) -> bool:
         """
         إضافة كلمة محظورة
         Add a bad word
         """
         try:
             word_lower = word.lower().strip()
+            if not word_lower:
+                return False
             
-            if word_lower and word_lower not in self.badwords:
-                self.badwords.add(word_lower)
+            def edit() -> bool:
+                # الفحص مقابل الملف نفسه وليس النسخة التي قد تكون قديمة
+                # Check against the file itself, not a possibly stale snapshot
+                words, _ = _read_words(self.path)
+                if word_lower in words:
+                    return False
                 
-                # إنشاء نمط للكلمة الجديدة
-                # Create pattern for new word
-                pattern = self._create_pattern(word_lower)
-                self.badwords_patterns.append(re.compile(pattern, re.IGNORECASE))
-                
-                # حفظ في الملف
-                # Save to file
-                badwords_file = Path("data/badwords.txt")
-                with open(badwords_file, 'a', encoding='utf-8') as f:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    if comment:
+                        f.write(f"\n# {comment}")
                     f.write(f"\n{word_lower}")
-                
+                return True
+            
+            if await self._edit_file(edit):
                 logger.info(f"تم إضافة كلمة محظورة جديدة: {word_lower}")
                 return True
             
@@ -168,23 +492,25 @@ class BadWordsService:
         try:
             word_lower = word.lower().strip()
             
-            if word_lower in self.badwords:
-                self.badwords.remove(word_lower)
-                
-                # إزالة النمط
-                # Remove pattern
-                self.badwords_patterns = [
-                    pattern for pattern in self.badwords_patterns
-                    if word_lower not in pattern.pattern
+            def edit() -> bool:
+                # حذف السطر المطابق تماماً فقط مع الحفاظ على التعليقات وبقية الملف
+                # Drop only exactly matching lines, keeping comments and the rest of the file
+                if not self.path.exists():
+                    return False
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    lines = f.readlines()
+                kept = [
+                    line for line in lines
+                    if line.strip().startswith('#') or line.strip().lower() != word_lower
                 ]
+                if len(kept) == len(lines):
+                    return False
                 
-                # تحديث الملف
-                # Update file
-                badwords_file = Path("data/badwords.txt")
-                with open(badwords_file, 'w', encoding='utf-8') as f:
-                    for badword in sorted(self.badwords):
-                        f.write(f"{badword}\n")
-                
+                with open(self.path, 'w', encoding='utf-8') as f:
+                    f.writelines(kept)
+                return True
+            
+            if await self._edit_file(edit):
                 logger.info(f"تم إزالة كلمة محظورة: {word_lower}")
                 return True
             
@@ -194,55 +520,138 @@ class BadWordsService:
             logger.error(f"خطأ في إزالة كلمة محظورة: {e}")
             return False
     
-    async def get_badwords_count(self) -> int:
+    async def get_badwords_count(self, chat_id: Optional[int] = None) -> int:
         """
         الحصول على عدد الكلمات المحظورة
         Get bad words count
         """
-        return len(self.badwords)
+        return len(await self.get_badwords_list(chat_id))
     
-    async def get_badwords_list(self) -> List[str]:
+    async def get_badwords_list(self, chat_id: Optional[int] = None) -> List[str]:
         """
-        الحصول على قائمة الكلمات المحظورة
-        Get bad words list
+        الحصول على قائمة الكلمات المحظورة الفعالة في المجموعة
+        Get the bad words list in effect for a chat
         """
-        return sorted(list(self.badwords))
+        snapshot = self.snapshot
+        overlay = await self.get_overlay(chat_id)
+        words = {
+            word for normalized, word in snapshot.normalized.items()
+            if normalized not in overlay.exemptions
+        }
+        words.update(overlay.additions.values())
+        return sorted(words)
     
-    async def add_offensive_word(self, word: str) -> bool:
+    async def _save_chat_word(self, chat_id: int, word: str, kind: Optional[str]) -> bool:
         """
-        إضافة كلمة مسيئة جديدة مع تحديث فوري للنظام
-        Add new offensive word with immediate system update
+        حفظ أو حذف مدخل في قائمة المجموعة ثم إعادة تحميلها
+        Save or delete an entry of a chat overlay then reload it
         """
+        word = word.lower().strip()
+        if not word:
+            return False
+        
         try:
-            word = word.strip().lower()
-            if not word:
-                return False
-                
-            if word in self.badwords:
-                return False  # الكلمة موجودة بالفعل
-                
-            # إضافة الكلمة إلى المجموعة
-            self.badwords.add(word)
-            
-            # إنشاء نمط للكلمة الجديدة
-            pattern = self._create_pattern(word)
-            self.badwords_patterns.append(re.compile(pattern, re.IGNORECASE))
-            
-            # حفظ الكلمة في الملف
-            badwords_file = Path("data/badwords.txt")
-            with open(badwords_file, 'a', encoding='utf-8') as f:
-                f.write(f"\n# كلمة مسيئة مضافة من قبل المشرف\n{word}")
-            
-            logger.info(f"تمت إضافة كلمة مسيئة جديدة: {word}")
-            return True
-            
+            if kind is None:
+                await self.db.remove_chat_badword(chat_id, word)
+            else:
+                await self.db.save_chat_badword(chat_id, word, kind)
         except Exception as e:
-            logger.error(f"خطأ في إضافة كلمة مسيئة: {e}")
+            logger.error(f"خطأ في حفظ كلمات المجموعة {chat_id}: {e}")
             return False
+        
+        self._invalidate_overlay(chat_id)
+        return True
+    
+    def _invalidate_overlay(self, chat_id: int):
+        """
+        حذف قائمة المجموعة المخزنة وإبطال أي تحميل جار لها
+        Drop the chat's cached overlay and invalidate any load in progress
+        """
+        self._overlay_generations[chat_id] = self._overlay_generations.get(chat_id, 0) + 1
+        self._overlays.pop(chat_id, None)
+    
+    async def add_chat_word(self, chat_id: int, word: str) -> bool:
+        """
+        حظر كلمة في هذه المجموعة فقط
+        Ban a word in this chat only
+        """
+        normalized = normalize_arabic(word.lower().strip())
+        overlay = await self.get_overlay(chat_id)
+        if normalized in overlay.additions or (
+            normalized in self.snapshot.normalized and normalized not in overlay.exemptions
+        ):
+            return False
+        
+        if not await self._save_chat_word(chat_id, word, OVERLAY_ADD):
+            return False
+        logger.info(f"تمت إضافة كلمة محظورة في المجموعة {chat_id}: {word}")
+        return True
+    
+    async def allow_chat_word(self, chat_id: int, word: str) -> bool:
+        """
+        استثناء كلمة من القائمة المشتركة في هذه المجموعة
+        Exempt a shared-list word in this chat
+        """
+        normalized = normalize_arabic(word.lower().strip())
+        overlay = await self.get_overlay(chat_id)
+        if normalized not in self.snapshot.normalized or normalized in overlay.exemptions:
+            return False
+        
+        if not await self._save_chat_word(chat_id, word, OVERLAY_ALLOW):
+            return False
+        logger.info(f"تم استثناء كلمة في المجموعة {chat_id}: {word}")
+        return True
+    
+    async def remove_chat_word(self, chat_id: int, word: str) -> bool:
+        """
+        إزالة كلمة من إضافات أو استثناءات المجموعة
+        Remove a word from the chat's additions or exemptions
+        """
+        normalized = normalize_arabic(word.lower().strip())
+        overlay = await self.get_overlay(chat_id)
+        # حذف الكلمة بالصيغة المحفوظة وليس بالصيغة المكتوبة في الأمر
+        # Delete the word as stored, not as typed in the command
+        stored = overlay.additions.get(normalized) or overlay.exemptions.get(normalized)
+        if stored is None:
+            return False
+        
+        return await self._save_chat_word(chat_id, stored, None)
+    
+    async def get_chat_action(self, chat_id: int) -> str:
+        """
+        الإجراء المتبع عند اكتشاف كلمة محظورة في المجموعة
+        Action taken when a bad word is found in the chat
+        """
+        return (await self.get_overlay(chat_id)).action
+    
+    async def set_chat_action(self, chat_id: int, action: str) -> bool:
+        """
+        تغيير إجراء الكلمات المحظورة للمجموعة
+        Change the chat's bad word action
+        """
+        if action not in BADWORD_ACTIONS:
+            return False
+        
+        try:
+            await self.db.save_chat_badword_action(chat_id, action)
+        except Exception as e:
+            logger.error(f"خطأ في حفظ إجراء المجموعة {chat_id}: {e}")
+            return False
+        
+        self._invalidate_overlay(chat_id)
+        return True
+    
+    async def add_offensive_word(self, word: str) -> bool:
+        """
+        إضافة كلمة مسيئة جديدة مع تحديث فوري للنظام
+        Add new offensive word with immediate system update
+        """
+        return await self.add_badword(word, comment="كلمة مسيئة مضافة من قبل المشرف")
     
-    async def contains_offensive_word(self, text: str) -> bool:
+    async def contains_offensive_word(self, text: str, normalized: Optional[str] = None,
+                                      chat_id: Optional[int] = None) -> bool:
         """
         فحص إذا كان النص يحتوي على كلمات مسيئة
         Check if text contains offensive words
         """
-        return await self.contains_badword(text)
+        return await self.contains_badword(text, normalized, chat_id)
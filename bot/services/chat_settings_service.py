@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+خدمة إعدادات المجموعات
+Per-chat settings service
+"""
+
+import logging
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from bot.utils.database import Database
+from config.settings import (
+    ENABLE_VERIFICATION, ENABLE_BADWORDS_FILTER, ENABLE_SPAM_DETECTION, ENABLE_ANTI_RAID,
+    SPAM_THRESHOLD, SPAM_THRESHOLD_MAX, WARN_LIMIT, AUTO_MUTE_DURATION, CHAT_SETTINGS_CACHE_MAX
+)
+
+logger = logging.getLogger(__name__)
+
+# الميزات القابلة للتشغيل والإيقاف وقيمها الافتراضية
+# Features that can be toggled and their defaults
+TOGGLES: Dict[str, bool] = {
+    'verification': ENABLE_VERIFICATION,
+    'badwords': ENABLE_BADWORDS_FILTER,
+    'spam': ENABLE_SPAM_DETECTION,
+    'antiraid': ENABLE_ANTI_RAID,
+}
+
+# الحدود الرقمية: (القيمة الافتراضية، أقل قيمة، أقصى قيمة)
+# Numeric limits: (default, minimum, maximum)
+LIMITS: Dict[str, Tuple[int, int, int]] = {
+    'spam_threshold': (SPAM_THRESHOLD, 2, SPAM_THRESHOLD_MAX),
+    'warn_limit': (WARN_LIMIT, 1, 20),
+    'mute_duration': (AUTO_MUTE_DURATION, 60, 366 * 24 * 3600),
+}
+
+class ChatSettings:
+    """
+    إعدادات مجموعة واحدة، لا تعدل بعد إنشائها
+    One chat's settings, never modified once created
+    """
+    
+    __slots__ = tuple(TOGGLES) + tuple(LIMITS)
+    
+    def __init__(self, **values):
+        for name, default in TOGGLES.items():
+            value = values.get(name)
+            object.__setattr__(self, name, default if value is None else bool(value))
+        for name, (default, _, _) in LIMITS.items():
+            value = values.get(name)
+            object.__setattr__(self, name, default if value is None else int(value))
+    
+    def __setattr__(self, name, value):
+        raise AttributeError("ChatSettings is immutable")
+    
+    def as_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+    
+    def replace(self, **changes) -> "ChatSettings":
+        values = self.as_dict()
+        values.update(changes)
+        return ChatSettings(**values)
+
+# الإعدادات المشتركة لجميع المجموعات التي لم تغير أي إعداد
+# Shared settings for every chat that never changed anything
+DEFAULT_SETTINGS = ChatSettings()
+
+class ChatSettingsService:
+    """
+    إعدادات كل مجموعة من جدول chat_settings مع ذاكرة قراءة في العملية
+    Per-chat settings from the chat_settings table with an in-process read cache
+    
+    القراءة بعد أول طلب هي بحث في قاموس فقط، والتغيير يكتب في قاعدة البيانات
+    ثم يستبدل مدخل الذاكرة.
+    After the first request a lookup is a dict hit only, and a change is
+    written to the database and then replaces the cached entry.
+    """
+    
+    def __init__(self, db: Optional[Database] = None, max_chats: int = CHAT_SETTINGS_CACHE_MAX):
+        self.db = db or Database()
+        self.max_chats = max_chats
+        self._cache: "OrderedDict[int, ChatSettings]" = OrderedDict()
+    
+    def __len__(self) -> int:
+        return len(self._cache)
+    
+    def _store(self, chat_id: int, settings: ChatSettings):
+        self._cache[chat_id] = settings
+        self._cache.move_to_end(chat_id)
+        while len(self._cache) > self.max_chats:
+            self._cache.popitem(last=False)
+    
+    async def get(self, chat_id: int) -> ChatSettings:
+        """
+        الحصول على إعدادات المجموعة
+        Get the chat's settings
+        """
+        settings = self._cache.get(chat_id)
+        if settings is not None:
+            return settings
+        
+        try:
+            row = await self.db.get_chat_settings(chat_id)
+        except Exception as e:
+            logger.error(f"خطأ في تحميل إعدادات المجموعة {chat_id}: {e}")
+            return DEFAULT_SETTINGS
+        
+        # تغيير تم أثناء التحميل له الأولوية على نتيجة الاستعلام
+        # A change made while loading takes precedence over the query result
+        settings = self._cache.get(chat_id)
+        if settings is None:
+            settings = ChatSettings(**row) if row else DEFAULT_SETTINGS
+            self._store(chat_id, settings)
+        return settings
+    
+    async def update(self, chat_id: int, **changes) -> Optional[ChatSettings]:
+        """
+        تغيير إعدادات المجموعة وإرجاع الإعدادات الجديدة، أو None عند الفشل
+        Change the chat's settings and return the new settings, or None on failure
+        """
+        settings = (await self.get(chat_id)).replace(**changes)
+        try:
+            # حفظ القيم المتغيرة فقط حتى تبقى باقي الإعدادات تتبع القيم الافتراضية
+            # Save the changed values only so the other settings keep following the defaults
+            await self.db.save_chat_settings(chat_id, changes)
+        except Exception as e:
+            logger.error(f"خطأ في حفظ إعدادات المجموعة {chat_id}: {e}")
+            return None
+        
+        self._store(chat_id, settings)
+        logger.info(f"تم تغيير إعدادات المجموعة {chat_id}: {changes}")
+        return settings
+    
+    async def toggle(self, chat_id: int, name: str) -> Optional[bool]:
+        """
+        تبديل ميزة وإرجاع حالتها الجديدة
+        Toggle a feature and return its new state
+        """
+        if name not in TOGGLES:
+            raise ValueError(f"Unknown toggle: {name}")
+        
+        enabled = not getattr(await self.get(chat_id), name)
+        settings = await self.update(chat_id, **{name: enabled})
+        return None if settings is None else enabled
+    
+    async def set_limit(self, chat_id: int, name: str, value: int) -> bool:
+        """
+        ضبط حد رقمي ضمن المدى المسموح
+        Set a numeric limit within its allowed range
+        """
+        if name not in LIMITS:
+            return False
+        
+        _, minimum, maximum = LIMITS[name]
+        if not minimum <= value <= maximum:
+            return False
+        
+        return await self.update(chat_id, **{name: value}) is not None
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+حاوية الخدمات المشتركة
+Shared service container
+"""
+
+import logging
+from typing import Optional
+from telegram.ext import Application, ContextTypes
+from config.settings import DISPATCH_GLOBAL_RATE
+from bot.utils.action_dispatcher import ActionDispatcher
+from bot.utils.admin_cache import AdminCache
+from bot.utils.database import Database
+from bot.utils.metrics import CACHE_ENTRIES, QUEUE_DEPTH
+from bot.utils.sharding import Shard
+from bot.utils.timer_wheel import TimerWheel
+from bot.utils.write_buffer import WriteBehindBuffer
+from .verification_service import VerificationService
+from .moderation_service import ModerationService, MUTE_EXPIRY_TIMER
+from .badwords_service import BadWordsService
+from .raid_service import RaidService, RAID_LOCKDOWN_TIMER
+from .chat_settings_service import ChatSettingsService
+
+logger = logging.getLogger(__name__)
+
+# مفتاح الحاوية داخل bot_data
+# Container key inside bot_data
+SERVICES_KEY = "services"
+
+class ServiceContainer:
+    """
+    حاوية الخدمات طويلة العمر المشتركة بين جميع المعالجات
+    Long-lived services shared by all handlers
+    
+    مع shard تملك الحاوية مجموعات هذا العامل فقط: تستعيد مؤقتاتها وحدها، وحد
+    الإرسال العام مقسم على العمال لأنه حد التوكن كله.
+    With a shard the container owns this worker's chats only: it restores their
+    timers alone, and the global send rate is split across workers since it
+    is the limit of the whole token.
+    """
+    
+    def __init__(self, db_path: str = "bot_data.db", shard: Optional[Shard] = None):
+        self.db_path = db_path
+        self.shard = shard
+        self.db: Optional[Database] = None
+        self.log_buffer: Optional[WriteBehindBuffer] = None
+        self.admin_cache: Optional[AdminCache] = None
+        self.moderation: Optional[ModerationService] = None
+        self.badwords: Optional[BadWordsService] = None
+        self.verification: Optional[VerificationService] = None
+        self.raid: Optional[RaidService] = None
+        self.chat_settings: Optional[ChatSettingsService] = None
+        # العجلة تنشأ مبكراً لتتمكن المعالجات من تسجيل أنواع مؤقتاتها
+        # The wheel is created early so handlers can register their timer kinds
+        self.timers = TimerWheel()
+        if shard is not None:
+            self.dispatcher = ActionDispatcher(global_rate=DISPATCH_GLOBAL_RATE / shard.count)
+        else:
+            self.dispatcher = ActionDispatcher()
+    
+    def owns(self, chat_id: int) -> bool:
+        """
+        هل المجموعة من مسؤولية هذه العملية
+        Whether the chat belongs to this process
+        """
+        return self.shard is None or self.shard.owns(chat_id)
+    
+    def open(self):
+        """
+        فتح الموارد المشتركة وبناء الخدمات مرة واحدة
+        Open shared resources and build services once
+        """
+        if self.db is not None:
+            return
+        
+        self.db = Database(self.db_path)
+        self.log_buffer = WriteBehindBuffer(self.db)
+        self.admin_cache = AdminCache()
+        self.moderation = ModerationService(db=self.db, log_buffer=self.log_buffer, timers=self.timers,
+                                            dispatcher=self.dispatcher)
+        self.badwords = BadWordsService(db=self.db)
+        self.verification = VerificationService(db=self.db, dispatcher=self.dispatcher)
+        self.raid = RaidService(timers=self.timers, dispatcher=self.dispatcher)
+        self.chat_settings = ChatSettingsService(db=self.db)
+        
+        self.timers.register(MUTE_EXPIRY_TIMER, self.moderation.expire_mutes)
+        self.timers.register(RAID_LOCKDOWN_TIMER, self.raid.expire_lockdowns)
+        self._register_metrics()
+        
+        logger.info("تم تهيئة حاوية الخدمات")
+    
+    def _register_metrics(self):
+        """
+        ربط مقاييس أحجام الذاكرة والطوابير بالخدمات، وتحسب عند القراءة فقط
+        Bind the cache and queue size metrics to the services, computed at scrape time only
+        """
+        CACHE_ENTRIES.labels("admins").set_function(lambda: len(self.admin_cache))
+        CACHE_ENTRIES.labels("moderation").set_function(lambda: len(self.moderation.state))
+        CACHE_ENTRIES.labels("spam_tracker").set_function(lambda: len(self.moderation.spam_tracker))
+        CACHE_ENTRIES.labels("raid_detector").set_function(lambda: len(self.raid.detector))
+        CACHE_ENTRIES.labels("chat_settings").set_function(lambda: len(self.chat_settings))
+        CACHE_ENTRIES.labels("badword_overlays").set_function(lambda: self.badwords.cached_overlays)
+        QUEUE_DEPTH.labels("dispatcher").set_function(lambda: self.dispatcher.pending)
+        QUEUE_DEPTH.labels("log_buffer").set_function(lambda: self.log_buffer.pending)
+        QUEUE_DEPTH.labels("timers").set_function(lambda: len(self.timers))
+    
+    def close(self):
+        """
+        إغلاق الموارد المشتركة
+        Close shared resources
+        """
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+            self.log_buffer = None
+        
+        logger.info("تم إغلاق حاوية الخدمات")
+    
+    async def start(self, application: Application):
+        """
+        خطاف post_init للتطبيق
+        Application post_init hook
+        """
+        self.open()
+        await self.log_buffer.start()
+        await self.badwords.start()
+        await self.dispatcher.start(application.bot)
+        await self.timers.start(application, self.db, lambda data: self.owns(data.get('chat_id')))
+    
+    async def drain(self, application: Application):
+        """
+        خطاف post_stop للتطبيق، يعمل قبل shutdown الذي يغلق اتصال البوت
+        Application post_stop hook, runs before shutdown closes the bot's connection
+        """
+        # حفظ المؤقتات وتنفيذ الإجراءات المعلقة ما دام البوت قادراً على الإرسال
+        # Persist timers and drain pending actions while the bot can still send
+        await self.timers.stop()
+        await self.dispatcher.stop()
+        if self.raid is not None:
+            await self.raid.stop()
+        if self.moderation is not None:
+            await self.moderation.stop()
+        if self.badwords is not None:
+            await self.badwords.stop()
+    
+    async def stop(self, application: Application):
+        """
+        خطاف post_shutdown للتطبيق
+        Application post_shutdown hook
+        """
+        # تفريغ السجلات المعلقة قبل إغلاق قاعدة البيانات
+        # Flush pending logs before closing the database
+        if self.log_buffer is not None:
+            await self.log_buffer.stop()
+        
+        self.close()
+
+def get_services(context: ContextTypes.DEFAULT_TYPE) -> ServiceContainer:
+    """
+    الحصول على حاوية الخدمات من سياق المعالج
+    Get the service container from a handler context
+    """
+    return context.bot_data[SERVICES_KEY]
@@ -6,65 +6,65 @@
 Moderation and control service
 """
 
+import asyncio
 import logging
 import time
-from typing import Dict, List, Optional
-from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
 from telegram.ext import ContextTypes
 from telegram import ChatPermissions
 from bot.utils.database import Database
-from config.settings import SPAM_THRESHOLD, WARN_LIMIT
+from bot.utils.write_buffer import WriteBehindBuffer
+from bot.utils.spam_tracker import SpamTracker
+from bot.utils.moderation_cache import ModerationCache
+from bot.utils.timer_wheel import TimerWheel
+from bot.utils.action_dispatcher import ActionDispatcher
+from bot.utils.fingerprint import fingerprint_message
+from bot.utils.helpers import normalize_arabic
+from .chat_settings_service import ChatSettings
 
 logger = logging.getLogger(__name__)
 
+# نوع مؤقت انتهاء الكتم في عجلة المؤقتات
+# Mute expiry kind in the timer wheel
+MUTE_EXPIRY_TIMER = "mute_expiry"
+
 class ModerationService:
     """
     خدمة الإشراف والتحكم
     Moderation and control service
     """
     
-    def __init__(self):
-        self.db = Database()
-        self.user_messages = defaultdict(list)  # تتبع رسائل المستخدمين
-        self.muted_users = {}  # المستخدمين المكتومين
-        self.user_warnings = defaultdict(int)  # تحذيرات المستخدمين
+    def __init__(self, db: Optional[Database] = None, log_buffer: Optional[WriteBehindBuffer] = None,
+                 timers: Optional[TimerWheel] = None, dispatcher: Optional[ActionDispatcher] = None):
+        self.db = db or Database()
+        self.log_buffer = log_buffer  # طابور الكتابة المؤجلة للسجلات
+        self.timers = timers if timers is not None else TimerWheel()  # عجلة المؤقتات لانتهاء الكتم
+        self.dispatcher = dispatcher or ActionDispatcher()  # طابور إجراءات تيليجرام
+        self.spam_tracker = SpamTracker()  # تتبع معدل رسائل المستخدمين
+        self.state = ModerationCache(self.db)  # الكتم والتحذيرات النشطة
+        self._reconciles: Set[asyncio.Task] = set()  # تصحيح الحالة بعد فشل الإجراءات
     
-    async def check_spam(self, chat_id: int, user_id: int, message_text: str) -> bool:
+    async def check_spam(self, chat_id: int, user_id: int, message_text: str,
+                         fingerprint: Optional[Tuple[int, int]] = None,
+                         threshold: Optional[int] = None) -> bool:
         """
-        فحص السبام
-        Check for spam
+        فحص السبام، وthreshold هو حد الرسائل الخاص بالمجموعة
+        Check for spam, threshold being the chat's own message limit
         """
         try:
-            current_time = time.time()
-            user_key = f"{chat_id}_{user_id}"
-            
-            # تنظيف الرسائل القديمة (أكثر من دقيقة)
-            # Clean old messages (older than 1 minute)
-            self.user_messages[user_key] = [
-                msg for msg in self.user_messages[user_key]
-                if current_time - msg['time'] < 60
-            ]
+            # البصمة تحسب مرة واحدة في معالج الرسائل عادة
+            # The fingerprint is usually computed once by the message handler
+            if fingerprint is None:
+                fingerprint = fingerprint_message(normalize_arabic(message_text))
             
-            # إضافة الرسالة الحالية
-            # Add current message
-            self.user_messages[user_key].append({
-                'text': message_text,
-                'time': current_time
-            })
+            value, length = fingerprint
+            is_spam = self.spam_tracker.record(chat_id, user_id, value, length,
+                                               threshold=threshold)
             
-            # فحص عدد الرسائل
-            # Check message count
-            recent_messages = len(self.user_messages[user_key])
-            
-            if recent_messages >= SPAM_THRESHOLD:
-                # فحص إذا كانت الرسائل متشابهة
-                # Check if messages are similar
-                recent_texts = [msg['text'] for msg in self.user_messages[user_key][-5:]]
-                similar_count = sum(1 for text in recent_texts if text == message_text)
-                
-                if similar_count >= 3:
-                    logger.info(f"تم اكتشاف سبام من المستخدم {user_id} في المجموعة {chat_id}")
-                    return True
+            if is_spam:
+                logger.info("تم اكتشاف سبام من المستخدم %s في المجموعة %s", user_id, chat_id,
+                            extra={'chat_id': chat_id, 'user_id': user_id, 'violation': 'spam'})
+                return True
             
             return False
             
@@ -76,13 +76,24 @@ class ModerationService:
         """
         كتم مستخدم
         Mute a user
+        
+        الطلب يرسل عبر طابور الإجراءات دون انتظاره، والحالة تسجل فوراً ثم تصحح إذا
+        فشل الطلب، فالنتيجة True تعني أن الكتم أرسل وليس أنه نفذ.
+        The request goes through the action queue without waiting for it, and the
+        state is recorded right away then corrected if the request fails, so True
+        means the mute was submitted rather than applied.
         """
         try:
             # صلاحيات الكتم
             # Mute permissions
             permissions = ChatPermissions(
                 can_send_messages=False,
-                can_send_media_messages=False,
+                can_send_audios=False,
+                can_send_documents=False,
+                can_send_photos=False,
+                can_send_videos=False,
+                can_send_video_notes=False,
+                can_send_voice_notes=False,
                 can_send_other_messages=False,
                 can_add_web_page_previews=False,
                 can_send_polls=False,
@@ -93,31 +104,37 @@ class ModerationService:
             
             # تطبيق الكتم
             # Apply mute
-            await context.bot.restrict_chat_member(
+            request = self.dispatcher.restrict(
                 chat_id=chat_id,
                 user_id=user_id,
                 permissions=permissions,
                 until_date=int(time.time()) + duration
             )
             
-            # حفظ معلومات الكتم
-            # Save mute information
-            mute_key = f"{chat_id}_{user_id}"
-            self.muted_users[mute_key] = {
-                'until': time.time() + duration,
-                'duration': duration
-            }
-            
-            # حفظ في قاعدة البيانات
-            # Save to database
-            await self.db.save_mute(
+            # حفظ معلومات الكتم في الذاكرة وقاعدة البيانات
+            # Save mute information in memory and the database
+            expires_at = await self.state.set_mute(
                 chat_id=chat_id,
                 user_id=user_id,
                 duration=duration,
                 reason="تم الكتم من قبل المشرف"
             )
+            request.add_done_callback(
+                lambda future: self._on_failure(future, self._revert_mute(chat_id, user_id, expires_at))
+            )
             
-            logger.info(f"تم كتم المستخدم {user_id} لمدة {duration} ثانية في المجموعة {chat_id}")
+            # جدولة انتهاء الكتم
+            # Schedule the mute expiry
+            self.timers.schedule(
+                MUTE_EXPIRY_TIMER,
+                f"mute_{chat_id}_{user_id}",
+                duration,
+                {'chat_id': chat_id, 'user_id': user_id}
+            )
+            
+            logger.info("تم كتم المستخدم %s لمدة %s ثانية في المجموعة %s", user_id, duration, chat_id,
+                        extra={'chat_id': chat_id, 'user_id': user_id, 'action': 'mute',
+                               'duration': duration})
             return True
             
         except Exception as e:
@@ -126,15 +143,20 @@ class ModerationService:
     
     async def unmute_user(self, chat_id: int, user_id: int, context: ContextTypes.DEFAULT_TYPE) -> bool:
         """
-        إلغاء كتم مستخدم
-        Unmute a user
+        إلغاء كتم مستخدم، دون انتظار الطلب كما في mute_user
+        Unmute a user, without waiting for the request as in mute_user
         """
         try:
             # صلاحيات عادية
             # Normal permissions
             permissions = ChatPermissions(
                 can_send_messages=True,
-                can_send_media_messages=True,
+                can_send_audios=True,
+                can_send_documents=True,
+                can_send_photos=True,
+                can_send_videos=True,
+                can_send_video_notes=True,
+                can_send_voice_notes=True,
                 can_send_other_messages=True,
                 can_add_web_page_previews=True,
                 can_send_polls=True,
@@ -145,21 +167,20 @@ class ModerationService:
             
             # إلغاء الكتم
             # Remove mute
-            await context.bot.restrict_chat_member(
+            request = self.dispatcher.restrict(
                 chat_id=chat_id,
                 user_id=user_id,
                 permissions=permissions
             )
             
-            # إزالة من قائمة المكتومين
-            # Remove from muted list
-            mute_key = f"{chat_id}_{user_id}"
-            if mute_key in self.muted_users:
-                del self.muted_users[mute_key]
-            
-            # تحديث قاعدة البيانات
-            # Update database
-            await self.db.remove_mute(chat_id=chat_id, user_id=user_id)
+            # إزالة من قائمة المكتومين وتحديث قاعدة البيانات
+            # Remove from muted list and update the database
+            expires_at = await self.state.mute_expiry(chat_id, user_id)
+            await self.state.clear_mute(chat_id=chat_id, user_id=user_id)
+            self.timers.cancel(f"mute_{chat_id}_{user_id}")
+            request.add_done_callback(
+                lambda future: self._on_failure(future, self._restore_mute(chat_id, user_id, expires_at))
+            )
             
             logger.info(f"تم إلغاء كتم المستخدم {user_id} في المجموعة {chat_id}")
             return True
@@ -168,26 +189,80 @@ class ModerationService:
             logger.error(f"خطأ في إلغاء كتم المستخدم: {e}")
             return False
     
+    async def stop(self):
+        """
+        انتظار تصحيحات الحالة الجارية قبل إغلاق قاعدة البيانات
+        Wait for running state corrections before the database closes
+        """
+        if self._reconciles:
+            await asyncio.gather(*self._reconciles, return_exceptions=True)
+    
+    def _on_failure(self, future: asyncio.Future, reconcile):
+        """
+        تشغيل التصحيح إذا فشل طلب الإجراء، وإغلاقه دون تشغيل إذا نجح
+        Run the correction if the action request failed, and close it unrun if it succeeded
+        """
+        if future.cancelled() or future.exception() is None:
+            reconcile.close()
+            return
+        task = asyncio.get_running_loop().create_task(reconcile)
+        self._reconciles.add(task)
+        task.add_done_callback(self._reconciles.discard)
+    
+    async def _revert_mute(self, chat_id: int, user_id: int, expires_at: float):
+        """
+        إزالة كتم لم ينفذ، ما لم يسجل كتم أحدث بعده
+        Remove a mute that was not applied, unless a newer mute was recorded after it
+        """
+        try:
+            if await self.state.mute_expiry(chat_id, user_id) != expires_at:
+                return
+            await self.state.clear_mute(chat_id=chat_id, user_id=user_id)
+            self.timers.cancel(f"mute_{chat_id}_{user_id}")
+            logger.warning(f"فشل كتم المستخدم {user_id} في المجموعة {chat_id}، تمت إزالة حالة الكتم")
+        
+        except Exception as e:
+            logger.error(f"خطأ في تصحيح حالة الكتم: {e}")
+    
+    async def _restore_mute(self, chat_id: int, user_id: int, expires_at: float):
+        """
+        إعادة كتم لم يرفع فعلياً، ما لم يتغير بعد الطلب
+        Put back a mute that was not actually lifted, unless it changed after the request
+        """
+        try:
+            remaining = int(expires_at - time.time())
+            if remaining <= 0 or await self.state.mute_expiry(chat_id, user_id):
+                return
+            await self.state.set_mute(chat_id=chat_id, user_id=user_id, duration=remaining,
+                                      reason="تم الكتم من قبل المشرف")
+            self.timers.schedule(
+                MUTE_EXPIRY_TIMER,
+                f"mute_{chat_id}_{user_id}",
+                remaining,
+                {'chat_id': chat_id, 'user_id': user_id}
+            )
+            logger.warning(f"فشل إلغاء كتم المستخدم {user_id} في المجموعة {chat_id}، تمت استعادة حالة الكتم")
+        
+        except Exception as e:
+            logger.error(f"خطأ في تصحيح حالة الكتم: {e}")
+    
+    async def expire_mutes(self, application, items: List[Dict]):
+        """
+        معالج عجلة المؤقتات لانتهاء الكتم، تيليجرام يرفع القيود بنفسه عند until_date
+        Timer wheel handler for mute expiry, Telegram lifts the restriction itself at until_date
+        """
+        for item in items:
+            await self.state.clear_mute(chat_id=item['chat_id'], user_id=item['user_id'])
+        
+        logger.debug(f"انتهى كتم {len(items)} مستخدم")
+    
     async def is_user_muted(self, chat_id: int, user_id: int) -> bool:
         """
         فحص إذا كان المستخدم مكتوماً
         Check if user is muted
         """
         try:
-            mute_key = f"{chat_id}_{user_id}"
-            
-            if mute_key in self.muted_users:
-                mute_info = self.muted_users[mute_key]
-                
-                # فحص إذا انتهت مدة الكتم
-                # Check if mute duration has expired
-                if time.time() > mute_info['until']:
-                    del self.muted_users[mute_key]
-                    return False
-                
-                return True
-            
-            return False
+            return await self.state.is_muted(chat_id, user_id)
             
         except Exception as e:
             logger.error(f"خطأ في فحص كتم المستخدم: {e}")
@@ -199,21 +274,13 @@ class ModerationService:
         Warn a user
         """
         try:
-            warn_key = f"{chat_id}_{user_id}"
-            self.user_warnings[warn_key] += 1
-            
-            warn_count = self.user_warnings[warn_key]
+            # زيادة العدد وحفظ التحذير في قاعدة البيانات
+            # Increment the count and save the warning to the database
+            warn_count = await self.state.add_warning(chat_id=chat_id, user_id=user_id, reason=reason)
             
-            # حفظ التحذير في قاعدة البيانات
-            # Save warning to database
-            await self.db.save_warning(
-                chat_id=chat_id,
-                user_id=user_id,
-                reason=reason,
-                count=warn_count
-            )
-            
-            logger.info(f"تم تحذير المستخدم {user_id} ({warn_count}/{WARN_LIMIT}) في المجموعة {chat_id}")
+            logger.info("تم تحذير المستخدم %s (التحذير رقم %s) في المجموعة %s", user_id, warn_count, chat_id,
+                        extra={'chat_id': chat_id, 'user_id': user_id, 'action': 'warn',
+                               'count': warn_count})
             
             return warn_count
             
@@ -221,14 +288,27 @@ class ModerationService:
             logger.error(f"خطأ في تحذير المستخدم: {e}")
             return 0
     
+    async def enforce_warn_limit(self, chat_id: int, user_id: int, warn_count: int,
+                                 settings: ChatSettings, context: ContextTypes.DEFAULT_TYPE) -> bool:
+        """
+        كتم المستخدم ومسح تحذيراته عند بلوغ حد التحذيرات في إعدادات المجموعة
+        Mute the user and clear their warnings once the chat's warning limit is reached
+        """
+        if not warn_count or warn_count < settings.warn_limit:
+            return False
+        
+        muted = await self.mute_user(chat_id, user_id, settings.mute_duration, context)
+        if muted:
+            await self.clear_user_warnings(chat_id, user_id)
+        return muted
+    
     async def get_user_warnings(self, chat_id: int, user_id: int) -> int:
         """
         الحصول على عدد تحذيرات المستخدم
         Get user warning count
         """
         try:
-            warn_key = f"{chat_id}_{user_id}"
-            return self.user_warnings.get(warn_key, 0)
+            return await self.state.warnings(chat_id, user_id)
         except Exception as e:
             logger.error(f"خطأ في الحصول على تحذيرات المستخدم: {e}")
             return 0
@@ -239,11 +319,7 @@ class ModerationService:
         Clear user warnings
         """
         try:
-            warn_key = f"{chat_id}_{user_id}"
-            if warn_key in self.user_warnings:
-                del self.user_warnings[warn_key]
-            
-            await self.db.clear_warnings(chat_id=chat_id, user_id=user_id)
+            await self.state.clear_warnings(chat_id=chat_id, user_id=user_id)
             
             logger.info(f"تم مسح تحذيرات المستخدم {user_id} في المجموعة {chat_id}")
             return True
@@ -258,14 +334,18 @@ class ModerationService:
         Log a violation
         """
         try:
-            await self.db.log_violation(
-                chat_id=chat_id,
-                user_id=user_id,
-                violation_type=violation_type,
-                content=content
-            )
+            if self.log_buffer is not None:
+                self.log_buffer.add_violation(chat_id, user_id, violation_type, content)
+            else:
+                await self.db.log_violation(
+                    chat_id=chat_id,
+                    user_id=user_id,
+                    violation_type=violation_type,
+                    content=content
+                )
             
-            logger.info(f"تم تسجيل مخالفة {violation_type} للمستخدم {user_id} في المجموعة {chat_id}")
+            logger.debug("تم تسجيل مخالفة %s للمستخدم %s في المجموعة %s", violation_type, user_id, chat_id,
+                         extra={'chat_id': chat_id, 'user_id': user_id, 'violation': violation_type})
             
         except Exception as e:
             logger.error(f"خطأ في تسجيل المخالفة: {e}")
@@ -276,11 +356,14 @@ class ModerationService:
         Log message for statistics
         """
         try:
-            await self.db.log_message(
-                chat_id=chat_id,
-                user_id=user_id,
-                message_text=message_text
-            )
+            if self.log_buffer is not None:
+                self.log_buffer.add_message(chat_id, user_id, message_text)
+            else:
+                await self.db.log_message(
+                    chat_id=chat_id,
+                    user_id=user_id,
+                    message_text=message_text
+                )
             
         except Exception as e:
             logger.error(f"خطأ في تسجيل الرسالة: {e}")
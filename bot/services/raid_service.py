@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+خدمة الحماية من الغارات
+Anti-raid service
+"""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Dict, Iterable, List, Optional, Set
+from telegram import ChatPermissions
+from telegram.ext import ContextTypes
+from bot.utils.raid_detector import RaidDetector
+from bot.utils.timer_wheel import TimerWheel
+from bot.utils.action_dispatcher import ActionDispatcher
+from config.settings import MESSAGES, RAID_LOCKDOWN_DURATION, RAID_LOCK_CHAT
+
+logger = logging.getLogger(__name__)
+
+# نوع مؤقت انتهاء الإغلاق في عجلة المؤقتات
+# Lockdown expiry kind in the timer wheel
+RAID_LOCKDOWN_TIMER = "raid_lockdown"
+
+class RaidService:
+    """
+    خدمة اكتشاف الغارات وتفعيل وضع الإغلاق للمجموعة
+    Service detecting raids and putting the chat into lockdown
+    
+    أثناء الإغلاق يتم تقييد جميع الأعضاء الجدد دفعة واحدة حتى نهاية الإغلاق،
+    وتقييد كل من ينضم فوراً، وحذف رسائل الحسابات الجديدة.
+    During a lockdown every new member is restricted in one batch until the
+    lockdown ends, anyone joining is restricted immediately, and messages
+    from new accounts are deleted.
+    
+    التقييد يعمل في مهام خلفية تملكها الخدمة، فالمعالج الذي يكتشف الغارة لا ينتظر
+    طابور الإجراءات.
+    Restrictions run in background tasks owned by the service, so the handler
+    that detects the raid does not wait on the action queue.
+    """
+    
+    def __init__(self, detector: Optional[RaidDetector] = None,
+                 lockdown_duration: int = RAID_LOCKDOWN_DURATION,
+                 timers: Optional[TimerWheel] = None,
+                 dispatcher: Optional[ActionDispatcher] = None):
+        self.detector = detector if detector is not None else RaidDetector()
+        self.timers = timers if timers is not None else TimerWheel()
+        self.dispatcher = dispatcher or ActionDispatcher()
+        self.lockdown_duration = lockdown_duration
+        self._tasks: Set[asyncio.Task] = set()
+    
+    async def record_join(self, chat_id: int, user_id: int, context: ContextTypes.DEFAULT_TYPE) -> bool:
+        """
+        تسجيل انضمام عضو وإرجاع True إذا كانت المجموعة في وضع الإغلاق
+        Record a member join and return True if the chat is locked down
+        """
+        try:
+            if self.detector.record_join(chat_id, user_id):
+                await self.start_lockdown(chat_id, "معدل انضمام مرتفع", context)
+                return True
+            
+            if self.detector.is_locked(chat_id):
+                self._spawn(self.restrict_members(chat_id, [user_id], context))
+                return True
+            
+            return False
+        
+        except Exception as e:
+            logger.error(f"خطأ في تسجيل الانضمام: {e}")
+            return False
+    
+    async def check_message(self, chat_id: int, user_id: int, fingerprint: int, length: int,
+                            context: ContextTypes.DEFAULT_TYPE) -> bool:
+        """
+        فحص رسالة وإرجاع True إذا يجب حذفها بسبب الغارة
+        Check a message and return True if it should be deleted because of a raid
+        """
+        try:
+            if self.detector.record_message(chat_id, user_id, fingerprint, length):
+                await self.start_lockdown(chat_id, "رسالة متكررة من حسابات جديدة", context)
+                return True
+            
+            return self.detector.is_locked(chat_id) and self.detector.is_new_member(chat_id, user_id)
+        
+        except Exception as e:
+            logger.error(f"خطأ في فحص رسالة الغارة: {e}")
+            return False
+    
+    def is_locked(self, chat_id: int) -> bool:
+        """
+        فحص إذا كانت المجموعة في وضع الإغلاق
+        Check whether the chat is locked down
+        """
+        return self.detector.is_locked(chat_id)
+    
+    async def start_lockdown(self, chat_id: int, reason: str, context: ContextTypes.DEFAULT_TYPE):
+        """
+        تفعيل وضع الإغلاق للمجموعة
+        Put the chat into lockdown
+        """
+        if self.detector.is_locked(chat_id):
+            return
+        
+        self.detector.lock(chat_id, self.lockdown_duration)
+        logger.warning(f"تم تفعيل وضع الإغلاق في المجموعة {chat_id}: {reason}")
+        
+        # منع جميع الأعضاء من الكتابة مع حفظ الصلاحيات الحالية في بيانات المؤقت، حتى
+        # تستعاد بعد إعادة التشغيل أو إعادة تشغيل العامل
+        # Stop everyone from writing, saving current permissions in the timer data so
+        # they are restored after a restart or a worker respawn
+        timer_data = {'chat_id': chat_id}
+        if RAID_LOCK_CHAT:
+            try:
+                chat = await context.bot.get_chat(chat_id)
+                if chat.permissions is not None:
+                    timer_data['permissions'] = chat.permissions.to_dict()
+                await context.bot.set_chat_permissions(
+                    chat_id=chat_id,
+                    permissions=ChatPermissions.no_permissions()
+                )
+            except Exception as e:
+                logger.error(f"خطأ في إغلاق صلاحيات المجموعة: {e}")
+        
+        self._spawn(self.restrict_members(chat_id, self.detector.recent_members(chat_id), context))
+        
+        self.dispatcher.send_message(
+            chat_id,
+            MESSAGES["raid_lockdown"].format(minutes=self.lockdown_duration // 60)
+        )
+        
+        self.timers.schedule(
+            RAID_LOCKDOWN_TIMER,
+            f"raid_lockdown_{chat_id}",
+            self.lockdown_duration,
+            timer_data
+        )
+    
+    def _spawn(self, work: Awaitable):
+        """
+        تشغيل عمل في الخلفية مع الاحتفاظ بمهمته حتى تنتهي
+        Run work in the background, holding its task until it finishes
+        """
+        task = asyncio.get_running_loop().create_task(work)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def stop(self):
+        """
+        إلغاء مهام التقييد المتبقية بعد إيقاف طابور الإجراءات
+        Cancel the remaining restriction tasks once the action queue has stopped
+        """
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+    
+    async def end_lockdown(self, chat_id: int, bot, permissions: Optional[Dict] = None):
+        """
+        إنهاء وضع الإغلاق واستعادة صلاحيات المجموعة المحفوظة في بيانات المؤقت
+        End the lockdown and restore the chat permissions saved in the timer data
+        """
+        self.detector.unlock(chat_id)
+        
+        if permissions is not None:
+            try:
+                await bot.set_chat_permissions(
+                    chat_id=chat_id,
+                    permissions=ChatPermissions.de_json(permissions, bot)
+                )
+            except Exception as e:
+                logger.error(f"خطأ في استعادة صلاحيات المجموعة: {e}")
+        
+        self.dispatcher.send_message(chat_id, MESSAGES["raid_lockdown_end"])
+        
+        logger.info(f"انتهى وضع الإغلاق في المجموعة {chat_id}")
+    
+    async def expire_lockdowns(self, application, items: List[Dict]):
+        """
+        معالج عجلة المؤقتات لانتهاء الإغلاق
+        Timer wheel handler for lockdown expiry
+        """
+        for item in items:
+            await self.end_lockdown(item['chat_id'], application.bot, item.get('permissions'))
+    
+    async def restrict_members(self, chat_id: int, user_ids: Iterable[int],
+                               context: ContextTypes.DEFAULT_TYPE) -> int:
+        """
+        تقييد مجموعة من الأعضاء حتى نهاية الإغلاق عبر طابور الإجراءات
+        Restrict a batch of members until the lockdown ends through the action queue
+        
+        التقييد ينتهي تلقائياً من تيليجرام عند until_date فلا حاجة لإلغائه يدوياً.
+        Telegram lifts the restriction itself at until_date, so no manual undo is needed.
+        """
+        until_date = int(time.time()) + self.lockdown_duration
+        permissions = ChatPermissions.no_permissions()
+        
+        # الطابور يحدد عدد الطلبات المتزامنة ويحترم RetryAfter
+        # The queue bounds concurrent requests and honours RetryAfter
+        results = await asyncio.gather(*(
+            self.dispatcher.restrict(chat_id, user_id, permissions, until_date=until_date)
+            for user_id in user_ids
+        ), return_exceptions=True)
+        restricted = sum(1 for result in results if not isinstance(result, BaseException))
+        if len(results) > 1:
+            logger.info(f"تم تقييد {restricted} من {len(results)} عضو جديد في المجموعة {chat_id}")
+        return restricted
@@ -8,8 +8,11 @@ New member verification service
 
 import logging
 import random
-from typing import Dict, Optional
+import time
+from typing import Callable, Dict, List, Optional
 from bot.utils.database import Database
+from bot.utils.action_dispatcher import ActionDispatcher
+from config.settings import VERIFICATION_TIMEOUT, VERIFICATION_ATTEMPTS
 
 logger = logging.getLogger(__name__)
 
@@ -19,9 +22,12 @@ class VerificationService:
     Service for verifying new members
     """
     
-    def __init__(self):
-        self.db = Database()
-        self.verification_challenges = {}
+    def __init__(self, db: Optional[Database] = None, dispatcher: Optional[ActionDispatcher] = None):
+        self.db = db or Database()
+        self.dispatcher = dispatcher or ActionDispatcher()  # طابور إجراءات تيليجرام
+        # التحديات المعلقة، تكتب مباشرة في جدول verifications وتحمل منه عند الحاجة
+        # Pending challenges, written through to the verifications table and loaded from it on demand
+        self.verification_challenges: Dict[str, Dict] = {}
         
         # أسئلة التحقق
         # Verification questions
@@ -53,7 +59,8 @@ class VerificationService:
             }
         ]
     
-    async def create_challenge(self, chat_id: int, user_id: int) -> Optional[Dict]:
+    async def create_challenge(self, chat_id: int, user_id: int,
+                               timeout: int = VERIFICATION_TIMEOUT) -> Optional[Dict]:
         """
         إنشاء تحدي التحقق
         Create verification challenge
@@ -71,14 +78,16 @@ class VerificationService:
                 "correct_answer": question["correct"],
                 "wrong_answers": random.sample(question["wrong"], 3)
             }
+            deadline = int(time.time()) + timeout
             
             # حفظ التحدي
             # Save challenge
-            challenge_key = f"{chat_id}_{user_id}"
-            self.verification_challenges[challenge_key] = {
+            self.verification_challenges[self._key(chat_id, user_id)] = {
                 "challenge": challenge,
                 "attempts": 0,
-                "max_attempts": 3
+                "max_attempts": VERIFICATION_ATTEMPTS,
+                "deadline": deadline,
+                "message_id": None
             }
             
             # حفظ في قاعدة البيانات
@@ -86,7 +95,8 @@ class VerificationService:
             await self.db.save_verification_challenge(
                 chat_id=chat_id,
                 user_id=user_id,
-                challenge=challenge
+                challenge=challenge,
+                deadline=deadline
             )
             
             logger.info(f"تم إنشاء تحدي التحقق للمستخدم {user_id} في المجموعة {chat_id}")
@@ -97,31 +107,77 @@ class VerificationService:
             logger.error(f"خطأ في إنشاء تحدي التحقق: {e}")
             return None
     
+    def _key(self, chat_id: int, user_id: int) -> str:
+        return f"{chat_id}_{user_id}"
+    
+    def _cache_entry(self, pending: Dict) -> Dict:
+        return {
+            "challenge": pending["challenge"],
+            "attempts": pending["attempts"] or 0,
+            "max_attempts": VERIFICATION_ATTEMPTS,
+            "deadline": pending["deadline"],
+            "message_id": pending["message_id"]
+        }
+    
+    async def get_pending(self, chat_id: int, user_id: int) -> Optional[Dict]:
+        """
+        الحصول على التحدي المعلق من الذاكرة أو من قاعدة البيانات بعد إعادة التشغيل
+        Get the pending challenge from memory, or from the database after a restart
+        """
+        challenge_key = self._key(chat_id, user_id)
+        entry = self.verification_challenges.get(challenge_key)
+        if entry is not None:
+            return entry
+        
+        pending = await self.db.get_pending_verification(chat_id, user_id)
+        if pending is None:
+            return None
+        
+        # قد يكون تحدٍ آخر قد حفظ أثناء انتظار قاعدة البيانات
+        # Another coroutine may have cached it while the database was queried
+        return self.verification_challenges.setdefault(challenge_key, self._cache_entry(pending))
+    
+    async def _claim(self, chat_id: int, user_id: int) -> Optional[Dict]:
+        """
+        إزالة التحدي المعلق بحيث ينهيه مستدعٍ واحد فقط
+        Remove the pending challenge so exactly one caller finishes it
+        """
+        if await self.get_pending(chat_id, user_id) is None:
+            return None
+        return self.verification_challenges.pop(self._key(chat_id, user_id), None)
+    
+    async def set_challenge_message(self, chat_id: int, user_id: int, message_id: int):
+        """
+        حفظ معرف رسالة التحقق لحذفها عند انتهاء المهلة
+        Save the verification message id so it can be deleted on timeout
+        """
+        entry = self.verification_challenges.get(self._key(chat_id, user_id))
+        if entry is not None:
+            entry["message_id"] = message_id
+        
+        await self.db.set_verification_message(chat_id, user_id, message_id)
+    
     async def verify_user(self, chat_id: int, user_id: int) -> bool:
         """
         التحقق من إجابة المستخدم
         Verify user answer
         """
         try:
-            challenge_key = f"{chat_id}_{user_id}"
+            # إزالة التحدي
+            # Remove challenge
+            if await self._claim(chat_id, user_id) is None:
+                return False
             
-            if challenge_key in self.verification_challenges:
-                # إزالة التحدي
-                # Remove challenge
-                del self.verification_challenges[challenge_key]
-                
-                # تحديث قاعدة البيانات
-                # Update database
-                await self.db.complete_verification(
-                    chat_id=chat_id,
-                    user_id=user_id,
-                    success=True
-                )
-                
-                logger.info(f"تم التحقق من المستخدم {user_id} بنجاح في المجموعة {chat_id}")
-                return True
+            # تحديث قاعدة البيانات
+            # Update database
+            await self.db.complete_verification(
+                chat_id=chat_id,
+                user_id=user_id,
+                success=True
+            )
             
-            return False
+            logger.info(f"تم التحقق من المستخدم {user_id} بنجاح في المجموعة {chat_id}")
+            return True
             
         except Exception as e:
             logger.error(f"خطأ في التحقق من المستخدم: {e}")
@@ -133,28 +189,26 @@ class VerificationService:
         Handle wrong answer
         """
         try:
-            challenge_key = f"{chat_id}_{user_id}"
-            
-            if challenge_key not in self.verification_challenges:
+            entry = await self.get_pending(chat_id, user_id)
+            if entry is None:
                 return False
             
             # زيادة عدد المحاولات
             # Increase attempts
-            self.verification_challenges[challenge_key]["attempts"] += 1
-            attempts = self.verification_challenges[challenge_key]["attempts"]
-            max_attempts = self.verification_challenges[challenge_key]["max_attempts"]
+            attempts = await self.db.increment_verification_attempts(chat_id, user_id)
+            entry["attempts"] = attempts if attempts is not None else entry["attempts"] + 1
             
             # فحص إذا تم استنفاد المحاولات
             # Check if attempts exhausted
-            if attempts >= max_attempts:
+            if entry["attempts"] >= entry["max_attempts"]:
                 # إزالة التحدي
                 # Remove challenge
-                del self.verification_challenges[challenge_key]
+                if await self._claim(chat_id, user_id) is None:
+                    return False
                 
                 # طرد المستخدم
                 # Kick user
-                await context.bot.ban_chat_member(chat_id=chat_id, user_id=user_id)
-                await context.bot.unban_chat_member(chat_id=chat_id, user_id=user_id)
+                await self.dispatcher.kick(chat_id=chat_id, user_id=user_id)
                 
                 # تحديث قاعدة البيانات
                 # Update database
@@ -173,6 +227,41 @@ class VerificationService:
             logger.error(f"خطأ في معالجة الإجابة الخاطئة: {e}")
             return False
     
+    async def expire_challenge(self, chat_id: int, user_id: int) -> Optional[Dict]:
+        """
+        إنهاء تحدٍ انتهت مهلته وإرجاعه، أو None إذا تم حله مسبقاً
+        Finish a timed-out challenge and return it, or None if it was already resolved
+        """
+        try:
+            entry = await self._claim(chat_id, user_id)
+            if entry is None:
+                return None
+            
+            await self.db.complete_verification(
+                chat_id=chat_id,
+                user_id=user_id,
+                success=False
+            )
+            return entry
+            
+        except Exception as e:
+            logger.error(f"خطأ في إنهاء تحدي التحقق: {e}")
+            return None
+    
+    async def load_pending(self, accept: Optional[Callable[[int], bool]] = None) -> List[Dict]:
+        """
+        تحميل التحديات المعلقة إلى الذاكرة بعد إعادة التشغيل، و accept يحدد مجموعات هذه العملية
+        Load pending challenges into memory after a restart, accept selects this process's chats
+        """
+        pending = await self.db.get_pending_verifications()
+        if accept is not None:
+            pending = [item for item in pending if accept(item["chat_id"])]
+        for item in pending:
+            self.verification_challenges.setdefault(
+                self._key(item["chat_id"], item["user_id"]), self._cache_entry(item)
+            )
+        return pending
+    
     async def is_user_verified(self, chat_id: int, user_id: int) -> bool:
         """
         فحص إذا كان المستخدم متحققاً
@@ -6,14 +6,16 @@
 Bot utility functions
 """
 
-from .logger import setup_logging
-from .helpers import is_admin, get_user_mention, format_time
+from .logger import setup_logging, stop_logging
+from .helpers import is_admin, get_user_mention, format_time, normalize_arabic
 from .database import Database
 
 __all__ = [
     'setup_logging',
+    'stop_logging',
     'is_admin',
     'get_user_mention',
     'format_time',
+    'normalize_arabic',
     'Database'
 ]
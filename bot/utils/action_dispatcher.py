@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+طابور إجراءات تيليجرام الصادرة مع مراعاة حدود المعدل
+Outbound Telegram action queue aware of rate limits
+"""
+
+import asyncio
+import heapq
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+from telegram.error import RetryAfter
+from config.settings import (
+    DISPATCH_GLOBAL_RATE, DISPATCH_CHAT_MESSAGES_PER_MINUTE, DISPATCH_MAX_IN_FLIGHT,
+    DISPATCH_MAX_RETRIES, DISPATCH_MAX_QUEUE, DISPATCH_DRAIN_TIMEOUT
+)
+
+logger = logging.getLogger(__name__)
+
+# الأولويات: الرقم الأصغر ينفذ أولاً
+# Priorities: lower numbers run first
+PRIORITY_PUNITIVE = 0  # حذف المخالفات والكتم والطرد / deleting violations, muting, kicking
+PRIORITY_NOTICE = 1    # رسائل التحذير والإشعارات / warnings and notices
+PRIORITY_CLEANUP = 2   # حذف رسائل البوت القديمة / deleting old bot messages
+
+# أقصى عدد رسائل في طلب delete_messages واحد
+# Maximum number of messages in one delete_messages request
+DELETE_BATCH_SIZE = 100
+
+# الحد الأقصى لحاويات المعدل المحفوظة لكل مجموعة
+# Maximum number of per-chat rate buckets kept
+_MAX_CHAT_BUCKETS = 10000
+
+class TokenBucket:
+    """
+    حاوية رموز لتحديد المعدل
+    Token bucket rate limiter
+    """
+    
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated')
+    
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+    
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def wait_time(self, now: float) -> float:
+        """
+        المدة حتى يتوفر رمز واحد
+        Time until one token is available
+        """
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+    
+    def take(self):
+        self.tokens -= 1
+
+class _Action:
+    """
+    إجراء معلق في الطابور
+    A pending action in the queue
+    """
+    
+    __slots__ = ('priority', 'seq', 'chat_id', 'method', 'kwargs', 'future', 'attempts')
+    
+    def __init__(self, priority: int, seq: int, chat_id: Optional[int], method: str,
+                 kwargs: Dict[str, Any], future: asyncio.Future):
+        self.priority = priority
+        self.seq = seq
+        self.chat_id = chat_id
+        self.method = method
+        self.kwargs = kwargs
+        self.future = future
+        self.attempts = 0
+
+class ActionDispatcher:
+    """
+    يرسل إجراءات الإشراف حسب الأولوية ضمن حدود تيليجرام العامة ولكل مجموعة
+    Sends moderation actions by priority within Telegram's global and per-chat limits
+    
+    عمليات حذف نفس المجموعة تجمع في طلب delete_messages واحد، والطلبات التي
+    ترجع RetryAfter تعاد بعد المدة المطلوبة مع إيقاف المجموعة مؤقتاً. عند
+    امتلاء الطابور يتم إسقاط الإشعارات والتنظيف وليس الإجراءات العقابية.
+    Deletions in the same chat are grouped into one delete_messages request, and
+    requests answered with RetryAfter are retried after the requested delay while
+    the chat is paused. When the queue is full, notices and cleanup are shed but
+    punitive actions never are.
+    """
+    
+    def __init__(self, global_rate: float = DISPATCH_GLOBAL_RATE,
+                 chat_messages_per_minute: float = DISPATCH_CHAT_MESSAGES_PER_MINUTE,
+                 max_in_flight: int = DISPATCH_MAX_IN_FLIGHT,
+                 max_retries: int = DISPATCH_MAX_RETRIES,
+                 max_queue: int = DISPATCH_MAX_QUEUE):
+        self.bot = None
+        self.max_retries = max_retries
+        self.max_queue = max_queue
+        self._chat_rate = chat_messages_per_minute / 60.0
+        self._chat_capacity = chat_messages_per_minute
+        
+        self._global = TokenBucket(global_rate, global_rate)
+        self._chat_buckets: "OrderedDict[int, TokenBucket]" = OrderedDict()
+        self._paused: Dict[Optional[int], float] = {}
+        
+        self._queue: List[Tuple[int, int, _Action]] = []
+        self._delayed: List[Tuple[float, int, _Action]] = []
+        self._open_deletes: Dict[Tuple[int, int], _Action] = {}
+        self._seq = 0
+        self._wakeup = asyncio.Event()
+        self._in_flight: Optional[asyncio.Semaphore] = None
+        self._max_in_flight = max_in_flight
+        self._tasks: Set[asyncio.Task] = set()
+        self._worker: Optional[asyncio.Task] = None
+        
+        self.sent = 0
+        self.dropped = 0
+        self.retried = 0
+    
+    @property
+    def pending(self) -> int:
+        return len(self._queue) + len(self._delayed)
+    
+    def _enqueue(self, action: _Action):
+        heapq.heappush(self._queue, (action.priority, action.seq, action))
+        self._wakeup.set()
+    
+    def submit(self, method: str, chat_id: Optional[int], priority: int = PRIORITY_PUNITIVE,
+               **kwargs) -> asyncio.Future:
+        """
+        إضافة استدعاء لواجهة البوت إلى الطابور وإرجاع Future بنتيجته
+        Queue a Bot API call and return a future with its result
+        """
+        return self._submit(method, chat_id, priority, kwargs).future
+    
+    def _submit(self, method: str, chat_id: Optional[int], priority: int,
+                kwargs: Dict[str, Any]) -> _Action:
+        future = asyncio.get_running_loop().create_future()
+        self._seq += 1
+        if chat_id is not None:
+            kwargs['chat_id'] = chat_id
+        action = _Action(priority, self._seq, chat_id, method, kwargs, future)
+        
+        if priority != PRIORITY_PUNITIVE and self.pending >= self.max_queue:
+            self.dropped += 1
+            if self.dropped % 100 == 1:
+                logger.warning(f"طابور الإجراءات ممتلئ، تم إسقاط {self.dropped} إجراء حتى الآن")
+            future.set_result(None)
+            return action
+        
+        self._enqueue(action)
+        return action
+    
+    def delete_message(self, chat_id: int, message_id: int,
+                       priority: int = PRIORITY_PUNITIVE) -> asyncio.Future:
+        """
+        حذف رسالة، ويجمع مع عمليات الحذف المعلقة في نفس المجموعة
+        Delete a message, grouped with pending deletions in the same chat
+        """
+        key = (chat_id, priority)
+        action = self._open_deletes.get(key)
+        if action is not None and len(action.kwargs['message_ids']) < DELETE_BATCH_SIZE:
+            action.kwargs['message_ids'].append(message_id)
+            return action.future
+        
+        action = self._submit('delete_messages', chat_id, priority, {'message_ids': [message_id]})
+        if not action.future.done():
+            self._open_deletes[key] = action
+        return action.future
+    
+    def send_message(self, chat_id: int, text: str, priority: int = PRIORITY_NOTICE,
+                     **kwargs) -> asyncio.Future:
+        """
+        إرسال رسالة
+        Send a message
+        """
+        return self.submit('send_message', chat_id, priority, text=text, **kwargs)
+    
+    def restrict(self, chat_id: int, user_id: int, permissions, until_date: Optional[int] = None,
+                 priority: int = PRIORITY_PUNITIVE) -> asyncio.Future:
+        """
+        تقييد عضو
+        Restrict a member
+        """
+        return self.submit('restrict_chat_member', chat_id, priority, user_id=user_id,
+                           permissions=permissions, until_date=until_date)
+    
+    def kick(self, chat_id: int, user_id: int, priority: int = PRIORITY_PUNITIVE) -> asyncio.Future:
+        """
+        طرد عضو (حظر ثم إلغاء الحظر بالترتيب)
+        Kick a member (ban then unban, in order)
+        """
+        return self.submit('kick', chat_id, priority, user_id=user_id)
+    
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(self._chat_rate, self._chat_capacity)
+            self._chat_buckets[chat_id] = bucket
+            while len(self._chat_buckets) > _MAX_CHAT_BUCKETS:
+                self._chat_buckets.popitem(last=False)
+        else:
+            self._chat_buckets.move_to_end(chat_id)
+        return bucket
+    
+    def _ready_at(self, action: _Action, now: float) -> float:
+        """
+        أقرب وقت يسمح فيه بتنفيذ الإجراء حسب إيقاف المجموعة وحد رسائلها
+        Earliest time the action may run given chat pauses and the chat message limit
+        """
+        ready = max(self._paused.get(action.chat_id, 0.0), self._paused.get(None, 0.0))
+        if ready > now:
+            return ready
+        
+        # حد تيليجرام لكل مجموعة يخص الرسائل المرسلة
+        # Telegram's per-chat limit applies to sent messages
+        if action.method == 'send_message' and action.chat_id is not None:
+            return now + self._chat_bucket(action.chat_id).wait_time(now)
+        return now
+    
+    async def _run(self):
+        while True:
+            now = time.monotonic()
+            while self._delayed and self._delayed[0][0] <= now:
+                _, _, action = heapq.heappop(self._delayed)
+                heapq.heappush(self._queue, (action.priority, action.seq, action))
+            
+            if not self._queue:
+                timeout = self._delayed[0][0] - now if self._delayed else None
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            
+            wait = self._global.wait_time(now)
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            
+            _, _, action = heapq.heappop(self._queue)
+            ready = self._ready_at(action, now)
+            if ready > now:
+                heapq.heappush(self._delayed, (ready, action.seq, action))
+                continue
+            
+            if action.method == 'delete_messages':
+                self._open_deletes.pop((action.chat_id, action.priority), None)
+            
+            self._global.take()
+            if action.method == 'send_message' and action.chat_id is not None:
+                self._chat_bucket(action.chat_id).take()
+            
+            await self._in_flight.acquire()
+            task = asyncio.get_running_loop().create_task(self._execute(action))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+    
+    async def _call(self, action: _Action) -> Any:
+        bot = self.bot
+        kwargs = action.kwargs
+        
+        if action.method == 'kick':
+            await bot.ban_chat_member(**kwargs)
+            return await bot.unban_chat_member(only_if_banned=True, **kwargs)
+        
+        if action.method == 'delete_messages' and len(kwargs['message_ids']) == 1:
+            return await bot.delete_message(chat_id=kwargs['chat_id'], message_id=kwargs['message_ids'][0])
+        
+        return await getattr(bot, action.method)(**kwargs)
+    
+    async def _execute(self, action: _Action):
+        try:
+            result = await self._call(action)
+            self.sent += 1
+            if not action.future.done():
+                action.future.set_result(result)
+        
+        except RetryAfter as e:
+            delay = float(e.retry_after)
+            self._paused[action.chat_id] = time.monotonic() + delay
+            logger.warning(f"تجاوز حد تيليجرام في المجموعة {action.chat_id}، إيقاف لمدة {delay} ثانية")
+            
+            if action.attempts < self.max_retries:
+                action.attempts += 1
+                self.retried += 1
+                self._enqueue(action)
+            else:
+                self._fail(action, e)
+        
+        except Exception as e:
+            self._fail(action, e)
+        
+        finally:
+            self._in_flight.release()
+    
+    def _fail(self, action: _Action, error: Exception):
+        logger.error(f"خطأ في تنفيذ {action.method} في المجموعة {action.chat_id}: {error}")
+        if not action.future.done():
+            action.future.set_exception(error)
+            # تعليم الاستثناء كمقروء للإجراءات التي لا ينتظرها أحد
+            # Mark the exception retrieved for fire-and-forget actions
+            action.future.exception()
+    
+    async def start(self, bot):
+        """
+        بدء إرسال الإجراءات
+        Start dispatching actions
+        """
+        self.bot = bot
+        if self._worker is None:
+            self._in_flight = asyncio.Semaphore(self._max_in_flight)
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+    
+    async def stop(self, timeout: float = DISPATCH_DRAIN_TIMEOUT):
+        """
+        انتظار تفريغ الطابور لمدة محدودة ثم إيقاف الإرسال
+        Wait a bounded time for the queue to drain, then stop dispatching
+        """
+        deadline = time.monotonic() + timeout
+        while (self.pending or self._tasks) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        
+        if self.pending:
+            logger.warning(f"إيقاف طابور الإجراءات مع {self.pending} إجراء غير منفذ")
+        logger.info(f"تم إيقاف طابور الإجراءات (منفذ: {self.sent}، مُسقط: {self.dropped}، معاد: {self.retried})")
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+ذاكرة تخزين مؤقت لمشرفي المجموعات
+Group administrators cache
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Tuple
+from telegram.constants import ChatMemberStatus
+from config.settings import ADMIN_CACHE_TTL, ADMIN_CACHE_MAX_CHATS
+
+logger = logging.getLogger(__name__)
+
+ADMIN_STATUSES = (ChatMemberStatus.ADMINISTRATOR, ChatMemberStatus.OWNER)
+
+class AdminCache:
+    """
+    قائمة مشرفي كل مجموعة تجلب باستدعاء get_chat_administrators واحد
+    Per-chat administrator set fetched with one get_chat_administrators call
+    
+    تبقى القائمة صالحة لمدة TTL وتحدث فوراً من تحديثات الترقية والتنزيل،
+    والرسائل المتزامنة في نفس المجموعة تنتظر نفس عملية التحديث.
+    Entries live for a TTL and are patched from promotion/demotion updates,
+    and concurrent messages in the same chat share a single refresh.
+    """
+    
+    def __init__(self, ttl: float = ADMIN_CACHE_TTL, max_chats: int = ADMIN_CACHE_MAX_CHATS):
+        self.ttl = ttl
+        self.max_chats = max_chats
+        self._entries: "OrderedDict[int, Tuple[float, FrozenSet[int]]]" = OrderedDict()
+        self._refreshing: Dict[int, asyncio.Future] = {}
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    async def get_admins(self, chat_id: int, bot) -> FrozenSet[int]:
+        """
+        الحصول على معرفات مشرفي المجموعة
+        Get the administrator ids of a chat
+        """
+        entry = self._entries.get(chat_id)
+        if entry is not None and entry[0] > time.monotonic():
+            self._entries.move_to_end(chat_id)
+            return entry[1]
+        
+        # مشاركة عملية تحديث جارية بدلاً من بدء عملية جديدة
+        # Share an in-flight refresh instead of starting another one
+        pending = self._refreshing.get(chat_id)
+        if pending is not None:
+            return await asyncio.shield(pending)
+        
+        future = asyncio.get_running_loop().create_future()
+        self._refreshing[chat_id] = future
+        try:
+            members = await bot.get_chat_administrators(chat_id)
+            admins = frozenset(member.user.id for member in members)
+            self._store(chat_id, admins)
+            future.set_result(admins)
+            return admins
+        except BaseException as e:
+            if not future.done():
+                future.set_exception(e)
+                # تعليم الاستثناء كمقروء لتجنب تحذير asyncio
+                # Mark the exception retrieved to avoid an asyncio warning
+                future.exception()
+            raise
+        finally:
+            del self._refreshing[chat_id]
+    
+    async def is_admin(self, chat_id: int, user_id: int, bot) -> bool:
+        """
+        فحص إذا كان المستخدم مشرفاً باستخدام الذاكرة المؤقتة
+        Check if a user is an admin using the cache
+        """
+        return user_id in await self.get_admins(chat_id, bot)
+    
+    def _store(self, chat_id: int, admins: FrozenSet[int]):
+        self._entries[chat_id] = (time.monotonic() + self.ttl, admins)
+        self._entries.move_to_end(chat_id)
+        while len(self._entries) > self.max_chats:
+            self._entries.popitem(last=False)
+    
+    def update_member(self, chat_id: int, user_id: int, status: str):
+        """
+        تحديث القائمة من تحديث عضوية (ترقية أو تنزيل)
+        Patch the cached set from a membership update (promotion or demotion)
+        """
+        entry = self._entries.get(chat_id)
+        if entry is None:
+            return
+        
+        expires_at, admins = entry
+        if status in ADMIN_STATUSES:
+            admins = admins | {user_id}
+        else:
+            admins = admins - {user_id}
+        self._entries[chat_id] = (expires_at, admins)
+    
+    def invalidate(self, chat_id: int):
+        """
+        إزالة المجموعة من الذاكرة المؤقتة
+        Drop a chat from the cache
+        """
+        self._entries.pop(chat_id, None)
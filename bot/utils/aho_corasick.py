@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+مطابق متعدد الأنماط بخوارزمية Aho-Corasick
+Multi-pattern matcher based on the Aho-Corasick automaton
+"""
+
+from collections import deque
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# أحرف الفراغ التي يتم تجاوزها أثناء المسح
+# Whitespace characters skipped while scanning
+_WHITESPACE = frozenset(
+    " \t\n\r\f\v\u00a0\u1680\u2000\u2001\u2002\u2003\u2004\u2005"
+    "\u2006\u2007\u2008\u2009\u200a\u2028\u2029\u202f\u205f\u3000"
+)
+
+# نتيجة المطابقة: (البداية، النهاية، النمط)
+# Match result: (start, end, pattern)
+Match = Tuple[int, int, str]
+
+class AhoCorasick:
+    """
+    آلة Aho-Corasick تجد جميع الأنماط في مرور خطي واحد على النص
+    Aho-Corasick automaton finding every pattern in one linear pass over the text
+
+    يتم توحيد الأحرف عبر جدول طي (fold) يطبق على الأنماط والنص معاً،
+    ويتم تجاوز الفراغات حتى تُكتشف الكلمات المفرقة مثل "غ ب ي".
+    Characters are unified through a fold table applied to both patterns and
+    text, and whitespace is skipped so spaced-out words like "غ ب ي" are found.
+    """
+
+    def __init__(self, fold: Optional[Dict[str, str]] = None):
+        self._fold_table = str.maketrans(fold or {})
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._terminal: List[Tuple[int, ...]] = [()]
+        self._output: List[Tuple[int, ...]] = [()]
+        self._keys: Dict[str, int] = {}
+        self.patterns: List[str] = []
+        self._lengths: List[int] = []
+        self._built = True
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def fold(self, text: str) -> str:
+        """
+        تطبيق الطي وتحويل الأحرف الصغيرة مع الحفاظ على المواقع
+        Apply folding and lowercasing while preserving character offsets
+        """
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            lowered = ''.join(ch if len(ch.lower()) != 1 else ch.lower() for ch in text)
+        return lowered.translate(self._fold_table)
+
+    def add(self, pattern: str) -> bool:
+        """
+        إضافة نمط إلى الآلة
+        Add a pattern to the automaton
+        """
+        key = ''.join(ch for ch in self.fold(pattern) if ch not in _WHITESPACE)
+        if not key or key in self._keys:
+            return False
+
+        state = 0
+        for ch in key:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._terminal.append(())
+                self._goto[state][ch] = next_state
+            state = next_state
+
+        index = len(self.patterns)
+        self._keys[key] = index
+        self.patterns.append(pattern)
+        self._lengths.append(len(key))
+        self._terminal[state] = self._terminal[state] + (index,)
+        self._built = False
+        return True
+
+    def build(self):
+        """
+        حساب روابط الفشل ودمج المخرجات
+        Compute failure links and merge outputs
+        """
+        goto = self._goto
+        fail = self._fail
+        output = list(self._terminal)
+
+        queue = deque()
+        for next_state in goto[0].values():
+            fail[next_state] = 0
+            queue.append(next_state)
+
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in goto[state].items():
+                queue.append(next_state)
+
+                fallback = fail[state]
+                while fallback and ch not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[next_state] = goto[fallback].get(ch, 0)
+
+                if output[fail[next_state]]:
+                    output[next_state] = output[next_state] + output[fail[next_state]]
+
+        self._output = output
+        self._built = True
+
+    def to_state(self) -> Tuple:
+        """
+        جداول الآلة المبنية كقيم بسيطة قابلة للتسلسل، وتغيير ترتيبها يتطلب رفع
+        filter_artifact.FORMAT_VERSION
+        The built automaton tables as plain serializable values, changing their layout
+        requires bumping filter_artifact.FORMAT_VERSION
+        """
+        if not self._built:
+            self.build()
+        return (self._fold_table, self._goto, self._fail, self._terminal, self._output,
+                self._keys, self.patterns, self._lengths)
+    
+    @classmethod
+    def from_state(cls, state: Tuple) -> "AhoCorasick":
+        """
+        استعادة آلة مبنية من جداولها دون إعادة حساب روابط الفشل
+        Restore a built automaton from its tables without recomputing failure links
+        """
+        matcher = cls.__new__(cls)
+        (matcher._fold_table, matcher._goto, matcher._fail, matcher._terminal, matcher._output,
+         matcher._keys, matcher.patterns, matcher._lengths) = state
+        matcher._built = True
+        return matcher
+    
+    def iter_matches(self, text: str) -> Iterator[Match]:
+        """
+        إرجاع جميع المطابقات في النص
+        Yield every match in the text
+
+        المطابقة داخل كلمة واحدة مقبولة كسلسلة فرعية، أما المطابقة التي
+        تمتد عبر فراغات فيجب أن تبدأ وتنتهي عند حدود الكلمات.
+        A match inside a single word is accepted as a substring, while a match
+        spanning whitespace must start and end on word boundaries.
+        """
+        if not self._built:
+            self.build()
+        if not text or not self.patterns:
+            return
+
+        folded = self.fold(text)
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        lengths = self._lengths
+        patterns = self.patterns
+
+        state = 0
+        positions: List[int] = []
+
+        for index, ch in enumerate(folded):
+            if ch in _WHITESPACE:
+                continue
+            positions.append(index)
+
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+
+            if output[state]:
+                consumed = len(positions)
+                for pattern_index in output[state]:
+                    length = lengths[pattern_index]
+                    start = positions[consumed - length]
+                    end = index + 1
+                    if end - start != length and not _on_boundaries(text, start, end):
+                        continue
+                    yield (start, end, patterns[pattern_index])
+
+    def search(self, text: str) -> Optional[Match]:
+        """
+        إرجاع أول مطابقة أو None
+        Return the first match or None
+        """
+        return next(self.iter_matches(text), None)
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == '_'
+
+def _on_boundaries(text: str, start: int, end: int) -> bool:
+    """
+    فحص إذا كان المقطع يبدأ وينتهي عند حدود الكلمات
+    Check if a span starts and ends on word boundaries
+    """
+    if start > 0 and _is_word_char(text[start - 1]):
+        return False
+    if end < len(text) and _is_word_char(text[end]):
+        return False
+    return True
@@ -6,12 +6,21 @@
 Database management
 """
 
+import json
 import logging
 import sqlite3
 import asyncio
-from typing import Dict, List, Optional, Any
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Any, Callable, Sequence, Tuple
 from datetime import datetime
 from pathlib import Path
+from config.settings import (
+    DB_READ_WORKERS, DB_SYNCHRONOUS, DB_CACHE_SIZE_KB, DB_MMAP_SIZE, DB_BUSY_TIMEOUT_MS
+)
+from .migrations import apply_migrations
+from .metrics import DB_SECONDS, DB_ROWS_WRITTEN
 
 logger = logging.getLogger(__name__)
 
@@ -21,9 +30,18 @@ class Database:
     Database management class
     """
     
-    def __init__(self, db_path: str = "bot_data.db"):
+    def __init__(self, db_path: str = "bot_data.db", read_workers: int = DB_READ_WORKERS):
         self.db_path = db_path
         self.connection = None
+        
+        # خيط كتابة واحد يملك اتصال الكتابة، ومجموعة خيوط للقراءة
+        # A single writer thread owns the write connection, plus a reader pool
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+        self._readers = ThreadPoolExecutor(max_workers=max(1, read_workers), thread_name_prefix="db-reader")
+        self._local = threading.local()
+        self._reader_connections: List[sqlite3.Connection] = []
+        self._reader_lock = threading.Lock()
+        
         self.init_database()
     
     def init_database(self):
@@ -32,122 +50,150 @@ class Database:
         Initialize database
         """
         try:
-            self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
-            self.connection.row_factory = sqlite3.Row
-            self.create_tables()
+            self._writer.submit(self._open_writer).result()
             logger.info("تم تهيئة قاعدة البيانات بنجاح")
         except Exception as e:
             logger.error(f"خطأ في تهيئة قاعدة البيانات: {e}")
     
+    def _open_writer(self):
+        """
+        فتح اتصال الكتابة داخل خيط الكتابة
+        Open the write connection inside the writer thread
+        """
+        self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self._configure(self.connection, writer=True)
+        self.create_tables()
+    
+    def _configure(self, connection: sqlite3.Connection, writer: bool = False):
+        """
+        ضبط إعدادات الأداء للاتصال
+        Apply performance pragmas to a connection
+        """
+        connection.execute(f"PRAGMA busy_timeout = {int(DB_BUSY_TIMEOUT_MS)}")
+        connection.execute(f"PRAGMA cache_size = -{int(DB_CACHE_SIZE_KB)}")
+        connection.execute(f"PRAGMA mmap_size = {int(DB_MMAP_SIZE)}")
+        connection.execute("PRAGMA temp_store = MEMORY")
+        
+        if writer:
+            # وضع WAL يسمح للقراء بالعمل أثناء الكتابة ويبقى محفوظاً في الملف
+            # WAL lets readers run during writes and persists in the file
+            mode = connection.execute("PRAGMA journal_mode = WAL").fetchone()[0]
+            connection.execute(f"PRAGMA synchronous = {DB_SYNCHRONOUS}")
+            logger.debug(f"وضع السجل لقاعدة البيانات: {mode}")
+    
+    def _reader_connection(self) -> sqlite3.Connection:
+        """
+        الحصول على اتصال القراءة الخاص بخيط القراءة الحالي
+        Get the read connection of the current reader thread
+        """
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_path, check_same_thread=False)
+            connection.row_factory = sqlite3.Row
+            self._configure(connection)
+            self._local.connection = connection
+            with self._reader_lock:
+                self._reader_connections.append(connection)
+        return connection
+    
+    def _shares_writer(self) -> bool:
+        """
+        قاعدة البيانات في الذاكرة لا يمكن مشاركتها بين الاتصالات
+        An in-memory database cannot be shared between connections
+        """
+        return self.db_path == ":memory:"
+    
+    async def _run_write(self, operation: str, func: Callable[[sqlite3.Connection], Any]) -> Any:
+        """
+        تنفيذ دالة على خيط الكتابة دون حجب حلقة الأحداث، و operation اسم العملية في المقاييس
+        Run a function on the writer thread without blocking the event loop, operation
+        being the name used in the metrics
+        """
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            return await loop.run_in_executor(self._writer, func, self.connection)
+        finally:
+            DB_SECONDS.labels(operation).observe(time.perf_counter() - started)
+    
+    async def _run_read(self, operation: str, func: Callable[[sqlite3.Connection], Any]) -> Any:
+        """
+        تنفيذ دالة قراءة على مجموعة خيوط القراءة
+        Run a read function on the reader pool
+        """
+        if self._shares_writer():
+            return await self._run_write(operation, func)
+        
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            return await loop.run_in_executor(
+                self._readers, lambda: func(self._reader_connection())
+            )
+        finally:
+            DB_SECONDS.labels(operation).observe(time.perf_counter() - started)
+    
+    async def _transaction(self, operation: str, statements: Sequence[Tuple[str, Sequence[Any]]]):
+        """
+        تنفيذ عبارات كتابة في معاملة واحدة على خيط الكتابة
+        Execute write statements in one transaction on the writer thread
+        """
+        def run(connection: sqlite3.Connection):
+            try:
+                cursor = connection.cursor()
+                for sql, params in statements:
+                    cursor.execute(sql, params)
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+        
+        await self._run_write(operation, run)
+        DB_ROWS_WRITTEN.labels(operation).inc(len(statements))
+    
+    async def _transaction_many(self, operation: str,
+                                statements: Sequence[Tuple[str, Sequence[Sequence[Any]]]]):
+        """
+        تنفيذ دفعات executemany في معاملة واحدة على خيط الكتابة
+        Execute executemany batches in one transaction on the writer thread
+        """
+        def run(connection: sqlite3.Connection):
+            try:
+                cursor = connection.cursor()
+                for sql, rows in statements:
+                    if rows:
+                        cursor.executemany(sql, rows)
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+        
+        await self._run_write(operation, run)
+        DB_ROWS_WRITTEN.labels(operation).inc(sum(len(rows) for _, rows in statements))
+    
+    async def _execute(self, operation: str, sql: str, params: Sequence[Any]):
+        """
+        تنفيذ عبارة كتابة واحدة على خيط الكتابة
+        Execute a single write statement on the writer thread
+        """
+        await self._transaction(operation, [(sql, params)])
+    
+    async def _fetchone(self, operation: str, sql: str, params: Sequence[Any]) -> Optional[sqlite3.Row]:
+        """
+        تنفيذ استعلام قراءة وإرجاع صف واحد
+        Run a read query and return one row
+        """
+        return await self._run_read(operation, lambda connection: connection.execute(sql, params).fetchone())
+    
     def create_tables(self):
         """
-        إنشاء جداول قاعدة البيانات
-        Create database tables
+        إنشاء جداول قاعدة البيانات وترقيتها عبر الترحيلات
+        Create and upgrade database tables through migrations
         """
         try:
-            cursor = self.connection.cursor()
-            
-            # جدول المستخدمين
-            # Users table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS users (
-                    id INTEGER PRIMARY KEY,
-                    user_id INTEGER NOT NULL,
-                    chat_id INTEGER NOT NULL,
-                    username TEXT,
-                    first_name TEXT,
-                    last_name TEXT,
-                    joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    is_verified BOOLEAN DEFAULT FALSE,
-                    is_banned BOOLEAN DEFAULT FALSE,
-                    UNIQUE(user_id, chat_id)
-                )
-            ''')
-            
-            # جدول التحقق
-            # Verification table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS verifications (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    chat_id INTEGER NOT NULL,
-                    user_id INTEGER NOT NULL,
-                    challenge_data TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    completed_at TIMESTAMP,
-                    success BOOLEAN DEFAULT FALSE
-                )
-            ''')
-            
-            # جدول الإشراف
-            # Moderation table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS moderation_actions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    chat_id INTEGER NOT NULL,
-                    user_id INTEGER NOT NULL,
-                    admin_id INTEGER NOT NULL,
-                    action_type TEXT NOT NULL,
-                    reason TEXT,
-                    duration INTEGER,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # جدول التحذيرات
-            # Warnings table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS warnings (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    chat_id INTEGER NOT NULL,
-                    user_id INTEGER NOT NULL,
-                    reason TEXT,
-                    count INTEGER DEFAULT 1,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # جدول المخالفات
-            # Violations table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS violations (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    chat_id INTEGER NOT NULL,
-                    user_id INTEGER NOT NULL,
-                    violation_type TEXT NOT NULL,
-                    content TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # جدول الرسائل
-            # Messages table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS messages (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    chat_id INTEGER NOT NULL,
-                    user_id INTEGER NOT NULL,
-                    message_text TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # جدول الكتم
-            # Mutes table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS mutes (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    chat_id INTEGER NOT NULL,
-                    user_id INTEGER NOT NULL,
-                    duration INTEGER NOT NULL,
-                    reason TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    expires_at TIMESTAMP,
-                    is_active BOOLEAN DEFAULT TRUE
-                )
-            ''')
-            
-            self.connection.commit()
-            logger.info("تم إنشاء جداول قاعدة البيانات بنجاح")
+            version = apply_migrations(self.connection)
+            logger.info(f"تم إنشاء جداول قاعدة البيانات بنجاح (إصدار المخطط {version})")
             
         except Exception as e:
             logger.error(f"خطأ في إنشاء جداول قاعدة البيانات: {e}")
@@ -159,63 +205,159 @@ class Database:
         Save user data
         """
         try:
-            cursor = self.connection.cursor()
-            cursor.execute('''
+            await self._execute('save_user', '''
                 INSERT OR REPLACE INTO users 
                 (user_id, chat_id, username, first_name, last_name)
                 VALUES (?, ?, ?, ?, ?)
             ''', (user_id, chat_id, username, first_name, last_name))
             
-            self.connection.commit()
             logger.debug(f"تم حفظ بيانات المستخدم {user_id}")
             
         except Exception as e:
             logger.error(f"خطأ في حفظ بيانات المستخدم: {e}")
     
-    async def save_verification_challenge(self, chat_id: int, user_id: int, challenge: Dict):
+    async def save_verification_challenge(self, chat_id: int, user_id: int, challenge: Dict,
+                                          deadline: Optional[int] = None):
         """
         حفظ تحدي التحقق
         Save verification challenge
         """
         try:
-            cursor = self.connection.cursor()
-            challenge_data = str(challenge)
-            
-            cursor.execute('''
-                INSERT INTO verifications (chat_id, user_id, challenge_data)
-                VALUES (?, ?, ?)
-            ''', (chat_id, user_id, challenge_data))
+            challenge_data = json.dumps(challenge, ensure_ascii=False)
+            
+            # تحدٍ جديد يلغي أي تحدٍ معلق سابق لنفس المستخدم
+            # A new challenge supersedes any earlier pending one for the same user
+            await self._transaction('save_verification_challenge', [
+                ('''
+                    UPDATE verifications 
+                    SET completed_at = CURRENT_TIMESTAMP, success = FALSE
+                    WHERE chat_id = ? AND user_id = ? AND completed_at IS NULL
+                ''', (chat_id, user_id)),
+                ('''
+                    INSERT INTO verifications (chat_id, user_id, challenge_data, deadline)
+                    VALUES (?, ?, ?, ?)
+                ''', (chat_id, user_id, challenge_data, deadline))
+            ])
             
-            self.connection.commit()
             logger.debug(f"تم حفظ تحدي التحقق للمستخدم {user_id}")
             
         except Exception as e:
             logger.error(f"خطأ في حفظ تحدي التحقق: {e}")
     
+    async def set_verification_message(self, chat_id: int, user_id: int, message_id: int):
+        """
+        حفظ معرف رسالة التحقق
+        Save the verification message id
+        """
+        try:
+            await self._execute('set_verification_message', '''
+                UPDATE verifications 
+                SET message_id = ?
+                WHERE chat_id = ? AND user_id = ? AND completed_at IS NULL
+            ''', (message_id, chat_id, user_id))
+            
+        except Exception as e:
+            logger.error(f"خطأ في حفظ رسالة التحقق: {e}")
+    
+    async def increment_verification_attempts(self, chat_id: int, user_id: int) -> Optional[int]:
+        """
+        زيادة عدد محاولات التحقق وإرجاع العدد الجديد
+        Increment verification attempts and return the new count
+        """
+        def run(connection: sqlite3.Connection) -> Optional[int]:
+            try:
+                connection.execute('''
+                    UPDATE verifications 
+                    SET attempts = attempts + 1
+                    WHERE chat_id = ? AND user_id = ? AND completed_at IS NULL
+                ''', (chat_id, user_id))
+                row = connection.execute('''
+                    SELECT attempts FROM verifications 
+                    WHERE chat_id = ? AND user_id = ? AND completed_at IS NULL
+                    ORDER BY id DESC LIMIT 1
+                ''', (chat_id, user_id)).fetchone()
+                connection.commit()
+                return row[0] if row else None
+            except Exception:
+                connection.rollback()
+                raise
+        
+        try:
+            return await self._run_write('increment_verification_attempts', run)
+        except Exception as e:
+            logger.error(f"خطأ في زيادة محاولات التحقق: {e}")
+            return None
+    
+    def _pending_verification(self, row: sqlite3.Row) -> Dict:
+        return {
+            'chat_id': row['chat_id'],
+            'user_id': row['user_id'],
+            'challenge': json.loads(row['challenge_data']),
+            'attempts': row['attempts'],
+            'deadline': row['deadline'],
+            'message_id': row['message_id']
+        }
+    
+    async def get_pending_verification(self, chat_id: int, user_id: int) -> Optional[Dict]:
+        """
+        الحصول على تحدي التحقق المعلق للمستخدم
+        Get the user's pending verification challenge
+        """
+        try:
+            row = await self._fetchone('get_pending_verification', '''
+                SELECT chat_id, user_id, challenge_data, attempts, deadline, message_id
+                FROM verifications 
+                WHERE chat_id = ? AND user_id = ? AND completed_at IS NULL
+                ORDER BY id DESC LIMIT 1
+            ''', (chat_id, user_id))
+            
+            return self._pending_verification(row) if row else None
+            
+        except Exception as e:
+            logger.error(f"خطأ في الحصول على التحقق المعلق: {e}")
+            return None
+    
+    async def get_pending_verifications(self) -> List[Dict]:
+        """
+        الحصول على جميع تحديات التحقق المعلقة مرتبة حسب المهلة
+        Get every pending verification challenge ordered by deadline
+        """
+        try:
+            rows = await self._run_read('get_pending_verifications', lambda connection: connection.execute('''
+                SELECT chat_id, user_id, challenge_data, attempts, deadline, message_id
+                FROM verifications 
+                WHERE completed_at IS NULL AND deadline IS NOT NULL
+                ORDER BY deadline
+            ''').fetchall())
+            
+            return [self._pending_verification(row) for row in rows]
+            
+        except Exception as e:
+            logger.error(f"خطأ في الحصول على التحققات المعلقة: {e}")
+            return []
+    
     async def complete_verification(self, chat_id: int, user_id: int, success: bool):
         """
         إكمال التحقق
         Complete verification
         """
         try:
-            cursor = self.connection.cursor()
-            
             # تحديث حالة التحقق
-            cursor.execute('''
+            statements = [('''
                 UPDATE verifications 
                 SET completed_at = CURRENT_TIMESTAMP, success = ?
                 WHERE chat_id = ? AND user_id = ? AND completed_at IS NULL
-            ''', (success, chat_id, user_id))
+            ''', (success, chat_id, user_id))]
             
             # تحديث حالة المستخدم
             if success:
-                cursor.execute('''
+                statements.append(('''
                     UPDATE users 
                     SET is_verified = TRUE
                     WHERE chat_id = ? AND user_id = ?
-                ''', (chat_id, user_id))
+                ''', (chat_id, user_id)))
             
-            self.connection.commit()
+            await self._transaction('complete_verification', statements)
             logger.debug(f"تم إكمال التحقق للمستخدم {user_id}: {success}")
             
         except Exception as e:
@@ -227,13 +369,11 @@ class Database:
         Check if user is verified
         """
         try:
-            cursor = self.connection.cursor()
-            cursor.execute('''
+            result = await self._fetchone('is_user_verified', '''
                 SELECT is_verified FROM users 
                 WHERE chat_id = ? AND user_id = ?
             ''', (chat_id, user_id))
             
-            result = cursor.fetchone()
             return result['is_verified'] if result else False
             
         except Exception as e:
@@ -246,15 +386,13 @@ class Database:
         Save mute information
         """
         try:
-            cursor = self.connection.cursor()
             expires_at = datetime.now().timestamp() + duration
             
-            cursor.execute('''
+            await self._execute('save_mute', '''
                 INSERT INTO mutes (chat_id, user_id, duration, reason, expires_at)
                 VALUES (?, ?, ?, ?, ?)
             ''', (chat_id, user_id, duration, reason, expires_at))
             
-            self.connection.commit()
             logger.debug(f"تم حفظ معلومات الكتم للمستخدم {user_id}")
             
         except Exception as e:
@@ -266,50 +404,78 @@ class Database:
         Remove mute
         """
         try:
-            cursor = self.connection.cursor()
-            cursor.execute('''
+            await self._execute('remove_mute', '''
                 UPDATE mutes 
                 SET is_active = FALSE
                 WHERE chat_id = ? AND user_id = ? AND is_active = TRUE
             ''', (chat_id, user_id))
             
-            self.connection.commit()
             logger.debug(f"تم إزالة الكتم للمستخدم {user_id}")
             
         except Exception as e:
             logger.error(f"خطأ في إزالة الكتم: {e}")
     
+    async def get_active_mute(self, chat_id: int, user_id: int) -> Optional[float]:
+        """
+        الحصول على وقت انتهاء الكتم النشط للمستخدم
+        Get the expiry time of the user's active mute
+        """
+        try:
+            row = await self._fetchone('get_active_mute', '''
+                SELECT MAX(expires_at) AS expires_at FROM mutes 
+                WHERE chat_id = ? AND user_id = ? AND is_active = TRUE AND expires_at > ?
+            ''', (chat_id, user_id, datetime.now().timestamp()))
+            
+            return row['expires_at'] if row else None
+            
+        except Exception as e:
+            logger.error(f"خطأ في الحصول على الكتم النشط: {e}")
+            return None
+    
     async def save_warning(self, chat_id: int, user_id: int, reason: str, count: int):
         """
         حفظ التحذير
         Save warning
         """
         try:
-            cursor = self.connection.cursor()
-            cursor.execute('''
+            await self._execute('save_warning', '''
                 INSERT INTO warnings (chat_id, user_id, reason, count)
                 VALUES (?, ?, ?, ?)
             ''', (chat_id, user_id, reason, count))
             
-            self.connection.commit()
             logger.debug(f"تم حفظ التحذير للمستخدم {user_id}")
             
         except Exception as e:
             logger.error(f"خطأ في حفظ التحذير: {e}")
     
+    async def get_warning_count(self, chat_id: int, user_id: int) -> Optional[int]:
+        """
+        الحصول على عدد تحذيرات المستخدم
+        Get the user's warning count
+        """
+        try:
+            row = await self._fetchone('get_warning_count', '''
+                SELECT COALESCE(MAX(count), 0) AS count FROM warnings 
+                WHERE chat_id = ? AND user_id = ?
+            ''', (chat_id, user_id))
+            
+            return row['count'] if row else 0
+            
+        except Exception as e:
+            logger.error(f"خطأ في الحصول على عدد التحذيرات: {e}")
+            return None
+    
     async def clear_warnings(self, chat_id: int, user_id: int):
         """
         مسح التحذيرات
         Clear warnings
         """
         try:
-            cursor = self.connection.cursor()
-            cursor.execute('''
+            await self._execute('clear_warnings', '''
                 DELETE FROM warnings 
                 WHERE chat_id = ? AND user_id = ?
             ''', (chat_id, user_id))
             
-            self.connection.commit()
             logger.debug(f"تم مسح التحذيرات للمستخدم {user_id}")
             
         except Exception as e:
@@ -321,13 +487,11 @@ class Database:
         Log violation
         """
         try:
-            cursor = self.connection.cursor()
-            cursor.execute('''
+            await self._execute('log_violation', '''
                 INSERT INTO violations (chat_id, user_id, violation_type, content)
                 VALUES (?, ?, ?, ?)
             ''', (chat_id, user_id, violation_type, content))
             
-            self.connection.commit()
             logger.debug(f"تم تسجيل مخالفة {violation_type} للمستخدم {user_id}")
             
         except Exception as e:
@@ -339,26 +503,138 @@ class Database:
         Log message
         """
         try:
-            cursor = self.connection.cursor()
-            cursor.execute('''
+            await self._execute('log_message', '''
                 INSERT INTO messages (chat_id, user_id, message_text)
                 VALUES (?, ?, ?)
             ''', (chat_id, user_id, message_text))
             
-            self.connection.commit()
-            
         except Exception as e:
             logger.error(f"خطأ في تسجيل الرسالة: {e}")
     
+    async def log_batch(self, messages: Sequence[Tuple] = (), violations: Sequence[Tuple] = ()):
+        """
+        تسجيل دفعة من الرسائل والمخالفات في معاملة واحدة
+        Log a batch of messages and violations in one transaction
+        
+        صفوف الرسائل: (chat_id, user_id, message_text, created_at)
+        صفوف المخالفات: (chat_id, user_id, violation_type, content, created_at)
+        Message rows: (chat_id, user_id, message_text, created_at)
+        Violation rows: (chat_id, user_id, violation_type, content, created_at)
+        """
+        await self._transaction_many('log_batch', [
+            ('''
+                INSERT INTO messages (chat_id, user_id, message_text, created_at)
+                VALUES (?, ?, ?, ?)
+            ''', messages),
+            ('''
+                INSERT INTO violations (chat_id, user_id, violation_type, content, created_at)
+                VALUES (?, ?, ?, ?, ?)
+            ''', violations)
+        ])
+        
+        logger.debug(f"تم تسجيل دفعة: {len(messages)} رسالة و {len(violations)} مخالفة")
+    
+    async def get_chat_badwords(self, chat_id: int) -> Tuple[List[Tuple[str, str]], Optional[str]]:
+        """
+        الحصول على إضافات واستثناءات المجموعة وإجرائها
+        Get the chat's additions, exemptions and action
+        """
+        def run(connection: sqlite3.Connection):
+            rows = connection.execute('''
+                SELECT word, kind FROM chat_badwords WHERE chat_id = ?
+            ''', (chat_id,)).fetchall()
+            policy = connection.execute('''
+                SELECT action FROM chat_badword_policies WHERE chat_id = ?
+            ''', (chat_id,)).fetchone()
+            return [(row['word'], row['kind']) for row in rows], policy['action'] if policy else None
+        
+        return await self._run_read('get_chat_badwords', run)
+    
+    async def save_chat_badword(self, chat_id: int, word: str, kind: str):
+        """
+        حفظ كلمة مضافة أو مستثناة في المجموعة
+        Save an added or exempted word for a chat
+        """
+        await self._execute('save_chat_badword', '''
+            INSERT OR REPLACE INTO chat_badwords (chat_id, word, kind)
+            VALUES (?, ?, ?)
+        ''', (chat_id, word, kind))
+    
+    async def remove_chat_badword(self, chat_id: int, word: str):
+        """
+        إزالة كلمة من إضافات أو استثناءات المجموعة
+        Remove a word from the chat's additions or exemptions
+        """
+        await self._execute('remove_chat_badword', '''
+            DELETE FROM chat_badwords WHERE chat_id = ? AND word = ?
+        ''', (chat_id, word))
+    
+    async def save_chat_badword_action(self, chat_id: int, action: str):
+        """
+        حفظ إجراء الكلمات المحظورة للمجموعة
+        Save the chat's bad word action
+        """
+        await self._execute('save_chat_badword_action', '''
+            INSERT OR REPLACE INTO chat_badword_policies (chat_id, action)
+            VALUES (?, ?)
+        ''', (chat_id, action))
+    
+    async def get_chat_settings(self, chat_id: int) -> Optional[Dict]:
+        """
+        الحصول على إعدادات المجموعة المحفوظة
+        Get the chat's stored settings
+        """
+        row = await self._fetchone('get_chat_settings', '''
+            SELECT verification, badwords, spam, antiraid, spam_threshold, warn_limit, mute_duration
+            FROM chat_settings WHERE chat_id = ?
+        ''', (chat_id,))
+        return dict(row) if row else None
+    
+    async def save_chat_settings(self, chat_id: int, changes: Dict):
+        """
+        حفظ الإعدادات المتغيرة فقط، وباقي الأعمدة تبقى كما هي (NULL تعني القيمة الافتراضية)
+        Save only the changed settings, other columns stay as they are (NULL meaning the default)
+        """
+        columns = list(changes)
+        await self._execute('save_chat_settings', f'''
+            INSERT INTO chat_settings (chat_id, {', '.join(columns)}, updated_at)
+            VALUES (?, {', '.join('?' for _ in columns)}, CURRENT_TIMESTAMP)
+            ON CONFLICT (chat_id) DO UPDATE SET
+                {', '.join(f'{column} = excluded.{column}' for column in columns)},
+                updated_at = excluded.updated_at
+        ''', (chat_id, *changes.values()))
+    
+    async def save_timers(self, upserts: Sequence[Tuple] = (), deletes: Sequence[Tuple] = ()):
+        """
+        حفظ وحذف مواعيد المؤقتات في معاملة واحدة
+        Save and delete timer deadlines in one transaction
+        """
+        await self._transaction_many('save_timers', [
+            ('''
+                INSERT OR REPLACE INTO timers (key, kind, deadline, data)
+                VALUES (?, ?, ?, ?)
+            ''', upserts),
+            ("DELETE FROM timers WHERE key = ?", deletes)
+        ])
+    
+    async def load_timers(self) -> List[Tuple]:
+        """
+        تحميل جميع المؤقتات المحفوظة
+        Load every persisted timer
+        """
+        rows = await self._run_read(
+            'load_timers',
+            lambda connection: connection.execute("SELECT key, kind, deadline, data FROM timers").fetchall()
+        )
+        return [tuple(row) for row in rows]
+    
     async def get_verification_stats(self, chat_id: int) -> Dict:
         """
         الحصول على إحصائيات التحقق
         Get verification statistics
         """
         try:
-            cursor = self.connection.cursor()
-            
-            cursor.execute('''
+            result = await self._fetchone('get_verification_stats', '''
                 SELECT 
                     COUNT(*) as total_verifications,
                     COUNT(CASE WHEN success = 1 THEN 1 END) as successful_verifications,
@@ -367,7 +643,6 @@ class Database:
                 WHERE chat_id = ?
             ''', (chat_id,))
             
-            result = cursor.fetchone()
             return dict(result) if result else {}
             
         except Exception as e:
@@ -380,9 +655,7 @@ class Database:
         Get moderation statistics
         """
         try:
-            cursor = self.connection.cursor()
-            
-            cursor.execute('''
+            result = await self._fetchone('get_moderation_stats', '''
                 SELECT 
                     COUNT(*) as total_actions,
                     COUNT(CASE WHEN action_type = 'mute' THEN 1 END) as mutes,
@@ -392,18 +665,39 @@ class Database:
                 WHERE chat_id = ?
             ''', (chat_id,))
             
-            result = cursor.fetchone()
             return dict(result) if result else {}
             
         except Exception as e:
             logger.error(f"خطأ في الحصول على إحصائيات الإشراف: {e}")
             return {}
     
+    def _close_writer(self):
+        """
+        تحديث إحصائيات المخطط ثم إغلاق اتصال الكتابة
+        Refresh planner statistics then close the write connection
+        """
+        try:
+            self.connection.execute("PRAGMA optimize")
+        except Exception as e:
+            logger.error(f"خطأ في تحسين قاعدة البيانات: {e}")
+        self.connection.close()
+    
     def close(self):
         """
         إغلاق الاتصال بقاعدة البيانات
         Close database connection
         """
+        # إنهاء العمليات المعلقة قبل إغلاق الاتصالات
+        # Drain pending operations before closing connections
+        self._readers.shutdown(wait=True)
+        with self._reader_lock:
+            for connection in self._reader_connections:
+                connection.close()
+            self._reader_connections.clear()
+        
         if self.connection:
-            self.connection.close()
+            self._writer.submit(self._close_writer).result()
+            self.connection = None
             logger.info("تم إغلاق الاتصال بقاعدة البيانات")
+        
+        self._writer.shutdown(wait=True)
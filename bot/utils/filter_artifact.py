@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+ملف ثنائي مترجم لآلة مطابقة الكلمات المحظورة
+Compiled binary artifact of the bad words matcher
+"""
+
+import logging
+import marshal
+import mmap
+import os
+import struct
+import sys
+from pathlib import Path
+from typing import Any, Optional
+from bot.utils.helpers import NORMALIZE_VERSION
+
+logger = logging.getLogger(__name__)
+
+# رأس الملف: التوقيع، إصدار الصيغة، إصدار بايثون وmarshal، إصدار التوحيد، بصمة الملف المصدر، طول البيانات
+# File header: magic, format version, Python and marshal versions, normalization version, source digest,
+# payload length
+# FORMAT_VERSION يرفع عند تغيير الرأس أو ترتيب جداول AhoCorasick.to_state
+# FORMAT_VERSION is bumped when the header or the AhoCorasick.to_state table layout changes
+MAGIC = b"BWAC"
+FORMAT_VERSION = 2
+_HEADER = struct.Struct("<4sHBBBH32sQ")
+
+def _runtime() -> tuple:
+    # صيغة marshal تختلف بين إصدارات بايثون، والكلمات الموحدة تتغير مع قواعد التوحيد
+    # The marshal format differs between Python versions, and the normalized words change
+    # with the normalization rules
+    return sys.version_info[0], sys.version_info[1], marshal.version, NORMALIZE_VERSION
+
+def save_artifact(path: Path, digest: bytes, payload: Any):
+    """
+    كتابة الملف المترجم بشكل ذري عبر ملف مؤقت
+    Write the compiled artifact atomically through a temporary file
+    """
+    data = marshal.dumps(payload)
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, *_runtime(), digest, len(data))
+    
+    temporary = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(temporary, 'wb') as f:
+        f.write(header)
+        f.write(data)
+    os.replace(temporary, path)
+
+def load_artifact(path: Path, digest: bytes) -> Optional[Any]:
+    """
+    تحميل الملف المترجم عبر mmap، وإرجاع None إذا كان قديماً أو غير متوافق
+    Load the compiled artifact through mmap, returning None if stale or incompatible
+    """
+    try:
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size < _HEADER.size:
+                return None
+            
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                magic, version, major, minor, marshal_version, normalize_version, source_digest, length = \
+                    _HEADER.unpack_from(mapped)
+                if (magic != MAGIC or version != FORMAT_VERSION
+                        or (major, minor, marshal_version, normalize_version) != _runtime()
+                        or source_digest != digest
+                        or _HEADER.size + length > len(mapped)):
+                    return None
+                
+                # القراءة مباشرة من الذاكرة المعينة دون نسخة وسيطة
+                # Decode straight from the mapped memory without an intermediate copy
+                with memoryview(mapped) as view, view[_HEADER.size:_HEADER.size + length] as data:
+                    return marshal.loads(data)
+    
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"تعذر قراءة ملف الكلمات المترجم {path}: {e}")
+        return None
+
+if __name__ == '__main__':
+    # بناء الملف المترجم مسبقاً أثناء النشر: python -m bot.utils.filter_artifact
+    # Prebuild the compiled artifact at deploy time: python -m bot.utils.filter_artifact
+    from bot.services.badwords_service import BadWordsSnapshot
+    from config.settings import BADWORDS_FILE, BADWORDS_ARTIFACT
+    
+    snapshot = BadWordsSnapshot.load(Path(BADWORDS_FILE), Path(BADWORDS_ARTIFACT))
+    print(f"{BADWORDS_ARTIFACT}: {len(snapshot.words)} words, {len(snapshot.matcher)} patterns, "
+          f"{'loaded' if snapshot.cached else 'built'} in {snapshot.build_time * 1000:.1f} ms")
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+بصمات SimHash لاكتشاف الرسائل شبه المكررة
+SimHash fingerprints for near-duplicate message detection
+"""
+
+import hashlib
+import sys
+from typing import Dict, List, Tuple
+from bot.utils.helpers import clean_text
+
+FINGERPRINT_BITS = 64
+
+# عرض العداد لكل بت داخل المجمع (يكفي لـ 65535 مقطع)
+# Counter width per bit inside the accumulator (enough for 65535 shingles)
+_LANE_BITS = 16
+_LANE_MASK = (1 << _LANE_BITS) - 1
+_MAX_SHINGLES = _LANE_MASK
+
+# طول المقطع بالأحرف
+# Shingle length in characters
+SHINGLE_SIZE = 3
+
+def _build_spread_tables() -> List[List[int]]:
+    """
+    جداول تنشر بتات كل بايت في عدادات منفصلة داخل عدد صحيح كبير واحد
+    Tables spreading the bits of each byte into separate counters of one big int
+    
+    بدلاً من 64 عملية لكل مقطع نحتاج 8 عمليات بحث وجمع فقط.
+    Instead of 64 operations per shingle only 8 lookups and additions are needed.
+    """
+    tables = []
+    for byte_index in range(FINGERPRINT_BITS // 8):
+        table = []
+        for value in range(256):
+            spread = 0
+            for bit in range(8):
+                if value >> bit & 1:
+                    spread |= 1 << ((byte_index * 8 + bit) * _LANE_BITS)
+            table.append(spread)
+        tables.append(table)
+    return tables
+
+_SPREAD_TABLES = _build_spread_tables()
+
+# ذاكرة مؤقتة لمساهمة كل مقطع، فالمقاطع الشائعة تتكرر بين الرسائل
+# Cache of each shingle's contribution, common shingles repeat across messages
+_SHINGLE_CACHE: Dict[str, int] = {}
+_SHINGLE_CACHE_SIZE = 50000
+
+def _stable_hash(text: str) -> int:
+    # hash() المدمج يختلف بين العمليات، والبصمة يجب أن تتطابق بين العمال وعند إعادة التشغيل
+    # The builtin hash() is salted per process, fingerprints must match across workers and restarts
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=8).digest(),
+                          'little')
+
+def _spread(shingle: str) -> int:
+    spread = _SHINGLE_CACHE.get(shingle)
+    if spread is None:
+        h = _stable_hash(shingle)
+        t0, t1, t2, t3, t4, t5, t6, t7 = _SPREAD_TABLES
+        spread = (
+            t0[h & 0xFF] + t1[h >> 8 & 0xFF] + t2[h >> 16 & 0xFF] + t3[h >> 24 & 0xFF] +
+            t4[h >> 32 & 0xFF] + t5[h >> 40 & 0xFF] + t6[h >> 48 & 0xFF] + t7[h >> 56 & 0xFF]
+        )
+        if len(_SHINGLE_CACHE) >= _SHINGLE_CACHE_SIZE:
+            _SHINGLE_CACHE.clear()
+        _SHINGLE_CACHE[shingle] = spread
+    return spread
+
+def fingerprint_text(normalized_text: str) -> str:
+    """
+    تجهيز النص الموحد للبصمة: حذف الرموز والفراغات
+    Prepare normalized text for fingerprinting: drop symbols and spaces
+    """
+    return ''.join(clean_text(normalized_text).split())
+
+def fingerprint_message(normalized_text: str) -> Tuple[int, int]:
+    """
+    حساب البصمة وطول النص المستخدم فيها
+    Compute the fingerprint and the length of the text it was built from
+    
+    النص الخالي من الأحرف (رموز تعبيرية فقط مثلاً) يأخذ بصمة عادية من النص
+    الكامل حتى لا تتطابق جميع هذه الرسائل مع بعضها.
+    Text without letters (emoji only, for example) gets a plain hash of the
+    full text so such messages do not all collide with each other.
+    """
+    text = fingerprint_text(normalized_text)
+    if not text:
+        return _stable_hash(normalized_text), 0
+    return _simhash(text), len(text)
+
+def simhash(normalized_text: str) -> int:
+    """
+    حساب بصمة SimHash من 64 بت لنص موحد
+    Compute a 64-bit SimHash of normalized text
+    """
+    return fingerprint_message(normalized_text)[0]
+
+def _simhash(text: str) -> int:
+    if len(text) <= SHINGLE_SIZE:
+        shingles = [text]
+    else:
+        shingles = [text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)]
+        shingles = shingles[:_MAX_SHINGLES]
+    
+    accumulator = sum(map(_spread, shingles))
+    
+    # البت يكون 1 إذا كان مضبوطاً في أكثر من نصف المقاطع
+    # A bit is set when more than half of the shingles set it
+    total = len(shingles)
+    counts = memoryview(accumulator.to_bytes(FINGERPRINT_BITS * 2, sys.byteorder)).cast('H')
+    fingerprint = 0
+    for bit, count in enumerate(counts):
+        if count * 2 > total:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+def hamming_distance(first: int, second: int) -> int:
+    """
+    عدد البتات المختلفة بين بصمتين
+    Number of differing bits between two fingerprints
+    """
+    return (first ^ second).bit_count()
+
+def max_distance_for(similarity: float) -> int:
+    """
+    تحويل نسبة التشابه (0-1) إلى أقصى مسافة Hamming مسموحة
+    Convert a similarity ratio (0-1) to the maximum allowed Hamming distance
+    """
+    similarity = min(max(similarity, 0.0), 1.0)
+    return int(round((1.0 - similarity) * FINGERPRINT_BITS))
@@ -7,7 +7,8 @@ Bot helper functions
 """
 
 import logging
-from typing import Optional
+import unicodedata
+from typing import List, Optional, Tuple
 from datetime import datetime, timedelta
 from telegram import User, ChatMember
 from telegram.ext import ContextTypes
@@ -20,6 +21,17 @@ async def is_admin(chat_id: int, user_id: int, context: ContextTypes.DEFAULT_TYP
     فحص إذا كان المستخدم مشرفاً
     Check if user is an admin
     """
+    from bot.services.container import SERVICES_KEY
+    
+    # استخدام قائمة المشرفين المخزنة في المجموعات
+    # Use the cached administrator list in groups
+    services = context.bot_data.get(SERVICES_KEY)
+    if services is not None and services.admin_cache is not None and chat_id < 0:
+        try:
+            return await services.admin_cache.is_admin(chat_id, user_id, context.bot)
+        except Exception as e:
+            logger.warning(f"تعذر جلب قائمة المشرفين، استخدام الفحص المباشر: {e}")
+    
     try:
         chat_member = await context.bot.get_chat_member(chat_id, user_id)
         return chat_member.status in [ChatMemberStatus.ADMINISTRATOR, ChatMemberStatus.OWNER]
@@ -152,6 +164,116 @@ def is_arabic_text(text: str) -> bool:
     arabic_pattern = re.compile(r'[\u0600-\u06FF\u0750-\u077F\u08A0-\u08FF\uFB50-\uFDFF\uFE70-\uFEFF]')
     return bool(arabic_pattern.search(text))
 
+# إصدار قواعد التوحيد، يرفع عند تغيير نتيجة normalize_arabic أو جداولها لإبطال الملف المترجم للكلمات
+# Normalization rules version, bumped when normalize_arabic or its tables change their output to
+# invalidate the compiled bad words artifact
+NORMALIZE_VERSION = 2
+
+# الحركات والتطويل وأحرف التحكم غير المرئية التي تحذف عند التوحيد
+# Diacritics, tatweel and invisible control characters removed when normalizing
+_ARABIC_STRIPPED = (
+    [chr(c) for c in range(0x064B, 0x0660)] +     # التشكيل / tashkeel
+    ['\u0670'] +                                   # الألف الخنجرية / superscript alef
+    [chr(c) for c in range(0x06D6, 0x06EE)] +     # علامات قرآنية / Quranic marks
+    ['\u0640'] +                                   # التطويل / tatweel
+    [chr(c) for c in range(0x200B, 0x2010)] +     # عرض صفري واتجاه / zero-width and direction marks
+    [chr(c) for c in range(0x202A, 0x202F)] +     # تضمين الاتجاه / bidi embedding
+    [chr(c) for c in range(0x2060, 0x2065)] +     # أحرف غير مرئية / invisible operators
+    [chr(c) for c in range(0x2066, 0x206A)] +     # عزل الاتجاه / bidi isolates
+    ['\u061C', '\uFEFF', '\u00AD', '\u034F', '\u180E']
+)
+
+# الأحرف المتشابهة التي توحد إلى حرف واحد
+# Look-alike characters folded into one canonical character
+_ARABIC_FOLDS = {
+    # الألف والهمزات / alef and hamza forms
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا', 'ٲ': 'ا', 'ٳ': 'ا',
+    'ؤ': 'و', 'ئ': 'ء',
+    # التاء المربوطة والياء / ta marbuta and ya
+    'ة': 'ه', 'ى': 'ي',
+    # أحرف فارسية وأردية مشابهة / Persian and Urdu look-alikes
+    'ک': 'ك', 'ڪ': 'ك', 'ی': 'ي', 'ێ': 'ي', 'ۍ': 'ي', 'ې': 'ي',
+    'ہ': 'ه', 'ھ': 'ه', 'ۀ': 'ه', 'ە': 'ه', 'ۃ': 'ه',
+    # أحرف لاتينية بديلة من السيريلية واليونانية / Cyrillic and Greek stand-ins for Latin
+    'а': 'a', 'в': 'b', 'е': 'e', 'ё': 'e', 'к': 'k', 'м': 'm', 'н': 'h',
+    'о': 'o', 'р': 'p', 'с': 'c', 'т': 't', 'у': 'y', 'х': 'x',
+    'і': 'i', 'ј': 'j', 'ѕ': 's', 'ԁ': 'd', 'ԛ': 'q', 'ԝ': 'w',
+    'α': 'a', 'β': 'b', 'ε': 'e', 'ι': 'i', 'κ': 'k', 'ν': 'v',
+    'η': 'n', 'ο': 'o', 'ρ': 'p', 'τ': 't', 'υ': 'u', 'χ': 'x',
+}
+
+# الأرقام العربية الهندية والفارسية إلى أرقام لاتينية
+# Arabic-Indic and Persian digits folded to Latin digits
+for _digit in range(10):
+    _ARABIC_FOLDS[chr(0x0660 + _digit)] = str(_digit)
+    _ARABIC_FOLDS[chr(0x06F0 + _digit)] = str(_digit)
+
+_FOLD_TABLE = str.maketrans({
+    **_ARABIC_FOLDS,
+    **{ch: None for ch in _ARABIC_STRIPPED}
+})
+
+# أقصى عدد أحرف محفوظة في جدول التوحيد
+# Maximum number of characters kept in the normalization table
+_NORMALIZE_CACHE_SIZE = 65536
+
+class _NormalizeTable(dict):
+    """
+    جدول توحيد لكل حرف يحسب عند أول ظهور للحرف ثم يحفظ
+    Per-character normalization table computed on a character's first appearance, then kept
+    
+    القاعدة واحدة لكل حرف: NFKC لغير ASCII ثم الأحرف الصغيرة ثم التوحيد والحذف، فتتطابق
+    normalize_arabic و normalize_arabic_with_offsets ولا تعتمد نتيجة الحرف على باقي الرسالة.
+    One rule for every character: NFKC for non-ASCII, then lowercase, then folding and
+    stripping, so normalize_arabic and normalize_arabic_with_offsets agree and a character's
+    result never depends on the rest of the message.
+    """
+    
+    def __missing__(self, code: int) -> str:
+        ch = chr(code)
+        if not ch.isascii():
+            ch = unicodedata.normalize('NFKC', ch)
+        out = ch.lower().translate(_FOLD_TABLE)
+        if len(self) < _NORMALIZE_CACHE_SIZE:
+            self[code] = out
+        return out
+
+_NORMALIZE_TABLE = _NormalizeTable()
+
+def normalize_arabic(text: str) -> str:
+    """
+    توحيد النص قبل الفلترة: الهمزات والتاء المربوطة والياء والحركات
+    والتطويل والأحرف غير المرئية والأرقام والأحرف المتشابهة
+    Normalize text before filtering: hamza, ta marbuta, ya, diacritics,
+    tatweel, invisible characters, digits and look-alike characters
+    """
+    if not text:
+        return text
+    
+    return text.translate(_NORMALIZE_TABLE)
+
+def normalize_arabic_with_offsets(text: str) -> Tuple[str, List[int]]:
+    """
+    توحيد النص مع إرجاع موقع كل حرف ناتج في النص الأصلي
+    Normalize text and return the original offset of every output character
+    
+    القائمة تحمل عنصراً إضافياً أخيراً يساوي طول النص الأصلي، فيكون offsets[end]
+    بداية ما بعد المقطع بما في ذلك الحركات المحذوفة التي تلي آخر حرف فيه.
+    The list carries one extra final entry equal to the original length, so
+    offsets[end] is where a span ends including the stripped marks after its
+    last character.
+    """
+    parts: List[str] = []
+    offsets: List[int] = []
+    
+    for index, ch in enumerate(text):
+        for out in _NORMALIZE_TABLE[ord(ch)]:
+            parts.append(out)
+            offsets.append(index)
+    offsets.append(len(text))
+    
+    return ''.join(parts), offsets
+
 def get_file_size_mb(file_size_bytes: int) -> float:
     """
     تحويل حجم الملف من بايت إلى ميجابايت
@@ -6,16 +6,141 @@
 Bot logging system
 """
 
+import atexit
+import json
 import logging
+import queue
 import sys
-from logging.handlers import RotatingFileHandler
-from config.settings import LOG_LEVEL, LOG_FILE, DEBUG
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Dict, Optional, Tuple
+from config.settings import (
+    LOG_LEVEL, LOG_FILE, DEBUG, LOG_FORMAT, LOG_QUEUE_SIZE, LOG_FILE_MAX_BYTES,
+    LOG_FILE_BACKUPS, LOG_SAMPLING
+)
 
-def setup_logging():
+# الحقول المنظمة التي تنقل من extra إلى سجل JSON
+# Structured fields copied from extra into the JSON record
+STRUCTURED_FIELDS = ('chat_id', 'user_id', 'action', 'violation', 'duration', 'count', 'sampled')
+
+class JsonFormatter(logging.Formatter):
+    """
+    تنسيق كل سجل كسطر JSON واحد
+    Format every record as a single JSON line
+    """
+    
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created))
+                  + f".{int(record.msecs):03d}Z",
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for field in STRUCTURED_FIELDS:
+            value = record.__dict__.get(field)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class SamplingFilter(logging.Filter):
+    """
+    تمرير سجل واحد من كل N سجلات DEBUG و INFO المعلمة بـ extra={'sample': True}
+    Pass one in every N DEBUG and INFO records marked with extra={'sample': True}
+    
+    العد لكل حدث (المسجل ونص الرسالة)، والسجلات غير المعلمة مثل سجلات الإجراءات وكذلك
+    التحذيرات والأخطاء تمر دائماً. السجل الممرر يحمل عدد السجلات التي يمثلها في sampled.
+    Counting is per event (logger and message template), and unmarked records such as
+    action records, as well as warnings and errors, always pass. A passed record carries
+    the number of records it stands for in sampled.
+    """
+    
+    def __init__(self, rates: Dict[str, int]):
+        super().__init__()
+        self.rates = rates
+        self._counts: Dict[Tuple[str, Any], int] = {}
+    
+    def _rate(self, name: str) -> int:
+        # أطول بادئة مطابقة لاسم المسجل
+        # Longest configured prefix of the logger name
+        while name:
+            rate = self.rates.get(name)
+            if rate is not None:
+                return rate
+            name = name.rpartition('.')[0]
+        return 1
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO or not getattr(record, 'sample', False):
+            return True
+        
+        rate = self._rate(record.name)
+        if rate <= 1:
+            return True
+        
+        key = (record.name, record.msg)
+        count = self._counts.get(key, 0)
+        self._counts[key] = count + 1
+        if count % rate:
+            return False
+        
+        record.sampled = rate
+        return True
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    وضع السجلات في الطابور دون تنسيق، وإسقاطها إذا امتلأ الطابور
+    Enqueue records unformatted, dropping them if the queue is full
+    
+    التنسيق والكتابة يحدثان في خيط المستمع بدلاً من حلقة الأحداث.
+    Formatting and writing happen on the listener thread instead of the event loop.
+    """
+    
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # الطابور داخل نفس العملية فلا حاجة لتحويل السجل إلى نص قبل وضعه
+        # The queue is in-process so the record need not be rendered before enqueueing
+        return record
+    
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+_listener: Optional[QueueListener] = None
+
+def stop_logging():
+    """
+    إيقاف خيط المستمع بعد تفريغ السجلات المتبقية
+    Stop the listener thread after flushing the remaining records
+    """
+    global _listener
+    
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+def setup_logging(log_file: str = LOG_FILE) -> QueueListener:
     """
     إعداد نظام التسجيل
     Setup logging system
+    
+    العمليات العاملة تمرر ملفاً خاصاً بها لأن تدوير ملف واحد من عدة عمليات غير آمن.
+    Worker processes pass a file of their own since rotating one file from
+    several processes is unsafe.
+    
+    المعالجات الفعلية تعمل في خيط QueueListener، والمسجل الرئيسي يحمل QueueHandler فقط.
+    The real handlers run on a QueueListener thread, and the root logger only
+    carries a QueueHandler.
     """
+    global _listener
     
     # إنشاء مُسجل رئيسي
     # Create main logger
@@ -24,30 +149,51 @@ def setup_logging():
     
     # تنسيق الرسائل
     # Message formatting
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
+    if LOG_FORMAT == "json":
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(
+            '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+            datefmt='%Y-%m-%d %H:%M:%S'
+        )
     
     # معالج وحدة التحكم
     # Console handler
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(logging.INFO)
     console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
+    handlers = [console_handler]
     
     # معالج الملف (إذا لم يكن في وضع التطوير)
     # File handler (if not in development mode)
     if not DEBUG:
         file_handler = RotatingFileHandler(
-            LOG_FILE,
-            maxBytes=10 * 1024 * 1024,  # 10 MB
-            backupCount=5,
+            log_file,
+            maxBytes=LOG_FILE_MAX_BYTES,
+            backupCount=LOG_FILE_BACKUPS,
             encoding='utf-8'
         )
         file_handler.setLevel(logging.DEBUG)
         file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+        handlers.append(file_handler)
+    
+    # إيقاف المستمع السابق عند إعادة الإعداد
+    # Stop the previous listener when set up again
+    stop_logging()
+    for handler in logger.handlers[:]:
+        logger.removeHandler(handler)
+    
+    log_queue: queue.Queue = queue.Queue(LOG_QUEUE_SIZE)
+    queue_handler = DroppingQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(LOG_SAMPLING))
+    logger.addHandler(queue_handler)
+    
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    # تفريغ السجلات المتبقية عند الخروج
+    # Flush the remaining records on exit
+    atexit.unregister(stop_logging)
+    atexit.register(stop_logging)
     
     # إعداد مُسجل telegram
     # Setup telegram logger
@@ -60,3 +206,4 @@ def setup_logging():
     httpx_logger.setLevel(logging.WARNING)
     
     logger.info("تم إعداد نظام التسجيل بنجاح")
+    return _listener
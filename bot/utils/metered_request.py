@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+طلبات HTTP لواجهة تيليجرام مع قياس كل استدعاء
+Telegram Bot API HTTP requests with per-call metrics
+"""
+
+import time
+from typing import Tuple
+from telegram.request import HTTPXRequest
+from bot.utils.metrics import API_CALLS, API_ERRORS, API_SECONDS
+
+class MeteredRequest(HTTPXRequest):
+    """
+    HTTPXRequest يسجل العدد والزمن والأخطاء لكل طريقة في الواجهة
+    HTTPXRequest recording the count, latency and errors of every API method
+    """
+    
+    async def do_request(self, url: str, method: str, *args, **kwargs) -> Tuple[int, bytes]:
+        # اسم الطريقة هو آخر جزء من الرابط، مثل sendMessage
+        # The API method is the last part of the URL, e.g. sendMessage
+        api_method = url.rpartition('/')[2]
+        API_CALLS.labels(api_method).inc()
+        
+        started = time.perf_counter()
+        try:
+            status, payload = await super().do_request(url, method, *args, **kwargs)
+        except Exception:
+            API_ERRORS.labels(api_method).inc()
+            raise
+        finally:
+            API_SECONDS.labels(api_method).observe(time.perf_counter() - started)
+        
+        if status >= 400:
+            API_ERRORS.labels(api_method).inc()
+        return status, payload
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+مقاييس الأداء بصيغة Prometheus النصية
+Performance metrics in the Prometheus text format
+"""
+
+import asyncio
+import functools
+import logging
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# حدود فئات زمن الاستجابة بالثواني
+# Latency bucket bounds in seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+def _format_labels(names: Sequence[str], values: Sequence, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Registry:
+    """
+    قائمة المقاييس المسجلة وتحويلها إلى نص
+    The registered metrics and their text rendering
+    """
+    
+    def __init__(self):
+        self._metrics: Dict[str, "_Metric"] = {}
+    
+    def register(self, metric: "_Metric"):
+        if metric.name in self._metrics:
+            raise ValueError(f"Duplicate metric: {metric.name}")
+        self._metrics[metric.name] = metric
+    
+    def get(self, name: str) -> Optional["_Metric"]:
+        return self._metrics.get(name)
+    
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            metric.render(lines)
+        lines.append("")
+        return "\n".join(lines)
+
+# السجل الافتراضي لجميع مقاييس البوت
+# Default registry for every bot metric
+REGISTRY = Registry()
+
+class _Metric:
+    kind = ""
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 registry: Optional[Registry] = REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple, object] = {}
+        # المقياس بدون تسميات هو فرعه الوحيد
+        # A metric without labels is its own only child
+        self._default = None if self.labelnames else self.labels()
+        if registry is not None:
+            registry.register(self)
+    
+    def _new_child(self):
+        raise NotImplementedError
+    
+    def labels(self, *values):
+        """
+        الحصول على السلسلة الخاصة بقيم التسميات، وتنشأ عند أول استخدام
+        Get the series for the label values, created on first use
+        """
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            child = self._children[values] = self._new_child()
+        return child
+    
+    def render(self, lines: List[str]):
+        raise NotImplementedError
+
+class _CounterChild:
+    __slots__ = ('value',)
+    
+    def __init__(self):
+        self.value = 0
+    
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+class Counter(_Metric):
+    """
+    عداد يزداد فقط
+    A counter that only goes up
+    """
+    
+    kind = "counter"
+    
+    def _new_child(self):
+        return _CounterChild()
+    
+    def inc(self, amount: float = 1):
+        self._default.value += amount
+    
+    def render(self, lines: List[str]):
+        for values, child in self._children.items():
+            lines.append(f"{self.name}_total{_format_labels(self.labelnames, values)} "
+                         f"{_format_value(child.value)}")
+
+class _GaugeChild:
+    __slots__ = ('value', 'function')
+    
+    def __init__(self):
+        self.value = 0
+        self.function: Optional[Callable[[], float]] = None
+    
+    def set(self, value: float):
+        self.value = value
+    
+    def set_function(self, function: Callable[[], float]):
+        """
+        حساب القيمة عند القراءة فقط، فلا كلفة على المسار الساخن
+        Compute the value at scrape time only, costing nothing on the hot path
+        """
+        self.function = function
+    
+    def read(self) -> Optional[float]:
+        if self.function is None:
+            return self.value
+        try:
+            return self.function()
+        except Exception as e:
+            logger.error(f"خطأ في قراءة مقياس: {e}")
+            return None
+
+class Gauge(_Metric):
+    """
+    قيمة لحظية يمكن أن تزيد وتنقص
+    A point-in-time value that can go up and down
+    """
+    
+    kind = "gauge"
+    
+    def _new_child(self):
+        return _GaugeChild()
+    
+    def set(self, value: float):
+        self._default.set(value)
+    
+    def set_function(self, function: Callable[[], float]):
+        self._default.set_function(function)
+    
+    def render(self, lines: List[str]):
+        for values, child in self._children.items():
+            value = child.read()
+            if value is not None:
+                lines.append(f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(value)}")
+
+class _HistogramChild:
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+    
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        # فئة إضافية أخيرة للقيم الأكبر من كل الحدود
+        # One extra last bucket for values above every bound
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+    
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class Histogram(_Metric):
+    """
+    توزيع القيم على فئات ثابتة
+    Distribution of values over fixed buckets
+    """
+    
+    kind = "histogram"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS, registry: Optional[Registry] = REGISTRY):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+    
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+    
+    def observe(self, value: float):
+        self._default.observe(value)
+    
+    def render(self, lines: List[str]):
+        for values, child in self._children.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), child.counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, values, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+            lines.append(f"{self.name}_count{labels} {child.count}")
+
+def timed(histogram: _HistogramChild):
+    """
+    مزخرف يسجل مدة تنفيذ دالة غير متزامنة في المدرج
+    Decorator recording an async function's duration in the histogram
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+# زمن معالجات التحديثات
+# Update handler latency
+HANDLER_SECONDS = Histogram("bot_handler_seconds", "Update handler latency in seconds", ["handler"])
+
+# استدعاءات قاعدة البيانات
+# Database calls
+DB_SECONDS = Histogram("bot_db_seconds", "Database call latency in seconds, including queueing", ["operation"])
+DB_ROWS_WRITTEN = Counter("bot_db_rows_written", "Rows written to the database", ["operation"])
+
+# استدعاءات واجهة تيليجرام
+# Telegram Bot API calls
+API_CALLS = Counter("bot_api_calls", "Telegram Bot API calls", ["method"])
+API_ERRORS = Counter("bot_api_errors", "Telegram Bot API calls that failed or returned an error status", ["method"])
+API_SECONDS = Histogram("bot_api_seconds", "Telegram Bot API call latency in seconds", ["method"])
+
+# طلبات Webhook حسب رمز الاستجابة
+# Webhook requests by response status
+WEBHOOK_REQUESTS = Counter("bot_webhook_requests", "Webhook requests by response status", ["status"])
+
+# نتائج الفحص
+# Scan results
+MESSAGES_SCANNED = Counter("bot_messages_scanned", "Text messages scanned by the moderation handler")
+BADWORD_HITS = Counter("bot_badword_hits", "Messages that matched the bad words filter")
+SPAM_HITS = Counter("bot_spam_hits", "Messages detected as spam")
+
+# قيم لحظية تحسب عند القراءة
+# Point-in-time values computed at scrape time
+PENDING_VERIFICATIONS = Gauge("bot_pending_verifications", "Members waiting for verification")
+CACHE_ENTRIES = Gauge("bot_cache_entries", "Entries held by in-memory caches", ["cache"])
+QUEUE_DEPTH = Gauge("bot_queue_depth", "Items waiting in internal queues", ["queue"])
+
+class MetricsServer:
+    """
+    خادم HTTP محلي صغير يعرض المقاييس على /metrics
+    Small local HTTP server exposing the metrics on /metrics
+    """
+    
+    def __init__(self, host: str, port: int, registry: Registry = REGISTRY):
+        self.host = host
+        self.port = port
+        self.registry = registry
+        self._server: Optional[asyncio.AbstractServer] = None
+    
+    async def start(self):
+        """
+        بدء الاستماع
+        Start listening
+        """
+        if self._server is None:
+            self._server = await asyncio.start_server(self._handle, self.host, self.port)
+            logger.info(f"تم تشغيل خادم المقاييس على {self.host}:{self.port}")
+    
+    async def stop(self):
+        """
+        إيقاف الخادم
+        Stop the server
+        """
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+    
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request = await asyncio.wait_for(reader.readline(), timeout=5)
+            # تجاهل الترويسات حتى السطر الفارغ
+            # Skip the headers up to the blank line
+            while True:
+                line = await asyncio.wait_for(reader.readline(), timeout=5)
+                if line in (b"", b"\r\n", b"\n"):
+                    break
+            
+            parts = request.decode('latin-1').split()
+            path = parts[1].split('?', 1)[0] if len(parts) > 1 else ""
+            if parts and parts[0] == "GET" and path == "/metrics":
+                status = "200 OK"
+                body = self.registry.render().encode('utf-8')
+                content_type = "text/plain; version=0.0.4; charset=utf-8"
+            else:
+                status = "404 Not Found"
+                body = b"Not Found\n"
+                content_type = "text/plain; charset=utf-8"
+            
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode('latin-1') + body
+            )
+            await writer.drain()
+        
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        except Exception as e:
+            logger.error(f"خطأ في خادم المقاييس: {e}")
+        finally:
+            writer.close()
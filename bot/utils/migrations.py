@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+ترحيلات مخطط قاعدة البيانات
+Database schema migrations
+"""
+
+import logging
+import sqlite3
+from typing import List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# الترحيلات المرتبة: (الإصدار، الوصف، العبارات)
+# Ordered migrations: (version, description, statements)
+# لا تعدل ترحيلاً تم نشره، أضف ترحيلاً جديداً بدلاً من ذلك
+# Never edit a released migration, append a new one instead
+MIGRATIONS: List[Tuple[int, str, List[str]]] = [
+    (1, "initial schema", [
+        # جدول المستخدمين
+        # Users table
+        '''
+            CREATE TABLE IF NOT EXISTS users (
+                id INTEGER PRIMARY KEY,
+                user_id INTEGER NOT NULL,
+                chat_id INTEGER NOT NULL,
+                username TEXT,
+                first_name TEXT,
+                last_name TEXT,
+                joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                is_verified BOOLEAN DEFAULT FALSE,
+                is_banned BOOLEAN DEFAULT FALSE,
+                UNIQUE(user_id, chat_id)
+            )
+        ''',
+        # جدول التحقق
+        # Verification table
+        '''
+            CREATE TABLE IF NOT EXISTS verifications (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                chat_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                challenge_data TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                completed_at TIMESTAMP,
+                success BOOLEAN DEFAULT FALSE
+            )
+        ''',
+        # جدول الإشراف
+        # Moderation table
+        '''
+            CREATE TABLE IF NOT EXISTS moderation_actions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                chat_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                admin_id INTEGER NOT NULL,
+                action_type TEXT NOT NULL,
+                reason TEXT,
+                duration INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''',
+        # جدول التحذيرات
+        # Warnings table
+        '''
+            CREATE TABLE IF NOT EXISTS warnings (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                chat_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                reason TEXT,
+                count INTEGER DEFAULT 1,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''',
+        # جدول المخالفات
+        # Violations table
+        '''
+            CREATE TABLE IF NOT EXISTS violations (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                chat_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                violation_type TEXT NOT NULL,
+                content TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''',
+        # جدول الرسائل
+        # Messages table
+        '''
+            CREATE TABLE IF NOT EXISTS messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                chat_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                message_text TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''',
+        # جدول الكتم
+        # Mutes table
+        '''
+            CREATE TABLE IF NOT EXISTS mutes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                chat_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                duration INTEGER NOT NULL,
+                reason TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                expires_at TIMESTAMP,
+                is_active BOOLEAN DEFAULT TRUE
+            )
+        '''
+    ]),
+    (2, "chat/user and chat/time indexes", [
+        # جدول users لديه فهرس UNIQUE(user_id, chat_id) يغطي البحث بالمستخدم والمجموعة
+        # users already has UNIQUE(user_id, chat_id) covering user/chat lookups
+        "CREATE INDEX IF NOT EXISTS idx_verifications_chat_user ON verifications (chat_id, user_id)",
+        "CREATE INDEX IF NOT EXISTS idx_verifications_chat_created ON verifications (chat_id, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_moderation_actions_chat_user ON moderation_actions (chat_id, user_id)",
+        "CREATE INDEX IF NOT EXISTS idx_moderation_actions_chat_created ON moderation_actions (chat_id, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_warnings_chat_user ON warnings (chat_id, user_id)",
+        "CREATE INDEX IF NOT EXISTS idx_violations_chat_user ON violations (chat_id, user_id)",
+        "CREATE INDEX IF NOT EXISTS idx_violations_chat_created ON violations (chat_id, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_messages_chat_user ON messages (chat_id, user_id)",
+        "CREATE INDEX IF NOT EXISTS idx_messages_chat_created ON messages (chat_id, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_mutes_chat_user ON mutes (chat_id, user_id)"
+    ]),
+    (3, "persistent pending verification state", [
+        "ALTER TABLE verifications ADD COLUMN attempts INTEGER DEFAULT 0",
+        "ALTER TABLE verifications ADD COLUMN deadline INTEGER",
+        "ALTER TABLE verifications ADD COLUMN message_id INTEGER",
+        # التحديات المعلقة القديمة ليس لها مهلة محفوظة ولا يمكن استعادتها
+        # Older pending challenges have no stored deadline and cannot be restored
+        "UPDATE verifications SET completed_at = CURRENT_TIMESTAMP WHERE completed_at IS NULL",
+        # فهرس جزئي للتحديات المعلقة فقط لاستعادتها عند التشغيل دون مسح الجدول
+        # Partial index over pending challenges only, restored at startup without a table scan
+        "CREATE INDEX IF NOT EXISTS idx_verifications_pending ON verifications (deadline) WHERE completed_at IS NULL"
+    ]),
+    (4, "timer wheel deadlines", [
+        '''
+            CREATE TABLE IF NOT EXISTS timers (
+                key TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                deadline REAL NOT NULL,
+                data TEXT
+            ) WITHOUT ROWID
+        '''
+    ]),
+    (5, "per-chat bad word overlays", [
+        # إضافات واستثناءات كل مجموعة فوق القائمة المشتركة (kind = 'add' أو 'allow')
+        # Per-chat additions and exemptions over the shared list (kind = 'add' or 'allow')
+        '''
+            CREATE TABLE IF NOT EXISTS chat_badwords (
+                chat_id INTEGER NOT NULL,
+                word TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (chat_id, word)
+            ) WITHOUT ROWID
+        ''',
+        # الإجراء عند اكتشاف كلمة محظورة في المجموعة
+        # Action taken when a bad word is found in the chat
+        '''
+            CREATE TABLE IF NOT EXISTS chat_badword_policies (
+                chat_id INTEGER PRIMARY KEY,
+                action TEXT NOT NULL
+            )
+        '''
+    ]),
+    (6, "per-chat settings", [
+        # القيمة NULL تعني استخدام القيمة الافتراضية من config/settings.py
+        # NULL means the default from config/settings.py
+        '''
+            CREATE TABLE IF NOT EXISTS chat_settings (
+                chat_id INTEGER PRIMARY KEY,
+                verification BOOLEAN,
+                badwords BOOLEAN,
+                spam BOOLEAN,
+                antiraid BOOLEAN,
+                spam_threshold INTEGER,
+                warn_limit INTEGER,
+                mute_duration INTEGER,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        '''
+    ])
+]
+
+def get_schema_version(connection: sqlite3.Connection) -> int:
+    """
+    الحصول على إصدار المخطط الحالي
+    Get the current schema version
+    """
+    connection.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    row = connection.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+def apply_migrations(connection: sqlite3.Connection) -> int:
+    """
+    تطبيق الترحيلات غير المطبقة بالترتيب، كل ترحيل في معاملة مستقلة
+    Apply pending migrations in order, each one in its own transaction
+    
+    قواعد البيانات الموجودة مسبقاً بدون جدول الإصدار تتم ترقيتها في مكانها
+    لأن الترحيل الأول يستخدم IF NOT EXISTS.
+    Existing databases without a version table are upgraded in place because
+    the first migration uses IF NOT EXISTS.
+    """
+    current = get_schema_version(connection)
+    connection.commit()
+    
+    for version, description, statements in MIGRATIONS:
+        if version <= current:
+            continue
+        
+        connection.execute("BEGIN")
+        try:
+            for sql in statements:
+                connection.execute(sql)
+            connection.execute(
+                "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                (version, description)
+            )
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        
+        current = version
+        logger.info(f"تم تطبيق ترحيل قاعدة البيانات {version}: {description}")
+    
+    return current
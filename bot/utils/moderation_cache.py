@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+ذاكرة تخزين مؤقت للكتم والتحذيرات النشطة
+Active mutes and warning counts cache
+"""
+
+import logging
+import time
+from collections import OrderedDict
+from typing import Tuple
+from config.settings import MODERATION_CACHE_MAX_ENTRIES
+
+logger = logging.getLogger(__name__)
+
+class ModerationCache:
+    """
+    حالة الكتم وعدد التحذيرات لكل مستخدم، تحمل من جدولي mutes و warnings عند أول طلب
+    Per-user mute state and warning count, loaded from the mutes and warnings tables on first use
+    
+    كل تغيير يكتب في الذاكرة وقاعدة البيانات معاً، ويخزن غياب الكتم أيضاً حتى
+    لا تسبب رسائل الوسائط من المستخدمين غير المكتومين أي استعلام. الكتم ينتهي
+    حسب expires_at دون الحاجة لحذفه، والمدخلات الأقدم استخداماً تحذف عند امتلاء الذاكرة.
+    Every change is written to memory and the database together, and the absence
+    of a mute is cached too so media from unmuted users never queries. Mutes lapse
+    by expires_at without being removed, and the least recently used entries are
+    evicted when the cache is full.
+    """
+    
+    def __init__(self, db, max_entries: int = MODERATION_CACHE_MAX_ENTRIES):
+        self.db = db
+        self.max_entries = max_entries
+        # وقت انتهاء الكتم لكل مستخدم، والقيمة 0 تعني غير مكتوم
+        # Mute expiry per user, 0 meaning not muted
+        self._mutes: "OrderedDict[Tuple[int, int], float]" = OrderedDict()
+        self._warnings: "OrderedDict[Tuple[int, int], int]" = OrderedDict()
+        
+        self.hits = 0
+        self.misses = 0
+    
+    def __len__(self) -> int:
+        return len(self._mutes) + len(self._warnings)
+    
+    def _store(self, entries: OrderedDict, key: Tuple[int, int], value):
+        entries[key] = value
+        entries.move_to_end(key)
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+    
+    def _lookup(self, entries: OrderedDict, key: Tuple[int, int]):
+        value = entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        
+        self.hits += 1
+        entries.move_to_end(key)
+        return value
+    
+    async def mute_expiry(self, chat_id: int, user_id: int) -> float:
+        """
+        وقت انتهاء الكتم النشط للمستخدم أو 0 إذا لم يكن مكتوماً
+        Expiry of the user's active mute, or 0 if not muted
+        """
+        key = (chat_id, user_id)
+        expires_at = self._lookup(self._mutes, key)
+        if expires_at is None:
+            loaded = await self.db.get_active_mute(chat_id, user_id)
+            # كتم جديد أثناء التحميل له الأولوية على نتيجة الاستعلام
+            # A mute set while loading takes precedence over the query result
+            expires_at = self._mutes.get(key)
+            if expires_at is None:
+                expires_at = loaded or 0.0
+                self._store(self._mutes, key, expires_at)
+        
+        return expires_at
+    
+    async def is_muted(self, chat_id: int, user_id: int) -> bool:
+        """
+        فحص إذا كان المستخدم مكتوماً الآن
+        Check whether the user is muted right now
+        """
+        return await self.mute_expiry(chat_id, user_id) > time.time()
+    
+    async def set_mute(self, chat_id: int, user_id: int, duration: int, reason: str) -> float:
+        """
+        تسجيل كتم في الذاكرة وقاعدة البيانات وإرجاع وقت انتهائه
+        Record a mute in memory and in the database and return its expiry
+        """
+        expires_at = time.time() + duration
+        self._store(self._mutes, (chat_id, user_id), expires_at)
+        await self.db.save_mute(chat_id=chat_id, user_id=user_id, duration=duration, reason=reason)
+        return expires_at
+    
+    async def clear_mute(self, chat_id: int, user_id: int):
+        """
+        إزالة الكتم من الذاكرة وقاعدة البيانات
+        Remove a mute from memory and the database
+        """
+        self._store(self._mutes, (chat_id, user_id), 0.0)
+        await self.db.remove_mute(chat_id=chat_id, user_id=user_id)
+    
+    async def warnings(self, chat_id: int, user_id: int) -> int:
+        """
+        عدد تحذيرات المستخدم
+        The user's warning count
+        """
+        key = (chat_id, user_id)
+        count = self._lookup(self._warnings, key)
+        if count is None:
+            loaded = await self.db.get_warning_count(chat_id, user_id)
+            count = self._warnings.get(key)
+            if count is None:
+                # عدم تخزين النتيجة إذا فشل الاستعلام
+                # Don't cache the result if the query failed
+                if loaded is None:
+                    return 0
+                count = loaded
+                self._store(self._warnings, key, count)
+        
+        return count
+    
+    async def add_warning(self, chat_id: int, user_id: int, reason: str) -> int:
+        """
+        إضافة تحذير وإرجاع العدد الجديد
+        Add a warning and return the new count
+        """
+        key = (chat_id, user_id)
+        # القراءة من الذاكرة بعد التحميل حتى لا يضيع تحذير متزامن
+        # Read from memory after loading so a concurrent warning is not lost
+        loaded = await self.warnings(chat_id, user_id)
+        count = self._warnings.get(key, loaded) + 1
+        self._store(self._warnings, key, count)
+        await self.db.save_warning(chat_id=chat_id, user_id=user_id, reason=reason, count=count)
+        return count
+    
+    async def clear_warnings(self, chat_id: int, user_id: int):
+        """
+        مسح تحذيرات المستخدم من الذاكرة وقاعدة البيانات
+        Clear the user's warnings from memory and the database
+        """
+        self._store(self._warnings, (chat_id, user_id), 0)
+        await self.db.clear_warnings(chat_id=chat_id, user_id=user_id)
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+كاشف الغارات المنسقة على المجموعات
+Coordinated raid detector for group chats
+"""
+
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Deque, List, Optional, Tuple
+from bot.utils.fingerprint import hamming_distance, max_distance_for
+from config.settings import (
+    RAID_JOIN_THRESHOLD, RAID_JOIN_WINDOW, RAID_NEW_MEMBER_WINDOW,
+    RAID_FANOUT_THRESHOLD, RAID_FANOUT_WINDOW, RAID_FANOUT_HISTORY,
+    RAID_MAX_MEMBERS_PER_CHAT, RAID_MAX_CHATS, SPAM_SIMILARITY_THRESHOLD,
+    SPAM_FINGERPRINT_MIN_LENGTH
+)
+
+class _ChatWindow:
+    """
+    حالة مجموعة واحدة: أوقات الانضمام والأعضاء الجدد وبصماتهم الأخيرة
+    State of one chat: join times, new members and their latest fingerprints
+    """
+    
+    __slots__ = ('joins', 'members', 'fingerprints', 'locked_until')
+    
+    def __init__(self, join_threshold: int, fanout_history: int):
+        # يكفي الاحتفاظ بآخر N انضمام لمعرفة إذا حدثت N انضمامات خلال النافذة
+        # Keeping the last N joins is enough to tell whether N joins fit in the window
+        self.joins: Deque[float] = deque(maxlen=join_threshold)
+        self.members: "OrderedDict[int, float]" = OrderedDict()
+        self.fingerprints: Deque[Tuple[float, int, int]] = deque(maxlen=fanout_history)
+        self.locked_until = 0.0
+
+class RaidDetector:
+    """
+    نوافذ منزلقة لكل مجموعة لمعدل الانضمام وانتشار نفس الرسالة بين الحسابات الجديدة
+    Per-chat sliding windows over join rate and fan-out of one message across new accounts
+    
+    الحالة محدودة لكل مجموعة وعدد المجموعات محدود، ولا تتطلب أي عملية أكثر
+    من المرور على نافذة البصمات الصغيرة.
+    State is bounded per chat and in the number of chats, and no operation does
+    more than one pass over the small fingerprint window.
+    """
+    
+    def __init__(self, join_threshold: int = RAID_JOIN_THRESHOLD,
+                 join_window: float = RAID_JOIN_WINDOW,
+                 new_member_window: float = RAID_NEW_MEMBER_WINDOW,
+                 fanout_threshold: int = RAID_FANOUT_THRESHOLD,
+                 fanout_window: float = RAID_FANOUT_WINDOW,
+                 fanout_history: int = RAID_FANOUT_HISTORY,
+                 similarity: float = SPAM_SIMILARITY_THRESHOLD,
+                 min_length: int = SPAM_FINGERPRINT_MIN_LENGTH,
+                 max_members: int = RAID_MAX_MEMBERS_PER_CHAT,
+                 max_chats: int = RAID_MAX_CHATS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.join_threshold = join_threshold
+        self.join_window = join_window
+        self.new_member_window = new_member_window
+        self.fanout_threshold = fanout_threshold
+        self.fanout_window = fanout_window
+        self.fanout_history = fanout_history
+        self.max_distance = max_distance_for(similarity)
+        self.min_length = min_length
+        self.max_members = max_members
+        self.max_chats = max_chats
+        # مصدر الوقت عند عدم تمرير now، وإعادة التشغيل تستبدله بوقت التسجيل
+        # Time source when now is not given, replays swap it for the recorded time
+        self.clock = clock
+        self._chats: "OrderedDict[int, _ChatWindow]" = OrderedDict()
+    
+    def __len__(self) -> int:
+        return len(self._chats)
+    
+    def _window(self, chat_id: int) -> _ChatWindow:
+        window = self._chats.get(chat_id)
+        if window is None:
+            window = _ChatWindow(self.join_threshold, self.fanout_history)
+            self._chats[chat_id] = window
+            while len(self._chats) > self.max_chats:
+                self._chats.popitem(last=False)
+        else:
+            self._chats.move_to_end(chat_id)
+        return window
+    
+    def _prune_members(self, window: _ChatWindow, now: float):
+        members = window.members
+        cutoff = now - self.new_member_window
+        while members:
+            joined_at = next(iter(members.values()))
+            if joined_at > cutoff and len(members) <= self.max_members:
+                break
+            members.popitem(last=False)
+    
+    def record_join(self, chat_id: int, user_id: int, now: Optional[float] = None) -> bool:
+        """
+        تسجيل انضمام وإرجاع True إذا تجاوز معدل الانضمام الحد
+        Record a join and return True if the join rate crossed the threshold
+        """
+        if now is None:
+            now = self.clock()
+        
+        window = self._window(chat_id)
+        window.joins.append(now)
+        window.members[user_id] = now
+        window.members.move_to_end(user_id)
+        self._prune_members(window, now)
+        
+        if self.is_locked(chat_id, now):
+            return False
+        
+        joins = window.joins
+        return len(joins) >= self.join_threshold and joins[0] > now - self.join_window
+    
+    def is_new_member(self, chat_id: int, user_id: int, now: Optional[float] = None) -> bool:
+        """
+        فحص إذا انضم المستخدم مؤخراً
+        Check whether the user joined recently
+        """
+        window = self._chats.get(chat_id)
+        if window is None:
+            return False
+        
+        joined_at = window.members.get(user_id)
+        if joined_at is None:
+            return False
+        
+        if now is None:
+            now = self.clock()
+        return joined_at > now - self.new_member_window
+    
+    def record_message(self, chat_id: int, user_id: int, fingerprint: int, length: int = 0,
+                       now: Optional[float] = None) -> bool:
+        """
+        تسجيل رسالة عضو جديد وإرجاع True إذا أرسلت حسابات جديدة كثيرة نفس الرسالة
+        Record a new member's message and return True if many new accounts sent it
+        
+        رسائل الأعضاء القدامى والرسائل القصيرة لا تسجل.
+        Messages from established members and short messages are not recorded.
+        """
+        if now is None:
+            now = self.clock()
+        
+        if length < self.min_length or not self.is_new_member(chat_id, user_id, now):
+            return False
+        
+        window = self._window(chat_id)
+        history = window.fingerprints
+        cutoff = now - self.fanout_window
+        while history and history[0][0] <= cutoff:
+            history.popleft()
+        
+        senders = {
+            sender for _, recent, sender in history
+            if sender != user_id and hamming_distance(recent, fingerprint) <= self.max_distance
+        }
+        history.append((now, fingerprint, user_id))
+        
+        if self.is_locked(chat_id, now):
+            return False
+        return len(senders) + 1 >= self.fanout_threshold
+    
+    def recent_members(self, chat_id: int, now: Optional[float] = None) -> List[int]:
+        """
+        معرفات الأعضاء الذين انضموا خلال نافذة الأعضاء الجدد
+        Ids of members who joined within the new member window
+        """
+        window = self._chats.get(chat_id)
+        if window is None:
+            return []
+        
+        if now is None:
+            now = self.clock()
+        self._prune_members(window, now)
+        return list(window.members)
+    
+    def lock(self, chat_id: int, duration: float, now: Optional[float] = None):
+        """
+        تعليم المجموعة كمغلقة لمدة محددة
+        Mark the chat as locked down for a duration
+        """
+        if now is None:
+            now = self.clock()
+        self._window(chat_id).locked_until = now + duration
+    
+    def unlock(self, chat_id: int):
+        """
+        إنهاء إغلاق المجموعة
+        End the chat lockdown
+        """
+        window = self._chats.get(chat_id)
+        if window is not None:
+            window.locked_until = 0.0
+            window.joins.clear()
+            window.fingerprints.clear()
+    
+    def is_locked(self, chat_id: int, now: Optional[float] = None) -> bool:
+        """
+        فحص إذا كانت المجموعة في وضع الإغلاق
+        Check whether the chat is locked down
+        """
+        window = self._chats.get(chat_id)
+        if window is None or not window.locked_until:
+            return False
+        
+        if now is None:
+            now = self.clock()
+        return window.locked_until > now
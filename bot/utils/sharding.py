@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+توزيع المجموعات على عدة عمليات عاملة حسب معرف المجموعة
+Distribute chats across several worker processes by chat id
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import queue
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Union
+from config.settings import WEBHOOK_READY_FILL, DISPATCH_DRAIN_TIMEOUT
+from bot.utils.metrics import QUEUE_DEPTH
+
+logger = logging.getLogger(__name__)
+
+# حقول التحديث التي تحمل المجموعة، بترتيب البحث
+# Update fields carrying the chat, in lookup order
+_CHAT_FIELDS = (
+    'message', 'edited_message', 'channel_post', 'edited_channel_post',
+    'chat_member', 'my_chat_member', 'chat_join_request',
+)
+
+_MASK_64 = 0xFFFFFFFFFFFFFFFF
+
+def shard_for(chat_id: Optional[int], count: int) -> int:
+    """
+    رقم العامل المسؤول عن المجموعة باستخدام jump consistent hash
+    Index of the worker owning the chat, using jump consistent hash
+    
+    النتيجة لا تعتمد على hash() المملح لكل عملية فتبقى ثابتة بين التشغيلات، وعند تغيير
+    عدد العمال تنتقل أقل نسبة ممكنة من المجموعات.
+    The result does not depend on the per-process salted hash() so it is stable
+    across restarts, and changing the worker count moves the fewest chats possible.
+    """
+    if count <= 1 or chat_id is None:
+        return 0
+    
+    key = chat_id & _MASK_64
+    bucket, jump = -1, 0
+    while jump < count:
+        bucket = jump
+        key = (key * 2862933555777941757 + 1) & _MASK_64
+        jump = int((bucket + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return bucket
+
+def update_chat_id(data: Dict[str, Any]) -> Optional[int]:
+    """
+    معرف المجموعة من تحديث JSON دون بناء كائن Update
+    Chat id of a JSON update without building an Update object
+    """
+    for field in _CHAT_FIELDS:
+        item = data.get(field)
+        if item is not None:
+            return item.get('chat', {}).get('id')
+    
+    callback = data.get('callback_query')
+    if callback is not None:
+        message = callback.get('message')
+        if message is not None:
+            return message.get('chat', {}).get('id')
+        return callback.get('from', {}).get('id')
+    return None
+
+class Shard(NamedTuple):
+    """
+    موقع العملية الحالية بين العمال
+    Position of the current process among the workers
+    """
+    index: int
+    count: int
+    
+    def owns(self, chat_id: Optional[int]) -> bool:
+        return shard_for(chat_id, self.count) == self.index
+
+class ShardRouter:
+    """
+    يشغل N عملية عاملة لكل منها طابور، ويرسل كل تحديث لعامل مجموعته
+    Runs N worker processes with one queue each and sends every update to its chat's worker
+    
+    التحديثات تمر كنص JSON كما وصلت. العامل الذي يتوقف يعاد تشغيله بنفس الرقم
+    فتبقى مجموعاته عنده، وما في ذاكرته من نوافذ يبدأ من جديد.
+    Updates pass as the JSON text they arrived as. A worker that dies is restarted
+    with the same index so it keeps its chats, with its in-memory windows starting over.
+    """
+    
+    def __init__(self, count: int, target: Callable[[Shard, Any], None], queue_size: int):
+        self.count = count
+        self.target = target
+        # spawn لأن عملية الواجهة تحمل خيوطاً (السجلات) لا تنجو من fork
+        # spawn because the front-end process holds threads (logging) that do not survive fork
+        self._context = multiprocessing.get_context("spawn")
+        self.queues = [self._context.Queue(maxsize=queue_size) for _ in range(count)]
+        self.queue_size = queue_size
+        self.processes: List[Optional[multiprocessing.Process]] = [None] * count
+        self._supervisor: Optional[asyncio.Task] = None
+        self._stopping = False
+        
+        for index, shard_queue in enumerate(self.queues):
+            QUEUE_DEPTH.labels(f"shard_{index}").set_function(shard_queue.qsize)
+    
+    @property
+    def ready(self) -> bool:
+        """
+        جميع العمال يعملون وطوابيرهم تحت حد الامتلاء
+        Every worker is running and its queue is below the fill limit
+        """
+        limit = self.queue_size * WEBHOOK_READY_FILL
+        return all(process is not None and process.is_alive() for process in self.processes) and \
+            all(shard_queue.qsize() < limit for shard_queue in self.queues)
+    
+    def _spawn(self, index: int):
+        process = self._context.Process(
+            target=self.target,
+            args=(Shard(index, self.count), self.queues[index]),
+            name=f"shard-{index}",
+            daemon=False,
+        )
+        process.start()
+        self.processes[index] = process
+        logger.info(f"تم تشغيل العامل {index} (PID {process.pid})")
+    
+    async def start(self):
+        """
+        تشغيل العمال ومراقبتهم
+        Start the workers and watch over them
+        """
+        for index in range(self.count):
+            self._spawn(index)
+        self._supervisor = asyncio.get_running_loop().create_task(self._supervise())
+    
+    async def _supervise(self):
+        while not self._stopping:
+            await asyncio.sleep(1)
+            for index, process in enumerate(self.processes):
+                if process is not None and not process.is_alive() and not self._stopping:
+                    logger.error(f"❌ توقف العامل {index} (رمز الخروج {process.exitcode})، إعادة التشغيل")
+                    self._spawn(index)
+    
+    def submit(self, chat_id: Optional[int], payload: Union[bytes, str]) -> bool:
+        """
+        إرسال تحديث دون انتظار، وإرجاع False إذا كان طابور العامل ممتلئاً
+        Send an update without waiting, returning False if the worker's queue is full
+        """
+        try:
+            self.queues[shard_for(chat_id, self.count)].put_nowait(payload)
+            return True
+        except queue.Full:
+            return False
+    
+    async def put(self, chat_id: Optional[int], payload: Union[bytes, str]):
+        """
+        إرسال تحديث مع الانتظار حتى يتوفر مكان في طابور العامل
+        Send an update, waiting until the worker's queue has room
+        """
+        await asyncio.to_thread(self.queues[shard_for(chat_id, self.count)].put, payload)
+    
+    async def stop(self, timeout: float = DISPATCH_DRAIN_TIMEOUT * 3):
+        """
+        إرسال إشارة الإيقاف لكل عامل بعد ما في طابوره، ثم انتظارهم
+        Send every worker a stop signal behind its queue, then wait for them
+        """
+        self._stopping = True
+        if self._supervisor is not None:
+            self._supervisor.cancel()
+            try:
+                await self._supervisor
+            except asyncio.CancelledError:
+                pass
+            self._supervisor = None
+        
+        for shard_queue in self.queues:
+            try:
+                await asyncio.to_thread(shard_queue.put, None, True, timeout)
+            except queue.Full:
+                pass
+        
+        for index, process in enumerate(self.processes):
+            if process is None:
+                continue
+            await asyncio.to_thread(process.join, timeout)
+            if process.is_alive():
+                logger.error(f"❌ العامل {index} لم يتوقف خلال {timeout} ثانية، إنهاؤه")
+                process.terminate()
+                await asyncio.to_thread(process.join, 5)
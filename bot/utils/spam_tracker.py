@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+متتبع معدل الرسائل لاكتشاف السبام
+Message rate tracker for spam detection
+"""
+
+import time
+from collections import OrderedDict, deque
+from itertools import islice
+from typing import Callable, Deque, Optional, Tuple
+from bot.utils.fingerprint import hamming_distance, max_distance_for
+from config.settings import (
+    SPAM_THRESHOLD, SPAM_THRESHOLD_MAX, SPAM_WINDOW, SPAM_SIMILAR_MESSAGES, SPAM_TRACKER_MAX_USERS,
+    SPAM_SIMILARITY_THRESHOLD, SPAM_CROSS_USER_COUNT, SPAM_FINGERPRINT_MIN_LENGTH,
+    SPAM_CHAT_HISTORY, SPAM_TRACKER_MAX_CHATS
+)
+
+# عدد الرسائل الأخيرة التي تقارن مع الرسالة الحالية
+# Number of recent messages compared with the current one
+RECENT_MESSAGES = 5
+
+UserKey = Tuple[int, int]
+
+class SpamTracker:
+    """
+    نافذة منزلقة لكل (مجموعة، مستخدم) بتكلفة ثابتة لكل رسالة وذاكرة محدودة
+    Sliding window per (chat, user) with constant cost per message and bounded memory
+    
+    يحتفظ كل مستخدم بآخر الطوابع الزمنية وبصمات SimHash فقط، والمستخدمون مرتبون
+    حسب آخر نشاط بحيث يتم حذف الخاملين ومن يتجاوز الحد الأقصى من البداية.
+    تعتبر رسالتان متشابهتين إذا كانت المسافة بين بصمتيهما ضمن حد التشابه، كما
+    تحتفظ كل مجموعة بآخر البصمات لاكتشاف نفس الرسالة من عدة حسابات.
+    Each user keeps only the latest timestamps and SimHash fingerprints, and users
+    are ordered by last activity so idle users and overflow are evicted from the front.
+    Two messages are similar when their fingerprints are within the similarity
+    distance, and each chat keeps its latest fingerprints to catch the same
+    message sent from several accounts.
+    """
+    
+    def __init__(self, threshold: int = SPAM_THRESHOLD, window: float = SPAM_WINDOW,
+                 similar_messages: int = SPAM_SIMILAR_MESSAGES,
+                 max_users: int = SPAM_TRACKER_MAX_USERS,
+                 similarity: float = SPAM_SIMILARITY_THRESHOLD,
+                 cross_user_count: int = SPAM_CROSS_USER_COUNT,
+                 min_length: int = SPAM_FINGERPRINT_MIN_LENGTH,
+                 chat_history: int = SPAM_CHAT_HISTORY,
+                 max_chats: int = SPAM_TRACKER_MAX_CHATS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.threshold = threshold
+        self.window = window
+        self.similar_messages = similar_messages
+        self.max_users = max_users
+        self.max_distance = max_distance_for(similarity)
+        self.cross_user_count = cross_user_count
+        self.min_length = min_length
+        self.chat_history = chat_history
+        self.max_chats = max_chats
+        # مصدر الوقت عند عدم تمرير now، وإعادة التشغيل تستبدله بوقت التسجيل
+        # Time source when now is not given, replays swap it for the recorded time
+        self.clock = clock
+        # الحجم يكفي لأعلى حد يمكن ضبطه لكل مجموعة
+        # Sized for the highest threshold a chat may configure
+        self._history_size = max(threshold, SPAM_THRESHOLD_MAX, RECENT_MESSAGES)
+        self._users: "OrderedDict[UserKey, Deque[Tuple[float, int]]]" = OrderedDict()
+        self._chats: "OrderedDict[int, Deque[Tuple[float, int, int]]]" = OrderedDict()
+    
+    def __len__(self) -> int:
+        return len(self._users)
+    
+    def record(self, chat_id: int, user_id: int, fingerprint: int, length: int = 0,
+               now: Optional[float] = None, threshold: Optional[int] = None) -> bool:
+        """
+        تسجيل رسالة وإرجاع True إذا اعتبرت سبام
+        Record a message and return True if it is considered spam
+        
+        length هو طول النص المستخدم في البصمة، والرسائل القصيرة لا تفحص بين
+        المستخدمين لأن التحيات المتكررة ليست سبام.
+        length is the length of the fingerprinted text; short messages skip the
+        cross-user check since repeated greetings are not spam.
+        threshold overrides the message count for this chat.
+        """
+        if now is None:
+            now = self.clock()
+        cutoff = now - self.window
+        
+        user_spam = self._record_user(chat_id, user_id, fingerprint, now, cutoff,
+                                      threshold or self.threshold)
+        if length < self.min_length:
+            return user_spam
+        
+        chat_spam = self._record_chat(chat_id, user_id, fingerprint, now, cutoff)
+        return user_spam or chat_spam
+    
+    def _is_similar(self, first: int, second: int) -> bool:
+        return hamming_distance(first, second) <= self.max_distance
+    
+    def _record_user(self, chat_id: int, user_id: int, fingerprint: int,
+                     now: float, cutoff: float, threshold: int) -> bool:
+        key = (chat_id, user_id)
+        history = self._users.get(key)
+        if history is None:
+            history = deque(maxlen=self._history_size)
+            self._users[key] = history
+        else:
+            self._users.move_to_end(key)
+        
+        # حذف الرسائل الأقدم من النافذة
+        # Drop messages older than the window
+        while history and history[0][0] <= cutoff:
+            history.popleft()
+        
+        history.append((now, fingerprint))
+        self._evict(cutoff)
+        
+        if len(history) < threshold:
+            return False
+        
+        # فحص إذا كانت الرسائل الأخيرة متشابهة
+        # Check if recent messages are similar
+        similar = sum(
+            1 for _, recent in islice(reversed(history), RECENT_MESSAGES)
+            if self._is_similar(recent, fingerprint)
+        )
+        return similar >= self.similar_messages
+    
+    def _record_chat(self, chat_id: int, user_id: int, fingerprint: int,
+                     now: float, cutoff: float) -> bool:
+        """
+        فحص إذا أرسل عدة مستخدمين نفس الرسالة تقريباً في المجموعة
+        Check whether several users sent nearly the same message in the chat
+        """
+        chats = self._chats
+        history = chats.get(chat_id)
+        if history is None:
+            history = deque(maxlen=self.chat_history)
+            chats[chat_id] = history
+        else:
+            chats.move_to_end(chat_id)
+        
+        while history and history[0][0] <= cutoff:
+            history.popleft()
+        
+        senders = {
+            sender for _, recent, sender in history
+            if sender != user_id and self._is_similar(recent, fingerprint)
+        }
+        history.append((now, fingerprint, user_id))
+        
+        while len(chats) > self.max_chats:
+            chats.popitem(last=False)
+        while chats:
+            oldest = next(iter(chats.values()))
+            if oldest and oldest[-1][0] > cutoff:
+                break
+            chats.popitem(last=False)
+        
+        return len(senders) + 1 >= self.cross_user_count
+    
+    def _evict(self, cutoff: float):
+        """
+        حذف المستخدمين الخاملين ومن يتجاوز الحد الأقصى
+        Evict idle users and users beyond the cap
+        """
+        users = self._users
+        while len(users) > self.max_users:
+            users.popitem(last=False)
+        
+        while users:
+            oldest = next(iter(users.values()))
+            if oldest and oldest[-1][0] > cutoff:
+                break
+            users.popitem(last=False)
+    
+    def forget(self, chat_id: int, user_id: int):
+        """
+        حذف سجل المستخدم
+        Forget a user's history
+        """
+        self._users.pop((chat_id, user_id), None)
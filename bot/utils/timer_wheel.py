@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+عجلة مؤقتات هرمية لمهلات التحقق وانتهاء الكتم وتنظيف الرسائل
+Hierarchical timer wheel for verification timeouts, mute expiries and message cleanup
+"""
+
+import asyncio
+import json
+import logging
+import math
+import time
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+from config.settings import TIMER_TICK
+
+logger = logging.getLogger(__name__)
+
+# دالة معالجة نوع مؤقت: تستقبل التطبيق وبيانات جميع المؤقتات المنتهية في نفس النبضة
+# Timer kind handler: receives the application and the data of every timer expiring in the same tick
+TimerHandler = Callable[[Any, List[Dict]], Awaitable[None]]
+
+class _Timer:
+    """
+    مؤقت واحد داخل العجلة
+    A single timer inside the wheel
+    """
+    
+    __slots__ = ('key', 'kind', 'deadline', 'data', 'tick', 'slot')
+    
+    def __init__(self, key: str, kind: str, deadline: float, data: Dict, tick: int):
+        self.key = key
+        self.kind = kind
+        self.deadline = deadline
+        self.data = data
+        self.tick = tick
+        self.slot: Optional[Dict[str, "_Timer"]] = None
+
+class TimerWheel:
+    """
+    عجلة مؤقتات هرمية بتكلفة ثابتة للجدولة والإلغاء
+    Hierarchical timer wheel with constant-cost scheduling and cancellation
+    
+    كل مستوى يحتوي 64 خانة، والمستوى الأعلى يغطي 64 ضعف مدى المستوى الأدنى،
+    والمؤقتات تنزل إلى المستوى الأدنى عند اقتراب موعدها. جميع المؤقتات المنتهية
+    في نفس النبضة تسلم لمعالج نوعها دفعة واحدة، والمواعيد تحفظ في جدول timers
+    بكتابة مجمعة مرة كل نبضة.
+    Each level has 64 slots and covers 64 times the range of the level below,
+    and timers cascade down as their deadline approaches. Every timer expiring
+    in the same tick is handed to its kind's handler in one batch, and deadlines
+    are persisted to the timers table with one batched write per tick.
+    """
+    
+    def __init__(self, tick: float = TIMER_TICK, wheel_bits: int = 6, levels: int = 4):
+        self.tick = tick
+        self.levels = levels
+        self._bits = wheel_bits
+        self._mask = (1 << wheel_bits) - 1
+        self._wheels: List[List[Dict[str, _Timer]]] = [
+            [{} for _ in range(1 << wheel_bits)] for _ in range(levels)
+        ]
+        # المؤقتات الأبعد من مدى العجلة، والمؤقتات المستحقة فوراً
+        # Timers beyond the wheel range, and timers due right away
+        self._overflow: Dict[str, _Timer] = {}
+        self._due: Dict[str, _Timer] = {}
+        self._timers: Dict[str, _Timer] = {}
+        self._current = int(time.time() // tick)
+        
+        self._handlers: Dict[str, TimerHandler] = {}
+        self._application = None
+        self._store = None
+        self._dirty: Dict[str, Optional[_Timer]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._dispatches: Set[asyncio.Task] = set()
+        
+        self.fired = 0
+    
+    def __len__(self) -> int:
+        return len(self._timers)
+    
+    @property
+    def current_tick(self) -> int:
+        """
+        النبضة التي وصلت إليها العجلة، وهي نقطة البداية لـ advance
+        The tick the wheel has reached, the starting point for advance
+        """
+        return self._current
+    
+    def __contains__(self, key: str) -> bool:
+        return key in self._timers
+    
+    def count(self, kind: str) -> int:
+        """
+        عدد المؤقتات المعلقة من نوع معين
+        Number of pending timers of a kind
+        """
+        return sum(1 for timer in self._timers.values() if timer.kind == kind)
+    
+    def register(self, kind: str, handler: TimerHandler):
+        """
+        تسجيل معالج لنوع من المؤقتات
+        Register the handler of a timer kind
+        """
+        self._handlers[kind] = handler
+    
+    def schedule(self, kind: str, key: str, delay: float, data: Optional[Dict] = None):
+        """
+        جدولة مؤقت بعد مدة بالثواني، ويستبدل أي مؤقت بنفس المفتاح
+        Schedule a timer after a delay in seconds, replacing any timer with the same key
+        """
+        self.schedule_at(kind, key, time.time() + delay, data)
+    
+    def schedule_at(self, kind: str, key: str, deadline: float, data: Optional[Dict] = None,
+                    persist: bool = True):
+        """
+        جدولة مؤقت في وقت محدد (طابع يونكس)
+        Schedule a timer at a given unix timestamp
+        """
+        self._remove(key)
+        timer = _Timer(key, kind, deadline, data or {}, math.ceil(deadline / self.tick))
+        self._timers[key] = timer
+        self._place(timer)
+        if persist:
+            self._dirty[key] = timer
+    
+    def cancel(self, key: str) -> bool:
+        """
+        إلغاء مؤقت، وإرجاع False إذا لم يكن موجوداً
+        Cancel a timer, returning False if it did not exist
+        """
+        if not self._remove(key):
+            return False
+        self._dirty[key] = None
+        return True
+    
+    def _remove(self, key: str) -> bool:
+        timer = self._timers.pop(key, None)
+        if timer is None:
+            return False
+        timer.slot.pop(key, None)
+        return True
+    
+    def _place(self, timer: _Timer):
+        delta = timer.tick - self._current
+        if delta <= 0:
+            slot = self._due
+        else:
+            for level in range(self.levels):
+                if delta < 1 << (self._bits * (level + 1)):
+                    slot = self._wheels[level][(timer.tick >> (self._bits * level)) & self._mask]
+                    break
+            else:
+                slot = self._overflow
+        
+        slot[timer.key] = timer
+        timer.slot = slot
+    
+    def _cascade(self, slot: Dict[str, _Timer]):
+        timers = list(slot.values())
+        slot.clear()
+        for timer in timers:
+            self._place(timer)
+    
+    def advance(self, target_tick: int) -> List[_Timer]:
+        """
+        تحريك العجلة حتى النبضة المحددة وإرجاع المؤقتات المنتهية
+        Advance the wheel up to the given tick and return the expired timers
+        """
+        expired: List[_Timer] = []
+        bits = self._bits
+        
+        while self._current < target_tick:
+            self._current += 1
+            current = self._current
+            
+            # إنزال المؤقتات من المستويات الأعلى عند اكتمال دورة المستوى الأدنى
+            # Cascade timers down from higher levels when the level below wraps
+            for level in range(self.levels - 1, 0, -1):
+                if current & ((1 << (bits * level)) - 1) == 0:
+                    slot = self._wheels[level][(current >> (bits * level)) & self._mask]
+                    if slot:
+                        self._cascade(slot)
+            
+            if self._overflow and current & ((1 << (bits * self.levels)) - 1) == 0:
+                self._cascade(self._overflow)
+            
+            slot = self._wheels[0][current & self._mask]
+            if slot:
+                expired.extend(slot.values())
+                slot.clear()
+        
+        if self._due:
+            expired.extend(self._due.values())
+            self._due.clear()
+        
+        for timer in expired:
+            del self._timers[timer.key]
+            self._dirty[timer.key] = None
+        
+        return expired
+    
+    def _dispatch(self, expired: List[_Timer]):
+        """
+        تسليم المؤقتات المنتهية لمعالجاتها مجمعة حسب النوع
+        Hand expired timers to their handlers grouped by kind
+        """
+        groups: Dict[str, List[Dict]] = defaultdict(list)
+        for timer in expired:
+            groups[timer.kind].append(timer.data)
+        
+        for kind, items in groups.items():
+            handler = self._handlers.get(kind)
+            if handler is None:
+                logger.warning(f"لا يوجد معالج لنوع المؤقت {kind}، تم تجاهل {len(items)} مؤقت")
+                continue
+            
+            task = asyncio.get_running_loop().create_task(self._run_handler(kind, handler, items))
+            self._dispatches.add(task)
+            task.add_done_callback(self._dispatches.discard)
+        
+        self.fired += len(expired)
+    
+    async def _run_handler(self, kind: str, handler: TimerHandler, items: List[Dict]):
+        try:
+            await handler(self._application, items)
+        except Exception as e:
+            logger.error(f"خطأ في معالجة مؤقتات {kind}: {e}")
+    
+    async def _flush(self):
+        """
+        كتابة التغييرات المعلقة على المؤقتات في معاملة واحدة
+        Write pending timer changes in one transaction
+        """
+        if not self._dirty or self._store is None:
+            return
+        
+        dirty, self._dirty = self._dirty, {}
+        upserts = [
+            (timer.key, timer.kind, timer.deadline, json.dumps(timer.data, ensure_ascii=False))
+            for timer in dirty.values() if timer is not None
+        ]
+        deletes = [(key,) for key, timer in dirty.items() if timer is None]
+        try:
+            await self._store.save_timers(upserts, deletes)
+        except Exception as e:
+            # إعادة التغييرات للمحاولة في النبضة التالية دون استبدال الأحدث منها
+            # Put the changes back for the next tick without overriding newer ones
+            for key, timer in dirty.items():
+                self._dirty.setdefault(key, timer)
+            logger.error(f"خطأ في حفظ المؤقتات: {e}")
+    
+    async def _load(self, accept: Optional[Callable[[Dict], bool]] = None):
+        """
+        تحميل المؤقتات المحفوظة بعد إعادة التشغيل، و accept يحدد مؤقتات هذه العملية
+        Load persisted timers after a restart, accept selects this process's timers
+        """
+        rows = await self._store.load_timers()
+        loaded = 0
+        for key, kind, deadline, data in rows:
+            data = json.loads(data) if data else {}
+            if accept is not None and not accept(data):
+                continue
+            self.schedule_at(kind, key, deadline, data, persist=False)
+            loaded += 1
+        
+        if loaded:
+            logger.info(f"تمت استعادة {loaded} مؤقت من قاعدة البيانات")
+    
+    async def _run(self):
+        while True:
+            next_tick_at = (self._current + 1) * self.tick
+            await asyncio.sleep(max(next_tick_at - time.time(), 0))
+            
+            try:
+                expired = self.advance(int(time.time() // self.tick))
+                if expired:
+                    self._dispatch(expired)
+                await self._flush()
+            except Exception as e:
+                logger.error(f"خطأ في عجلة المؤقتات: {e}")
+    
+    async def start(self, application, store=None, accept: Optional[Callable[[Dict], bool]] = None):
+        """
+        تحميل المؤقتات المحفوظة وبدء النبضات
+        Load persisted timers and start ticking
+        """
+        self._application = application
+        self._store = store
+        if store is not None:
+            await self._load(accept)
+        
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+    
+    async def stop(self):
+        """
+        إيقاف النبضات وانتظار المعالجات الجارية وحفظ المواعيد
+        Stop ticking, wait for running handlers and persist deadlines
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        
+        if self._dispatches:
+            await asyncio.gather(*self._dispatches, return_exceptions=True)
+        
+        await self._flush()
+        logger.info(f"تم إيقاف عجلة المؤقتات ({len(self._timers)} مؤقت معلق)")
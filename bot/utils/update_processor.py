@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+معالج تحديثات متزامن يحافظ على الترتيب داخل كل مجموعة
+Concurrent update processor preserving order within each chat
+"""
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Dict, Hashable, List, Tuple
+from telegram.ext import BaseUpdateProcessor
+
+logger = logging.getLogger(__name__)
+
+class _KeyedLocks:
+    """
+    أقفال حسب المفتاح تحذف تلقائياً عند عدم وجود منتظرين
+    Per-key locks that are dropped once nobody is waiting on them
+    """
+    
+    def __init__(self):
+        self._locks: Dict[Hashable, List[Any]] = {}
+    
+    def __len__(self) -> int:
+        return len(self._locks)
+    
+    @asynccontextmanager
+    async def hold(self, key: Hashable):
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = [asyncio.Lock(), 0]
+            self._locks[key] = entry
+        
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[key]
+
+class AdmissionQueue(asyncio.Queue):
+    """
+    طابور تحديثات لا يسلم تحديثاً جديداً إلا إذا كانت التحديثات المسحوبة غير المنتهية
+    أقل من max_pending
+    Update queue that only hands out a new update while fewer than max_pending taken
+    updates are unfinished
+    
+    مع المعالجة المتزامنة ينشئ PTB مهمة لكل تحديث يسحبه، فيبقي هذا الحد التحديثات الزائدة
+    في الطابور حيث يمتلئ ويعمل الرد 503 وتتوقف قراءة التحديثات.
+    With concurrent processing PTB creates a task for every update it takes, so this limit
+    keeps the excess in the queue where it fills up, the 503 response engages and fetching
+    updates pauses.
+    """
+    
+    def __init__(self, maxsize: int = 0, max_pending: int = 1000):
+        super().__init__(maxsize)
+        self.max_pending = max_pending
+        self._slots = asyncio.Semaphore(max_pending)
+    
+    async def get(self):
+        await self._slots.acquire()
+        try:
+            return await super().get()
+        except BaseException:
+            self._slots.release()
+            raise
+    
+    def task_done(self):
+        # PTB يستدعي task_done بعد انتهاء معالجة كل تحديث مسحوب
+        # PTB calls task_done once every taken update has been processed
+        super().task_done()
+        self._slots.release()
+
+def ordering_keys(update: object) -> Tuple[Hashable, ...]:
+    """
+    مفاتيح الترتيب للتحديث: المجموعة ثم المستخدم
+    Ordering keys of an update: chat first, then user
+    """
+    keys: List[Hashable] = []
+    
+    chat = getattr(update, 'effective_chat', None)
+    if chat is not None:
+        keys.append(('chat', chat.id))
+    
+    user = getattr(update, 'effective_user', None)
+    if user is not None:
+        keys.append(('user', user.id))
+    
+    return tuple(keys)
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """
+    يعالج تحديثات المجموعات المختلفة بالتوازي مع الحفاظ على ترتيب تحديثات
+    نفس المجموعة ونفس المستخدم
+    Processes updates from different chats in parallel while keeping updates
+    of the same chat and of the same user in order
+    
+    يتم أخذ أقفال المجموعة والمستخدم قبل حجز مكان في حد التزامن، حتى لا
+    تشغل تحديثات مجموعة مزدحمة جميع الأماكن وهي تنتظر دورها.
+    Chat and user locks are taken before a concurrency slot is claimed, so a
+    busy chat cannot fill every slot with updates waiting for their turn.
+    
+    عدد التحديثات المعلقة هنا محدود بـ AdmissionQueue التي يسحب منها التطبيق.
+    The number of updates pending here is capped by the AdmissionQueue the
+    application takes them from.
+    """
+    
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        self._locks = _KeyedLocks()
+        self.pending = 0
+        self.max_pending_seen = 0
+    
+    async def process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        """
+        انتظار دور التحديث في مجموعته ثم معالجته ضمن حد التزامن
+        Wait for the update's turn in its chat, then run it within the concurrency limit
+        """
+        self.pending += 1
+        self.max_pending_seen = max(self.max_pending_seen, self.pending)
+        try:
+            keys = ordering_keys(update)
+            await self._process_in_order(keys, update, coroutine)
+        finally:
+            self.pending -= 1
+    
+    async def _process_in_order(self, keys: Tuple[Hashable, ...], update: object,
+                                coroutine: Awaitable[Any]):
+        # الأقفال تؤخذ دائماً بنفس الترتيب (المجموعة ثم المستخدم) لتجنب الجمود
+        # Locks are always taken in the same order (chat then user) to avoid deadlocks
+        if not keys:
+            await super().process_update(update, coroutine)
+            return
+        
+        async with self._locks.hold(keys[0]):
+            await self._process_in_order(keys[1:], update, coroutine)
+    
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        """
+        تنفيذ معالجة التحديث
+        Run the update processing
+        """
+        await coroutine
+    
+    async def initialize(self) -> None:
+        logger.info(f"معالجة التحديثات المتزامنة مفعلة (الحد الأقصى {self.max_concurrent_updates})")
+    
+    async def shutdown(self) -> None:
+        if self.pending:
+            logger.warning(f"إيقاف معالج التحديثات مع {self.pending} تحديث معلق")
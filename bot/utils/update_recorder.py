@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+تسجيل التحديثات الواردة بعد إخفاء الهوية لإعادة تشغيلها لاحقاً
+Record incoming updates, anonymized, for later replay
+"""
+
+import hashlib
+import hmac
+import json
+import logging
+import re
+import time
+from typing import Any, Optional, TextIO
+from telegram import Update
+from telegram.ext import ContextTypes
+
+logger = logging.getLogger(__name__)
+
+# حقول شخصية تحذف بالكامل
+# Personal fields removed entirely
+_DROPPED_FIELDS = frozenset({
+    'last_name', 'username', 'bio', 'phone_number', 'contact', 'location', 'venue',
+    'invite_link', 'photo', 'active_usernames', 'emoji_status_custom_emoji_id',
+})
+
+_CALLBACK_USER = re.compile(r'^(verify_)(\d+)(_.*)$')
+
+# مجموعة معالج التسجيل، قبل كل مجموعات المعالجات
+# The recorder handler group, ahead of every handler group
+RECORDER_GROUP = -100
+
+class Anonymizer:
+    """
+    استبدال معرفات المستخدمين والمجموعات بمعرفات ثابتة مشتقة بمفتاح سري
+    Replace user and chat ids with stable ids derived with a secret key
+    
+    نفس المعرف يعطي نفس البديل دائماً فتبقى العلاقات بين الرسائل والمستخدمين، ونص
+    الرسائل يبقى كما هو لأن قرارات الإشراف تعتمد عليه.
+    The same id always maps to the same substitute so relations between messages
+    and users survive, and message text is kept as is because moderation
+    decisions depend on it.
+    """
+    
+    def __init__(self, salt: str):
+        self._key = salt.encode('utf-8')
+    
+    def map_id(self, value: int) -> int:
+        digest = hmac.new(self._key, str(abs(value)).encode('ascii'), hashlib.sha256).digest()
+        mapped = int.from_bytes(digest[:6], 'big') % 10 ** 12 + 1
+        # الحفاظ على إشارة معرفات المجموعات وطول المجموعات الكبرى
+        # Keep the sign of chat ids and the shape of supergroup ids
+        if value <= -1000000000000:
+            return -1000000000000 - mapped
+        return -mapped if value < 0 else mapped
+    
+    def anonymize(self, value: Any) -> Any:
+        if isinstance(value, list):
+            return [self.anonymize(item) for item in value]
+        if not isinstance(value, dict):
+            return value
+        
+        result = {key: self.anonymize(item) for key, item in value.items() if key not in _DROPPED_FIELDS}
+        
+        # المستخدم يحمل is_bot، والمجموعة تحمل type
+        # A user carries is_bot, a chat carries type
+        if isinstance(value.get('id'), int) and ('is_bot' in value or 'type' in value):
+            result['id'] = self.map_id(value['id'])
+            if 'first_name' in result:
+                result['first_name'] = f"User {result['id']}"
+            if 'title' in result:
+                result['title'] = f"Chat {result['id']}"
+        
+        data = result.get('data')
+        if isinstance(data, str):
+            match = _CALLBACK_USER.match(data)
+            if match:
+                result['data'] = f"{match.group(1)}{self.map_id(int(match.group(2)))}{match.group(3)}"
+        
+        return result
+
+class UpdateRecorder:
+    """
+    كتابة كل تحديث كسطر JSON مع وقت استلامه
+    Write every update as a JSON line with its receive time
+    """
+    
+    def __init__(self, path: str, salt: str):
+        self.path = path
+        self.anonymizer = Anonymizer(salt)
+        self.recorded = 0
+        self._file: Optional[TextIO] = None
+    
+    async def record(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """
+        معالج TypeHandler يسجل التحديث قبل باقي المعالجات
+        TypeHandler callback recording the update before the other handlers
+        """
+        try:
+            if self._file is None:
+                self._file = open(self.path, 'a', encoding='utf-8')
+            
+            entry = {'t': round(time.time(), 3), 'update': self.anonymizer.anonymize(update.to_dict())}
+            self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self.recorded += 1
+        
+        except Exception as e:
+            logger.error(f"خطأ في تسجيل التحديث: {e}")
+    
+    def close(self):
+        """
+        إغلاق ملف التسجيل
+        Close the capture file
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            logger.info(f"تم تسجيل {self.recorded} تحديث في {self.path}")
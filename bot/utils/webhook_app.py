@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+تطبيق ASGI يستقبل تحديثات Webhook ويضعها في طابور التطبيق المحدود
+ASGI app receiving webhook updates into the application's bounded queue
+"""
+
+import asyncio
+import hmac
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+from telegram import Update
+from telegram.ext import Application
+from config.settings import (
+    WEBHOOK_PATH, WEBHOOK_READY_FILL, WEBHOOK_MAX_BODY, WEBHOOK_MAX_CONNECTIONS
+)
+from bot.utils.metrics import QUEUE_DEPTH, WEBHOOK_REQUESTS
+from bot.utils.sharding import ShardRouter, update_chat_id
+
+logger = logging.getLogger(__name__)
+
+Receive = Callable[[], Awaitable[Dict[str, Any]]]
+Send = Callable[[Dict[str, Any]], Awaitable[None]]
+
+SECRET_HEADER = b"x-telegram-bot-api-secret-token"
+
+# عدادات محلولة مسبقاً للمسار الساخن
+# Labels resolved up front for the hot path
+_ACCEPTED = WEBHOOK_REQUESTS.labels("200")
+_REJECTED = WEBHOOK_REQUESTS.labels("403")
+_INVALID = WEBHOOK_REQUESTS.labels("400")
+_TOO_LARGE = WEBHOOK_REQUESTS.labels("413")
+_QUEUE_FULL = WEBHOOK_REQUESTS.labels("503")
+
+_TEXT = [(b"content-type", b"text/plain; charset=utf-8")]
+
+class WebhookApp:
+    """
+    يرد على تيليجرام فور وضع التحديث في الطابور، والمعالجة تتم في Application
+    Answers Telegram as soon as the update is queued, processing happens in the Application
+    
+    عند امتلاء الطابور يرد بـ 503 فتعيد تيليجرام الإرسال لاحقاً بدلاً من تراكم
+    التحديثات في الذاكرة. /healthz يعني أن العملية تعمل، و /readyz يعني أن
+    التطبيق بدأ والطابور تحت حد الامتلاء. مع router تمرر التحديثات كما وصلت إلى
+    عامل المجموعة بدلاً من طابور التطبيق.
+    When the queue is full it answers 503 so Telegram retries later instead of
+    updates piling up in memory. /healthz means the process is up, /readyz means
+    the application started and the queue is below the fill limit. With a router
+    updates are passed as received to the chat's worker instead of the
+    application queue.
+    """
+    
+    def __init__(self, application: Application, webhook_url: str, secret_token: str,
+                 path: str = WEBHOOK_PATH, allowed_updates: Optional[Sequence[str]] = None,
+                 max_connections: int = WEBHOOK_MAX_CONNECTIONS, drop_pending_updates: bool = False,
+                 router: Optional[ShardRouter] = None):
+        self.application = application
+        self.webhook_url = webhook_url
+        self.secret_token = secret_token.encode('utf-8')
+        self.path = path
+        self.allowed_updates = list(allowed_updates) if allowed_updates is not None else None
+        self.max_connections = max_connections
+        self.drop_pending_updates = drop_pending_updates
+        self.router = router
+        self.queue: asyncio.Queue = application.update_queue
+        self._ready = False
+        if router is None:
+            QUEUE_DEPTH.labels("updates").set_function(self.queue.qsize)
+    
+    @property
+    def ready(self) -> bool:
+        if not self._ready:
+            return False
+        if self.router is not None:
+            return self.router.ready
+        return not self.queue.maxsize or self.queue.qsize() < self.queue.maxsize * WEBHOOK_READY_FILL
+    
+    async def __call__(self, scope: Dict[str, Any], receive: Receive, send: Send):
+        if scope['type'] == 'http':
+            await self._http(scope, receive, send)
+        elif scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+    
+    async def startup(self):
+        """
+        تشغيل التطبيق بنفس ترتيب run_webhook ثم تسجيل الرابط لدى تيليجرام
+        Start the application in the same order as run_webhook, then register the URL with Telegram
+        """
+        application = self.application
+        await application.initialize()
+        if application.post_init:
+            await application.post_init(application)
+        await application.start()
+        
+        await application.bot.set_webhook(
+            url=self.webhook_url,
+            secret_token=self.secret_token.decode('utf-8'),
+            allowed_updates=self.allowed_updates,
+            max_connections=self.max_connections,
+            drop_pending_updates=self.drop_pending_updates,
+        )
+        self._ready = True
+        logger.info(f"✅ خادم Webhook جاهز على {self.path}")
+    
+    async def shutdown(self):
+        """
+        إيقاف التطبيق بعد معالجة ما في الطابور، والرابط يبقى مسجلاً حتى تعيد تيليجرام
+        الإرسال للنسخة التالية
+        Stop the application after the queue is processed, the URL stays registered
+        so Telegram redelivers to the next instance
+        """
+        self._ready = False
+        application = self.application
+        if application.running:
+            await application.stop()
+            if application.post_stop:
+                await application.post_stop(application)
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
+    
+    async def _lifespan(self, receive: Receive, send: Send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    await self.startup()
+                except Exception as e:
+                    logger.error(f"❌ خطأ في تشغيل خادم Webhook: {e}")
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            
+            elif message['type'] == 'lifespan.shutdown':
+                try:
+                    await self.shutdown()
+                except Exception as e:
+                    logger.error(f"خطأ في إيقاف خادم Webhook: {e}")
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    
+    async def _http(self, scope: Dict[str, Any], receive: Receive, send: Send):
+        path = scope['path']
+        method = scope['method']
+        
+        if path == self.path and method == 'POST':
+            await self._receive_update(scope, receive, send)
+        elif path == '/healthz' and method in ('GET', 'HEAD'):
+            await _respond(send, 200, b"ok\n")
+        elif path == '/readyz' and method in ('GET', 'HEAD'):
+            if self.ready:
+                await _respond(send, 200, b"ready\n")
+            else:
+                await _respond(send, 503, b"not ready\n")
+        else:
+            await _respond(send, 404, b"not found\n")
+    
+    async def _receive_update(self, scope: Dict[str, Any], receive: Receive, send: Send):
+        # فحص المفتاح قبل قراءة الجسم، بمقارنة ثابتة الزمن
+        # Check the secret before reading the body, with a constant-time comparison
+        secret = _header(scope['headers'], SECRET_HEADER)
+        if secret is None or not hmac.compare_digest(secret, self.secret_token):
+            _REJECTED.inc()
+            await _respond(send, 403, b"forbidden\n")
+            return
+        
+        body = await _read_body(receive, WEBHOOK_MAX_BODY)
+        if body is None:
+            _TOO_LARGE.inc()
+            await _respond(send, 413, b"too large\n")
+            return
+        
+        try:
+            data = json.loads(body)
+            if self.router is None:
+                update = Update.de_json(data, self.application.bot)
+            else:
+                chat_id = update_chat_id(data)
+        except Exception as e:
+            logger.warning(f"تحديث غير صالح في Webhook: {e}")
+            _INVALID.inc()
+            await _respond(send, 400, b"invalid update\n")
+            return
+        
+        if self.router is None:
+            try:
+                self.queue.put_nowait(update)
+                accepted = True
+            except asyncio.QueueFull:
+                accepted = False
+        else:
+            accepted = self.router.submit(chat_id, body)
+        
+        if not accepted:
+            _QUEUE_FULL.inc()
+            await _respond(send, 503, b"busy\n", [(b"retry-after", b"1")])
+            return
+        
+        _ACCEPTED.inc()
+        await _respond(send, 200, b"")
+
+def _header(headers: List[Tuple[bytes, bytes]], name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key == name:
+            return value
+    return None
+
+async def _read_body(receive: Receive, limit: int) -> Optional[bytes]:
+    """
+    قراءة جسم الطلب، أو None إذا تجاوز الحد
+    Read the request body, or None if it exceeds the limit
+    """
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        chunk = message.get('body', b"")
+        size += len(chunk)
+        if size > limit:
+            return None
+        chunks.append(chunk)
+        if not message.get('more_body', False):
+            return b"".join(chunks)
+
+async def _respond(send: Send, status: int, body: bytes,
+                   headers: Sequence[Tuple[bytes, bytes]] = ()):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [*_TEXT, (b"content-length", str(len(body)).encode('ascii')), *headers],
+    })
+    await send({'type': 'http.response.body', 'body': body})
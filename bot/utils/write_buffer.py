@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+تخزين مؤجل لسجلات الرسائل والمخالفات
+Write-behind buffer for message and violation logs
+"""
+
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime, timezone
+from typing import Deque, List, Optional, Tuple
+from config.settings import LOG_BUFFER_BATCH_SIZE, LOG_BUFFER_FLUSH_INTERVAL, LOG_BUFFER_MAX_PENDING
+
+logger = logging.getLogger(__name__)
+
+def _utc_timestamp() -> str:
+    """
+    طابع زمني بنفس تنسيق CURRENT_TIMESTAMP في SQLite
+    Timestamp in the same format as SQLite CURRENT_TIMESTAMP
+    """
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+class WriteBehindBuffer:
+    """
+    يجمع صفوف السجلات ويكتبها دفعة واحدة عند بلوغ الحجم أو المدة المحددة
+    Collects log rows and writes them in one batch on a size or time threshold
+    
+    الطابور محدود: عند امتلائه يتم إسقاط صفوف الرسائل بدلاً من النمو بلا حد،
+    والمخالفات لها الأولوية وتحل محل أقدم رسالة معلقة.
+    The queue is bounded: once full, message rows are shed instead of growing
+    forever, and violations take priority by displacing the oldest message row.
+    
+    إذا فشلت الكتابة تعاد المخالفات إلى الطابور لتكتب في التفريغ التالي، بينما
+    تسقط الرسائل.
+    If a write fails the violations go back into the queue for the next flush,
+    while the messages are dropped.
+    """
+    
+    def __init__(self, db, batch_size: int = LOG_BUFFER_BATCH_SIZE,
+                 flush_interval: float = LOG_BUFFER_FLUSH_INTERVAL,
+                 max_pending: int = LOG_BUFFER_MAX_PENDING):
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        
+        self._messages: Deque[Tuple] = deque()
+        self._violations: List[Tuple] = []
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._timer_task: Optional[asyncio.Task] = None
+        
+        self.dropped = 0
+        self.flushed = 0
+    
+    @property
+    def pending(self) -> int:
+        return len(self._messages) + len(self._violations)
+    
+    def add_message(self, chat_id: int, user_id: int, message_text: str) -> bool:
+        """
+        إضافة رسالة إلى الطابور
+        Queue a message row
+        """
+        if self.pending >= self.max_pending:
+            return self._shed()
+        
+        self._messages.append((chat_id, user_id, message_text, _utc_timestamp()))
+        self._maybe_flush()
+        return True
+    
+    def add_violation(self, chat_id: int, user_id: int, violation_type: str, content: str) -> bool:
+        """
+        إضافة مخالفة إلى الطابور
+        Queue a violation row
+        """
+        if self.pending >= self.max_pending:
+            if not self._messages:
+                return self._shed()
+            self._messages.popleft()
+            self._shed()
+        
+        self._violations.append((chat_id, user_id, violation_type, content, _utc_timestamp()))
+        self._maybe_flush()
+        return True
+    
+    def _shed(self) -> bool:
+        self.dropped += 1
+        if self.dropped % 1000 == 1:
+            logger.warning(f"طابور السجلات ممتلئ، تم إسقاط {self.dropped} صف حتى الآن")
+        return False
+    
+    def _maybe_flush(self):
+        if self.pending >= self.batch_size and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.get_running_loop().create_task(self.flush())
+    
+    async def flush(self):
+        """
+        كتابة جميع الصفوف المعلقة في معاملة واحدة
+        Write every pending row in one transaction
+        """
+        async with self._flush_lock:
+            if not self.pending:
+                return
+            
+            messages, self._messages = list(self._messages), deque()
+            violations, self._violations = self._violations, []
+            
+            try:
+                await self.db.log_batch(messages=messages, violations=violations)
+                self.flushed += len(messages) + len(violations)
+            except Exception as e:
+                self.dropped += len(messages)
+                self._requeue(violations)
+                logger.error(f"خطأ في تفريغ طابور السجلات: {e}")
+    
+    def _requeue(self, violations: List[Tuple]):
+        """
+        إعادة مخالفات لم تكتب إلى مقدمة الطابور، بإزاحة الرسائل المعلقة أولاً ثم
+        إسقاط ما يتجاوز حد الطابور
+        Put unwritten violations back at the front of the queue, displacing pending
+        messages first and then dropping whatever exceeds the queue cap
+        """
+        while self._messages and self.pending + len(violations) > self.max_pending:
+            self._messages.popleft()
+            self._shed()
+        
+        room = max(0, self.max_pending - self.pending)
+        for _ in violations[room:]:
+            self._shed()
+        self._violations = violations[:room] + self._violations
+    
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+    
+    async def start(self):
+        """
+        بدء التفريغ الدوري
+        Start periodic flushing
+        """
+        if self._timer_task is None:
+            self._timer_task = asyncio.get_running_loop().create_task(self._run())
+    
+    async def stop(self):
+        """
+        إيقاف التفريغ الدوري مع تفريغ نهائي مضمون
+        Stop periodic flushing with a guaranteed final flush
+        """
+        if self._timer_task is not None:
+            self._timer_task.cancel()
+            try:
+                await self._timer_task
+            except asyncio.CancelledError:
+                pass
+            self._timer_task = None
+        
+        if self._flush_task is not None:
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+            self._flush_task = None
+        
+        await self.flush()
+        logger.info(f"تم إيقاف طابور السجلات (مكتوب: {self.flushed}، مُسقط: {self.dropped})")
@@ -15,14 +15,80 @@ BOT_TOKEN = os.getenv("BOT_TOKEN", "")
 WEBHOOK_URL = os.getenv("WEBHOOK_URL", None)
 DEBUG = os.getenv("DEBUG", "False").lower() == "true"
 
+# خادم Webhook: asgi (uvicorn، اعتمادية اختيارية) أو ptb (الخادم المدمج في المكتبة)
+# Webhook server: asgi (uvicorn, optional dependency) or ptb (the library's built-in server)
+WEBHOOK_SERVER = os.getenv("WEBHOOK_SERVER", "asgi")
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("PORT", "8000"))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")          # فارغ = مفتاح عشوائي عند كل تشغيل
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", "10000"))  # التحديثات المعلقة قبل الرد بـ 503
+WEBHOOK_READY_FILL = 0.9           # نسبة امتلاء الطابور التي يصبح عندها /readyz غير جاهز
+WEBHOOK_MAX_BODY = 1024 * 1024     # أقصى حجم لطلب التحديث بالبايت
+WEBHOOK_MAX_CONNECTIONS = 100      # الاتصالات المتزامنة التي ترسلها تيليجرام (1-100)
+WEBHOOK_KEEPALIVE = 75             # مدة إبقاء الاتصال مفتوحاً بالثواني
+
+# عدد العمليات العاملة، كل مجموعة تذهب دائماً لنفس العامل (1 = عملية واحدة)
+# Number of worker processes, each chat always goes to the same worker (1 = single process)
+SHARD_WORKERS = int(os.getenv("SHARD_WORKERS", "1"))
+SHARD_QUEUE_SIZE = int(os.getenv("SHARD_QUEUE_SIZE", "10000"))  # التحديثات المعلقة لكل عامل
+POLL_TIMEOUT = 30                  # مدة الاستطلاع الطويل لواجهة التحديثات في وضع العمال بالثواني
+
+# عدد التحديثات المعالجة بالتوازي (1 = معالجة تسلسلية)
+# Number of updates processed in parallel (1 = sequential processing)
+CONCURRENT_UPDATES = int(os.getenv("CONCURRENT_UPDATES", "1"))
+UPDATE_MAX_PENDING = int(os.getenv("UPDATE_MAX_PENDING", "1000"))  # التحديثات المسحوبة من الطابور قبل التوقف عن السحب
+
 # إعدادات قاعدة البيانات
 # Database settings
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///bot_data.db")
+DB_READ_WORKERS = int(os.getenv("DB_READ_WORKERS", "2"))  # عدد خيوط القراءة المتزامنة
+DB_SYNCHRONOUS = os.getenv("DB_SYNCHRONOUS", "NORMAL")     # NORMAL آمن مع WAL
+DB_CACHE_SIZE_KB = 20000           # حجم ذاكرة التخزين المؤقت لكل اتصال بالكيلوبايت
+DB_MMAP_SIZE = 256 * 1024 * 1024   # حجم الملف المعين في الذاكرة بالبايت
+DB_BUSY_TIMEOUT_MS = 5000          # مدة انتظار القفل بالمللي ثانية
+
+# إعدادات التخزين المؤجل لسجلات الرسائل والمخالفات
+# Write-behind buffer settings for message and violation logs
+LOG_BUFFER_BATCH_SIZE = 500        # عدد الصفوف التي تطلق التفريغ
+LOG_BUFFER_FLUSH_INTERVAL = 2.0    # أقصى مدة بالثواني قبل التفريغ
+LOG_BUFFER_MAX_PENDING = 20000     # الحد الأقصى للصفوف المعلقة قبل إسقاط الجديد
+
+# إعدادات طابور إجراءات تيليجرام الصادرة
+# Outbound Telegram action queue settings
+DISPATCH_GLOBAL_RATE = 30                # أقصى عدد طلبات في الثانية لجميع المجموعات
+DISPATCH_CHAT_MESSAGES_PER_MINUTE = 20   # أقصى عدد رسائل في الدقيقة لكل مجموعة
+DISPATCH_MAX_IN_FLIGHT = 10              # عدد الطلبات المتزامنة
+DISPATCH_MAX_RETRIES = 3                 # عدد محاولات الإعادة بعد RetryAfter
+DISPATCH_MAX_QUEUE = 10000               # الحد الأقصى للإجراءات المعلقة قبل إسقاط الإشعارات
+DISPATCH_DRAIN_TIMEOUT = 10              # مدة انتظار تفريغ الطابور عند الإيقاف بالثواني
+
+# خادم المقاييس المحلي على /metrics (0 = معطل)
+# Local metrics server on /metrics (0 = disabled)
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))
+
+# تسجيل التحديثات الواردة بعد إخفاء الهوية لإعادة تشغيلها (فارغ = معطل)
+# Record anonymized incoming updates for replay (empty = disabled)
+REPLAY_CAPTURE_FILE = os.getenv("REPLAY_CAPTURE_FILE", "")
+REPLAY_CAPTURE_SALT = os.getenv("REPLAY_CAPTURE_SALT", "")  # مفتاح إخفاء المعرفات، يجب ألا ينشر
+
+# دقة عجلة المؤقتات بالثواني (مهلات التحقق وانتهاء الكتم وحذف الرسائل)
+# Timer wheel resolution in seconds (verification timeouts, mute expiries, message cleanup)
+TIMER_TICK = 1.0
 
 # إعدادات التسجيل
 # Logging settings
 LOG_LEVEL = "DEBUG" if DEBUG else "INFO"
 LOG_FILE = "bot.log"
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")   # json أو text
+LOG_QUEUE_SIZE = 10000             # الحد الأقصى للسجلات المعلقة قبل إسقاط الجديد
+LOG_FILE_MAX_BYTES = 50 * 1024 * 1024  # حجم ملف السجل قبل التدوير بالبايت
+LOG_FILE_BACKUPS = 5               # عدد ملفات السجل القديمة المحفوظة
+# تمرير سجل واحد من كل N سجلات DEBUG و INFO المعلمة بـ sample لكل حدث في المسجل (والمسجلات التابعة له)
+LOG_SAMPLING = {
+    "bot.handlers.moderation": 100,
+}
 
 # إعدادات التحقق
 # Verification settings
@@ -31,9 +97,53 @@ VERIFICATION_ATTEMPTS = 3   # عدد المحاولات المسموحة
 
 # إعدادات الإشراف
 # Moderation settings
-MUTE_DURATION = 3600       # مدة الكتم بالثواني (ساعة واحدة)
+MUTE_DURATION = 3600       # مدة الكتم الافتراضية لأمر /mute بالثواني (ساعة واحدة)
+AUTO_MUTE_DURATION = 300   # مدة الكتم التلقائي الافتراضية لكل مجموعة بالثواني (5 دقائق)
 WARN_LIMIT = 3             # عدد التحذيرات قبل الطرد
 SPAM_THRESHOLD = 5         # عدد الرسائل المتتالية لاعتبارها سبام
+SPAM_THRESHOLD_MAX = 20    # أقصى قيمة يمكن ضبطها لكل مجموعة
+SPAM_WINDOW = 60           # نافذة عد الرسائل بالثواني
+SPAM_SIMILAR_MESSAGES = 3  # عدد الرسائل المتطابقة من آخر 5 رسائل لاعتبارها سبام
+SPAM_TRACKER_MAX_USERS = 50000  # الحد الأقصى للمستخدمين المتتبعين في الذاكرة
+SPAM_SIMILARITY_THRESHOLD = 0.9     # نسبة تشابه البصمات لاعتبار الرسالتين متكررتين (0-1)
+SPAM_CROSS_USER_COUNT = 3           # عدد المستخدمين المختلفين الذين يرسلون نفس الرسالة
+SPAM_FINGERPRINT_MIN_LENGTH = 20    # أقل طول نص لفحص التكرار بين المستخدمين
+SPAM_CHAT_HISTORY = 100             # عدد البصمات الأخيرة المحفوظة لكل مجموعة
+SPAM_TRACKER_MAX_CHATS = 10000      # الحد الأقصى للمجموعات المتتبعة في الذاكرة
+
+# إعدادات الحماية من الغارات
+# Anti-raid settings
+RAID_JOIN_THRESHOLD = 10           # عدد الانضمامات خلال النافذة لتفعيل الإغلاق
+RAID_JOIN_WINDOW = 60              # نافذة عد الانضمامات بالثواني
+RAID_NEW_MEMBER_WINDOW = 600       # مدة اعتبار العضو جديداً بالثواني
+RAID_FANOUT_THRESHOLD = 5          # عدد الحسابات الجديدة التي ترسل نفس الرسالة لتفعيل الإغلاق
+RAID_FANOUT_WINDOW = 120           # نافذة مقارنة رسائل الحسابات الجديدة بالثواني
+RAID_FANOUT_HISTORY = 200          # عدد البصمات المحفوظة لكل مجموعة
+RAID_LOCKDOWN_DURATION = 900       # مدة وضع الإغلاق بالثواني
+RAID_LOCK_CHAT = False             # منع جميع الأعضاء من الكتابة أثناء الإغلاق
+RAID_MAX_MEMBERS_PER_CHAT = 2000   # الحد الأقصى للأعضاء الجدد المتتبعين لكل مجموعة
+RAID_MAX_CHATS = 10000             # الحد الأقصى للمجموعات المتتبعة في الذاكرة
+
+# إعدادات ذاكرة المشرفين المؤقتة
+# Admin cache settings
+ADMIN_CACHE_TTL = 600              # مدة صلاحية قائمة المشرفين بالثواني
+ADMIN_CACHE_MAX_CHATS = 10000      # الحد الأقصى للمجموعات المخزنة
+
+# إعدادات ذاكرة الكتم والتحذيرات المؤقتة
+# Mute and warning cache settings
+MODERATION_CACHE_MAX_ENTRIES = 50000  # الحد الأقصى للمستخدمين المخزنين لكل من الكتم والتحذيرات
+
+# إعدادات ذاكرة إعدادات المجموعات المؤقتة
+# Per-chat settings cache settings
+CHAT_SETTINGS_CACHE_MAX = 20000    # الحد الأقصى للمجموعات المخزنة في الذاكرة
+
+# إعدادات قائمة الكلمات المحظورة
+# Bad words list settings
+BADWORDS_FILE = "data/badwords.txt"
+BADWORDS_ARTIFACT = "data/badwords.bin"  # آلة المطابقة المترجمة، يعاد بناؤها عند تغير الملف
+BADWORDS_RELOAD_INTERVAL = 30      # فترة فحص تعديل الملف بالثواني (0 = بدون مراقبة)
+BADWORDS_DEFAULT_ACTION = "mute"   # الإجراء الافتراضي: mute أو delete أو warn
+BADWORDS_MAX_CHAT_OVERLAYS = 10000 # الحد الأقصى لقوائم المجموعات المخزنة في الذاكرة
 
 # رسائل البوت بالعربية
 # Bot messages in Arabic
@@ -47,6 +157,8 @@ MESSAGES = {
     "user_muted": "🔇 تم كتم العضو لمدة {duration} دقيقة.",
     "user_kicked": "👋 تم طرد العضو من المجموعة.",
     "spam_detected": "🚨 تم اكتشاف سبام! تم حذف الرسائل.",
+    "raid_lockdown": "🛡️ تم اكتشاف هجوم على المجموعة! تم تفعيل وضع الإغلاق لمدة {minutes} دقيقة وتقييد الأعضاء الجدد.",
+    "raid_lockdown_end": "✅ انتهى وضع الإغلاق.",
     "admin_only": "🔐 هذا الأمر متاح للمشرفين فقط.",
     "group_only": "👥 هذا الأمر يعمل في المجموعات فقط."
 }
@@ -55,8 +167,8 @@ MESSAGES = {
 # Authorized administrators list
 AUTHORIZED_ADMINS: List[int] = []
 
-# إعدادات الأمان
-# Security settings
+# إعدادات الأمان الافتراضية، ويمكن تغييرها لكل مجموعة بأوامر /toggle_*
+# Default security settings, changeable per chat with the /toggle_* commands
 ENABLE_BADWORDS_FILTER = True
 ENABLE_SPAM_DETECTION = True
 ENABLE_VERIFICATION = True
@@ -6,12 +6,357 @@
 Main entry point for the Telegram group protection bot
 """
 
+import asyncio
+import importlib.util
+import json
 import logging
 import os
-from telegram.ext import Application, ContextTypes
-from config.settings import BOT_TOKEN, WEBHOOK_URL, DEBUG
+import secrets
+import signal
+from typing import Optional
+from telegram import Update
+from telegram.ext import Application, ContextTypes, TypeHandler
+from config.settings import (
+    BOT_TOKEN, WEBHOOK_URL, DEBUG, CONCURRENT_UPDATES, UPDATE_MAX_PENDING, METRICS_HOST, METRICS_PORT,
+    REPLAY_CAPTURE_FILE, REPLAY_CAPTURE_SALT, WEBHOOK_SERVER, WEBHOOK_LISTEN, WEBHOOK_PORT,
+    WEBHOOK_PATH, WEBHOOK_SECRET, WEBHOOK_QUEUE_SIZE, WEBHOOK_KEEPALIVE, SHARD_WORKERS,
+    SHARD_QUEUE_SIZE, POLL_TIMEOUT, LOG_FILE
+)
 from bot.handlers import register_all_handlers
+from bot.handlers.verification import restore_pending_verifications
+from bot.services.container import ServiceContainer, SERVICES_KEY
+from bot.utils.database import Database
 from bot.utils.logger import setup_logging
+from bot.utils.metered_request import MeteredRequest
+from bot.utils.metrics import MetricsServer
+from bot.utils.sharding import Shard, ShardRouter, update_chat_id
+from bot.utils.update_recorder import UpdateRecorder, RECORDER_GROUP
+from bot.utils.update_processor import AdmissionQueue, ChatOrderedUpdateProcessor
+from bot.utils.webhook_app import WebhookApp
+
+# مفتاح خادم المقاييس داخل bot_data
+# Metrics server key inside bot_data
+METRICS_KEY = "metrics_server"
+
+# مفتاح مسجل التحديثات داخل bot_data
+# Update recorder key inside bot_data
+RECORDER_KEY = "update_recorder"
+
+# مفتاح موزع العمال داخل bot_data لعملية الواجهة
+# Shard router key inside the front-end process bot_data
+ROUTER_KEY = "shard_router"
+
+# أنواع التحديثات التي يطلبها البوت
+# Update types the bot asks for
+ALLOWED_UPDATES = ['message', 'callback_query', 'chat_member']
+
+async def start_metrics_server(application: Application, port: int):
+    """
+    تشغيل خادم المقاييس إذا كان مفعلاً
+    Start the metrics server if enabled
+    """
+    if not port:
+        return
+    server = MetricsServer(METRICS_HOST, port)
+    try:
+        await server.start()
+        application.bot_data[METRICS_KEY] = server
+    except OSError as e:
+        logging.getLogger(__name__).error(f"❌ تعذر تشغيل خادم المقاييس: {e}")
+
+async def stop_metrics_server(application: Application):
+    """
+    إيقاف خادم المقاييس
+    Stop the metrics server
+    """
+    server = application.bot_data.pop(METRICS_KEY, None)
+    if server is not None:
+        await server.stop()
+
+async def post_init(application: Application):
+    """
+    تهيئة الخدمات ثم استعادة الحالة المعلقة
+    Start services then restore pending state
+    """
+    services = application.bot_data[SERVICES_KEY]
+    await services.start(application)
+    await restore_pending_verifications(application)
+    
+    # كل عامل يعرض مقاييسه على المنفذ التالي لمنفذ عملية الواجهة
+    # Each worker exposes its metrics on the port after the front-end's
+    shard = services.shard
+    await start_metrics_server(
+        application, METRICS_PORT + 1 + shard.index if METRICS_PORT and shard is not None else METRICS_PORT
+    )
+
+async def post_stop(application: Application):
+    """
+    تنفيذ الإجراءات المعلقة قبل إغلاق اتصال البوت
+    Drain pending actions before the bot's connection closes
+    """
+    await application.bot_data[SERVICES_KEY].drain(application)
+
+async def post_shutdown(application: Application):
+    """
+    إيقاف الخدمات
+    Stop services
+    """
+    await stop_metrics_server(application)
+    recorder = application.bot_data.pop(RECORDER_KEY, None)
+    if recorder is not None:
+        recorder.close()
+    await application.bot_data[SERVICES_KEY].stop(application)
+
+def build_application(update_queue_size: Optional[int] = None,
+                      shard: Optional[Shard] = None) -> Application:
+    """
+    بناء تطبيق البوت مع حاوية الخدمات المشتركة
+    Build the bot application with the shared service container
+    
+    update_queue_size يستبدل Updater بطابور بهذا الحجم يملؤه خادم خارجي مثل خادم ASGI
+    أو عملية الواجهة، و shard يحدد مجموعات هذا العامل.
+    update_queue_size replaces the Updater with a queue of that size filled by an external
+    server such as the ASGI one or the front-end process, and shard selects this worker's chats.
+    """
+    services = ServiceContainer(shard=shard)
+    
+    builder = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .post_init(post_init)
+        .post_stop(post_stop)
+        .post_shutdown(post_shutdown)
+        # قياس كل استدعاء لواجهة تيليجرام حسب الطريقة
+        # Meter every Telegram API call by method
+        .request(MeteredRequest(connection_pool_size=256))
+        .get_updates_request(MeteredRequest())
+    )
+    
+    # الطابور لا يسلم تحديثاً جديداً قبل انتهاء بعض المسحوبة، فيمتلئ تحت الضغط بدلاً من
+    # تحويل كل تحديث إلى مهمة معلقة
+    # The queue hands out no new update until some taken ones finish, so it fills up under
+    # load instead of turning every update into a pending task
+    if update_queue_size is not None:
+        builder = builder.updater(None).update_queue(AdmissionQueue(update_queue_size, UPDATE_MAX_PENDING))
+    else:
+        builder = builder.update_queue(AdmissionQueue(UPDATE_MAX_PENDING, UPDATE_MAX_PENDING))
+    
+    # معالجة المجموعات المختلفة بالتوازي مع الحفاظ على الترتيب داخل كل مجموعة
+    # Process different chats in parallel while keeping order within each chat
+    if CONCURRENT_UPDATES > 1:
+        builder = builder.concurrent_updates(ChatOrderedUpdateProcessor(CONCURRENT_UPDATES))
+    
+    app = builder.build()
+    app.bot_data[SERVICES_KEY] = services
+    
+    # تسجيل التحديثات قبل جميع المعالجات لإعادة تشغيلها عبر benchmarks.replay، في مجموعة
+    # خاصة بها حتى لا يحجب معالجات المجموعة -1
+    # Record updates ahead of every handler for replay through benchmarks.replay, in a group
+    # of its own so it does not shadow the handlers of group -1
+    # كل عامل يكتب ملفه، و benchmarks.replay يدمج الملفات حسب الوقت
+    # Each worker writes its own file, and benchmarks.replay merges the files by time
+    if REPLAY_CAPTURE_FILE:
+        path = REPLAY_CAPTURE_FILE if shard is None else f"{REPLAY_CAPTURE_FILE}.{shard.index}"
+        recorder = UpdateRecorder(path, REPLAY_CAPTURE_SALT or secrets.token_hex(16))
+        app.add_handler(TypeHandler(Update, recorder.record), group=RECORDER_GROUP)
+        app.bot_data[RECORDER_KEY] = recorder
+    
+    return app
+
+def use_asgi_webhook() -> bool:
+    """
+    وضع ASGI يحتاج WEBHOOK_URL و uvicorn المثبت اختيارياً
+    ASGI mode needs WEBHOOK_URL and the optionally installed uvicorn
+    """
+    if not WEBHOOK_URL or WEBHOOK_SERVER != "asgi":
+        return False
+    if importlib.util.find_spec("uvicorn") is None:
+        logging.getLogger(__name__).warning(
+            "⚠️ uvicorn غير مثبت، استخدام خادم Webhook المدمج (pip install uvicorn)"
+        )
+        return False
+    return True
+
+def run_asgi_webhook(app: Application, router: Optional[ShardRouter] = None):
+    """
+    تشغيل Webhook عبر uvicorn مع طابور تحديثات محدود أو موزع على العمال
+    Run the webhook through uvicorn with a bounded update queue or a shard router
+    """
+    import uvicorn
+    
+    webhook = WebhookApp(
+        app,
+        webhook_url=f"{WEBHOOK_URL}{WEBHOOK_PATH}",
+        secret_token=WEBHOOK_SECRET or secrets.token_urlsafe(32),
+        allowed_updates=ALLOWED_UPDATES,
+        router=router,
+    )
+    # log_config=None يترك السجلات لإعداد البوت نفسه
+    # log_config=None leaves logging to the bot's own setup
+    uvicorn.run(
+        webhook,
+        host=WEBHOOK_LISTEN,
+        port=WEBHOOK_PORT,
+        lifespan="on",
+        log_config=None,
+        access_log=False,
+        timeout_keep_alive=WEBHOOK_KEEPALIVE,
+    )
+
+def run_shard_worker(shard: Shard, updates):
+    """
+    نقطة بداية العملية العاملة: تطبيق كامل يستقبل تحديثات مجموعاته من عملية الواجهة
+    Worker process entry point: a full application receiving its chats' updates from the front-end
+    """
+    # الإيقاف يأتي من عملية الواجهة بعد تفريغ الطابور، وليس من Ctrl+C الموجه للمجموعة كلها
+    # Shutdown comes from the front-end after the queue drains, not from Ctrl+C sent to the whole group
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    setup_logging(f"{LOG_FILE}.{shard.index}")
+    asyncio.run(serve_shard(shard, updates))
+
+async def serve_shard(shard: Shard, updates):
+    """
+    تشغيل التطبيق ونقل التحديثات من طابور العمليات إلى طابوره حتى إشارة الإيقاف
+    Run the application and move updates from the process queue into its own until the stop signal
+    """
+    logger = logging.getLogger(__name__)
+    app = build_application(WEBHOOK_QUEUE_SIZE, shard=shard)
+    register_all_handlers(app)
+    
+    await app.initialize()
+    await post_init(app)
+    await app.start()
+    logger.info(f"✅ العامل {shard.index} من {shard.count} جاهز")
+    
+    try:
+        while True:
+            payload = await asyncio.to_thread(updates.get)
+            if payload is None:
+                break
+            try:
+                update = Update.de_json(json.loads(payload), app.bot)
+            except Exception as e:
+                logger.error(f"خطأ في قراءة تحديث من عملية الواجهة: {e}")
+                continue
+            await app.update_queue.put(update)
+    finally:
+        await app.stop()
+        await post_stop(app)
+        await app.shutdown()
+        await post_shutdown(app)
+
+async def start_router(application: Application):
+    """
+    تشغيل العمال وخادم مقاييس عملية الواجهة
+    Start the workers and the front-end metrics server
+    """
+    await application.bot_data[ROUTER_KEY].start()
+    await start_metrics_server(application, METRICS_PORT)
+
+async def stop_router(application: Application):
+    """
+    إيقاف العمال بعد تفريغ طوابيرهم
+    Stop the workers once their queues drain
+    """
+    await stop_metrics_server(application)
+    await application.bot_data[ROUTER_KEY].stop()
+
+async def poll_into_router(app: Application):
+    """
+    استطلاع التحديثات في عملية الواجهة وتوزيعها على العمال
+    Poll updates in the front-end process and route them to the workers
+    """
+    logger = logging.getLogger(__name__)
+    router: ShardRouter = app.bot_data[ROUTER_KEY]
+    
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stopping.set)
+    
+    await app.initialize()
+    await start_router(app)
+    await app.bot.delete_webhook(drop_pending_updates=True)
+    
+    offset = None
+    stop_wait = loop.create_task(stopping.wait())
+    try:
+        while not stopping.is_set():
+            fetch = loop.create_task(app.bot.get_updates(
+                offset=offset, timeout=POLL_TIMEOUT, allowed_updates=ALLOWED_UPDATES
+            ))
+            await asyncio.wait({fetch, stop_wait}, return_when=asyncio.FIRST_COMPLETED)
+            if not fetch.done():
+                fetch.cancel()
+                break
+            
+            try:
+                received = fetch.result()
+            except Exception as e:
+                logger.error(f"خطأ في جلب التحديثات: {e}")
+                await asyncio.sleep(1)
+                continue
+            
+            # الانتظار عند امتلاء طابور العامل يبطئ الاستطلاع بدلاً من إسقاط التحديثات
+            # Waiting on a full worker queue slows polling instead of dropping updates
+            for update in received:
+                data = update.to_dict()
+                await router.put(update_chat_id(data), json.dumps(data))
+                offset = update.update_id + 1
+    finally:
+        stop_wait.cancel()
+        # تأكيد آخر تحديث تم توزيعه حتى لا تعيد تيليجرام إرساله
+        # Confirm the last routed update so Telegram does not send it again
+        if offset is not None:
+            try:
+                await app.bot.get_updates(offset=offset, timeout=0)
+            except Exception as e:
+                logger.error(f"خطأ في تأكيد آخر تحديث: {e}")
+        await stop_router(app)
+        await app.shutdown()
+
+def run_sharded():
+    """
+    وضع العمال: عملية واجهة تستقبل التحديثات (Webhook أو استطلاع) وتوزعها حسب
+    المجموعة على SHARD_WORKERS عملية
+    Worker mode: a front-end process receives updates (webhook or polling) and
+    routes them by chat to SHARD_WORKERS processes
+    """
+    logger = logging.getLogger(__name__)
+    
+    if WEBHOOK_URL and not use_asgi_webhook():
+        logger.error("❌ وضع العمال مع Webhook يحتاج uvicorn و WEBHOOK_SERVER=asgi")
+        logger.error("❌ Worker mode with a webhook needs uvicorn and WEBHOOK_SERVER=asgi")
+        return
+    
+    # تطبيق الترحيلات مرة واحدة قبل أن يفتح العمال قاعدة البيانات معاً
+    # Apply migrations once before the workers open the database together
+    Database().close()
+    
+    # مفتاح إخفاء مشترك حتى يطابق المعرف نفسه في ملفات جميع العمال
+    # A shared anonymizing key so the same id matches across every worker's file
+    if REPLAY_CAPTURE_FILE and not REPLAY_CAPTURE_SALT:
+        os.environ["REPLAY_CAPTURE_SALT"] = secrets.token_hex(16)
+    
+    router = ShardRouter(SHARD_WORKERS, run_shard_worker, SHARD_QUEUE_SIZE)
+    front = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .updater(None)
+        .post_init(start_router)
+        .post_shutdown(stop_router)
+        .request(MeteredRequest())
+        .get_updates_request(MeteredRequest())
+        .build()
+    )
+    front.bot_data[ROUTER_KEY] = router
+    
+    if WEBHOOK_URL:
+        logger.info(f"🌐 تشغيل Webhook عبر ASGI مع {SHARD_WORKERS} عامل")
+        run_asgi_webhook(front, router)
+    else:
+        logger.info(f"🔄 تشغيل الاستطلاع مع {SHARD_WORKERS} عامل")
+        asyncio.run(poll_into_router(front))
 
 def main():
     """
@@ -34,10 +379,15 @@ def main():
         logger.error("Please set BOT_TOKEN environment variable with your bot token from @BotFather")
         return
     
+    if SHARD_WORKERS > 1:
+        run_sharded()
+        return
+    
     # إنشاء تطبيق البوت
     # Create bot application
+    asgi = use_asgi_webhook()
     try:
-        app = Application.builder().token(BOT_TOKEN).build()
+        app = build_application(WEBHOOK_QUEUE_SIZE if asgi else None)
     except Exception as e:
         logger.error(f"❌ خطأ في إنشاء تطبيق البوت: {e}")
         logger.error(f"❌ Error creating bot application: {e}")
@@ -57,7 +407,10 @@ def main():
     # تشغيل البوت
     # Start the bot
     try:
-        if WEBHOOK_URL:
+        if asgi:
+            logger.info("🌐 تشغيل البوت في وضع Webhook عبر ASGI")
+            run_asgi_webhook(app)
+        elif WEBHOOK_URL:
             logger.info("🌐 تشغيل البوت في وضع Webhook")
             app.run_webhook(
                 listen="0.0.0.0",
@@ -69,7 +422,7 @@ def main():
             logger.info("🔄 تشغيل البوت في وضع Polling")
             logger.info("Bot is ready to receive messages")
             app.run_polling(
-                allowed_updates=['message', 'callback_query', 'chat_member'],
+                allowed_updates=ALLOWED_UPDATES,
                 drop_pending_updates=True
             )
     except Exception as e: